@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+"""Benchmarks XmlSchemaValidator schema directory processing over a
+synthetic schema tree.
+
+The generated tree contains a number of namespaces, each split across many
+schemas which are joined by ``xs:include`` directives (in the style of the
+OASIS CIQ schemas). Every namespace is also duplicated in a second
+directory, which exercises the filename/targetNamespace de-duplication
+performed while walking the tree.
+
+Usage:
+    python benchmarks/include_graph.py [--sizes 1000 2000 4000]
+
+"""
+# builtin
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+# Make the sdv package importable when run from a source checkout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# internal
+from sdv.validators import xml_schema
+
+SCHEMA = \
+"""<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    targetNamespace="%s">
+%s
+</xs:schema>
+"""
+
+INCLUDE = '    <xs:include schemaLocation="%s"/>'
+
+
+def write_namespace(dir_, index, parts):
+    """Writes a root schema for namespace `index` which includes `parts`
+    schemas, each of which includes the next.
+
+    """
+    ns = "http://example.com/ns-%d" % index
+    prefix = "ns%d" % index
+
+    for part in range(parts):
+        if part + 1 < parts:
+            include = INCLUDE % ("%s_part%d.xsd" % (prefix, part + 1))
+        else:
+            include = ""
+
+        fn = "%s_part%d.xsd" % (prefix, part)
+        with open(os.path.join(dir_, fn), 'w') as f:
+            f.write(SCHEMA % (ns, include))
+
+    with open(os.path.join(dir_, "%s.xsd" % prefix), 'w') as f:
+        f.write(SCHEMA % (ns, INCLUDE % ("%s_part0.xsd" % prefix)))
+
+
+def make_tree(root, files, parts):
+    """Creates a schema tree containing roughly `files` schemas under
+    `root`, where each namespace is split into `parts` schemas.
+
+    """
+    copies = 2
+    namespaces = max(1, files // (copies * (parts + 1)))
+
+    for copy in range(copies):
+        dir_ = os.path.join(root, "copy%d" % copy)
+        os.makedirs(dir_)
+
+        for index in range(namespaces):
+            write_namespace(dir_, index, parts)
+
+    return namespaces
+
+
+def run(files, parts):
+    root = tempfile.mkdtemp()
+
+    try:
+        namespaces = make_tree(root, files, parts)
+        start = time.time()
+        validator = xml_schema.XmlSchemaValidator(root, use_cache=False)
+        elapsed = time.time() - start
+    finally:
+        shutil.rmtree(root)
+
+    assert len(validator._schemalocs) == namespaces
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 2000, 4000, 8000],
+        help="Approximate number of schema files to generate for each run."
+    )
+    parser.add_argument(
+        "--parts",
+        type=int,
+        nargs="+",
+        default=[10, 500],
+        help="Number of xs:include'd schemas each namespace is split into."
+    )
+    args = parser.parse_args()
+
+    print("%8s %8s %10s %12s" % ("files", "parts", "seconds", "ms/file"))
+
+    for parts in args.parts:
+        for files in args.sizes:
+            elapsed = run(files, parts)
+            per_file = (elapsed / files) * 1000
+            print("%8d %8d %10.3f %12.4f" % (files, parts, elapsed, per_file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+"""Benchmarks the XSLT and native STIX Profile validation engines.
+
+The workload is a synthetic STIX package built by repeating the Indicators
+found in ``examples/stix/profile_invalid.xml``, validated against
+``examples/stix/Example_STIX_Profile.xlsx``. The document is parsed once.
+
+Two engines are measured:
+
+* ``xslt``: The validator XSLT generated from the profile Schematron. This
+  builds an SVRL report which is then parsed into errors.
+* ``native``: The profile rules evaluated directly as XPath.
+
+Usage:
+    python benchmarks/profile_engines.py [--copies 2000] [--repeat 3]
+
+"""
+# builtin
+import os
+import sys
+import time
+import argparse
+
+# external
+from lxml import etree
+
+# Make the sdv package importable when run from a source checkout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# internal
+from sdv.validators import STIXProfileValidator
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples', 'stix')
+EXAMPLE = os.path.join(EXAMPLES, 'profile_invalid.xml')
+PROFILE = os.path.join(EXAMPLES, 'Example_STIX_Profile.xlsx')
+
+
+def get_document(copies):
+    """Returns the root of a STIX package containing `copies` copies of the
+    example Indicators.
+
+    """
+    with open(EXAMPLE) as f:
+        source = f.read()
+
+    head, rest = source.split('<stix:Indicators>', 1)
+    indicators, tail = rest.split('</stix:Indicators>', 1)
+
+    xml = "%s<stix:Indicators>%s</stix:Indicators>%s" % (
+        head, indicators * copies, tail
+    )
+
+    parser = etree.XMLParser(huge_tree=True)
+    return etree.fromstring(xml.encode('utf-8'), parser=parser)
+
+
+def measure(validator, root, engine, repeat):
+    """Returns the best wall time of `repeat` profile validation runs over
+    `root`, along with the results of the last run.
+
+    Error line numbers are resolved inside the timed region, since the XSLT
+    engine resolves them lazily.
+
+    """
+    best = None
+
+    for _ in range(repeat):
+        start = time.time()
+        results = validator.validate(root, engine=engine)
+        errors = results.as_dict().get('errors', ())
+        elapsed = time.time() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best, results, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    root = get_document(args.copies)
+    nodes = sum(1 for _ in root.iter(etree.Element))
+    print("%d elements" % nodes)
+
+    validator = STIXProfileValidator(PROFILE, use_cache=False)
+
+    xslt, expected, count = measure(validator, root, 'xslt', args.repeat)
+    print("%-8s %8.3fs  (%d errors)" % ("xslt", xslt, count))
+
+    native, results, count = measure(validator, root, 'native', args.repeat)
+
+    # Both engines must produce the same results.
+    assert results.as_dict() == expected.as_dict()
+
+    print("%-8s %8.3fs  %5.2fx" % ("native", native, xslt / native))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+"""Reports the size and cost of the Schematron generated from a STIX Profile.
+
+The profile is a synthetic :class:`.Profile` with ``--rows`` rules spread
+over the Instance Mapping contexts used by
+``examples/stix/Example_STIX_Profile.xlsx``. The workload is
+``examples/stix/profile_invalid.xml`` with its Indicators repeated.
+
+Two Schematron layouts are measured:
+
+* ``grouped``: :meth:`.Profile.as_etree`, where every assertion for a
+  context shares one ``<rule>``. Each context node is matched once per
+  pattern.
+* ``per-rule``: Every assertion in its own pattern, which matches each
+  context node once per assertion.
+
+For each layout the number of patterns, rules and assertions, the size of
+the generated validator XSLT and the validation time are printed.
+
+Usage:
+    python benchmarks/profile_schematron.py [--rows 400] [--copies 50]
+        [--repeat 3]
+
+"""
+# builtin
+import os
+import sys
+import copy
+import time
+import argparse
+
+# external
+from lxml import etree, isoschematron
+
+# Make the sdv package importable when run from a source checkout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# internal
+from sdv import xmlconst
+from sdv.validators.stix import profile
+
+EXAMPLE = os.path.join(
+    os.path.dirname(__file__), '..', 'examples', 'stix', 'profile_invalid.xml'
+)
+
+NAMESPACES = {
+    xmlconst.NS_SAXON: 'saxon',
+    'http://www.w3.org/2001/XMLSchema-instance': 'xsi',
+    'http://stix.mitre.org/stix-1': 'stix',
+    'http://stix.mitre.org/Indicator-2': 'indicator',
+    'http://cybox.mitre.org/cybox-2': 'cybox',
+    'http://cybox.mitre.org/objects#DomainNameObject-1': 'DomainNameObj',
+}
+
+# (selectors, type namespace) for each Instance Mapping context.
+MAPPINGS = (
+    ("stix:STIX_Package", 'http://stix.mitre.org/stix-1'),
+    ("stix:STIX_Header", 'http://stix.mitre.org/stix-1'),
+    ("stix:Indicator", 'http://stix.mitre.org/Indicator-2'),
+    ("cybox:Object", 'http://cybox.mitre.org/cybox-2'),
+    (
+        "DomainNameObj:Value",
+        'http://cybox.mitre.org/objects#DomainNameObject-1'
+    ),
+)
+
+
+def get_profile(rows):
+    """Returns a :class:`.Profile` with `rows` rules."""
+    mappings = []
+
+    for selectors, namespace in MAPPINGS:
+        mapping = profile.InstanceMapping(NAMESPACES)
+        mapping.label = selectors
+        mapping.selectors = selectors
+        mapping.namespace = namespace
+        mappings.append(mapping)
+
+    prof = profile.Profile(NAMESPACES)
+
+    for idx in range(rows):
+        mapping = mappings[idx % len(mappings)]
+
+        if idx % 3 == 0:
+            rule = profile.RequiredRule("@attr%d" % idx, mapping)
+        elif idx % 3 == 1:
+            rule = profile.ProhibitedRule("Field%d" % idx, mapping)
+        else:
+            rule = profile.AllowedValuesRule(
+                "@value%d" % idx, mapping, required=False, values=["x"]
+            )
+
+        prof.append(rule)
+
+    return prof
+
+
+def split_rules(schema):
+    """Returns a copy of the Schematron `schema` with every assertion moved
+    into its own pattern.
+
+    """
+    ns = xmlconst.NS_SCHEMATRON
+    split = profile.schematron.make_schema()
+    split.extend(copy.deepcopy(x) for x in schema.iterfind("{%s}ns" % ns))
+
+    for rule in schema.iterfind("{%s}pattern/{%s}rule" % (ns, ns)):
+        for assertion in list(rule):
+            pattern = profile.schematron.make_pattern()
+            single = profile.schematron.make_rule(rule.get("context"))
+            single.append(copy.deepcopy(assertion))
+            pattern.append(single)
+            split.append(pattern)
+
+    return split
+
+
+def get_document(copies):
+    """Returns the root of a STIX package containing `copies` copies of the
+    example Indicators.
+
+    """
+    with open(EXAMPLE) as f:
+        source = f.read()
+
+    head, rest = source.split('<stix:Indicators>', 1)
+    indicators, tail = rest.split('</stix:Indicators>', 1)
+
+    xml = "%s<stix:Indicators>%s</stix:Indicators>%s" % (
+        head, indicators * copies, tail
+    )
+
+    return etree.fromstring(xml.encode('utf-8'))
+
+
+def measure(schema, root, repeat):
+    """Returns the validator XSLT size, best validation time over `repeat`
+    runs and the sorted error messages for `schema`.
+
+    """
+    compiled = isoschematron.Schematron(schema, store_xslt=True)
+    size = len(etree.tostring(compiled.validator_xslt))
+    validator = etree.XSLT(compiled.validator_xslt)
+    best = None
+
+    for _ in range(repeat):
+        start = time.time()
+        report = validator(root)
+        elapsed = time.time() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    xpath = "//svrl:failed-assert | //svrl:successful-report"
+    nodes = report.xpath(xpath, namespaces={'svrl': xmlconst.NS_SVRL})
+    messages = sorted(etree.tostring(x) for x in nodes)
+
+    return size, best, messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--copies", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    root = get_document(args.copies)
+    nodes = sum(1 for _ in root.iter(etree.Element))
+    print("%d rows, %d elements" % (args.rows, nodes))
+
+    grouped = get_profile(args.rows).as_etree()
+    layouts = (("grouped", grouped), ("per-rule", split_rules(grouped)))
+
+    ns = xmlconst.NS_SCHEMATRON
+    expected = None
+
+    for name, schema in layouts:
+        patterns = len(schema.findall("{%s}pattern" % ns))
+        rules = schema.findall("{%s}pattern/{%s}rule" % (ns, ns))
+        asserts = sum(len(x) for x in rules)
+        size, elapsed, messages = measure(schema, root, args.repeat)
+
+        # Both layouts must report the same errors.
+        expected = expected or messages
+        assert messages == expected
+
+        print(
+            "%-9s %4d patterns %4d rules %4d asserts %8d bytes XSLT %8.3fs" %
+            (name, patterns, len(rules), asserts, size, elapsed)
+        )
+
+
+if __name__ == '__main__':
+    main()
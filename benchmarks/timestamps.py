@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+"""Benchmarks sdv.utils.parse_timestamp() against dateutil.
+
+The workload mimics the timestamps found in a STIX document: a set of
+distinct xs:dateTime strings, each of which is repeated (e.g., by the
+components and idrefs which share a timestamp).
+
+Three parsers are measured:
+
+* ``dateutil``: ``dateutil.parser.parse()``, which parse_timestamp() used
+  for every call before the xs:dateTime fast path was added.
+* ``fast path``: The xs:dateTime parser, without memoization.
+* ``parse_timestamp``: The fast path behind a memo, as used with
+  ``ValidationContext.timestamps``.
+
+Usage:
+    python benchmarks/timestamps.py [--distinct 1000] [--repeat 10]
+
+"""
+# builtin
+import os
+import sys
+import time
+import random
+import argparse
+
+# external
+import dateutil.parser
+
+# Make the sdv package importable when run from a source checkout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# internal
+from sdv import utils
+
+
+def get_timestamps(distinct, repeat, seed=0):
+    """Returns a shuffled list of `distinct` timestamp strings, each of which
+    appears `repeat` times.
+
+    """
+    rand = random.Random(seed)
+    offsets = ("Z", "+00:00", "-05:00", "+05:30", "")
+
+    timestamps = []
+    for _ in range(distinct):
+        value = "%04d-%02d-%02dT%02d:%02d:%02d.%06d%s" % (
+            rand.randint(2010, 2016),
+            rand.randint(1, 12),
+            rand.randint(1, 28),
+            rand.randint(0, 23),
+            rand.randint(0, 59),
+            rand.randint(0, 59),
+            rand.randint(0, 999999),
+            rand.choice(offsets)
+        )
+        timestamps.append(value)
+
+    timestamps = timestamps * repeat
+    rand.shuffle(timestamps)
+    return timestamps
+
+
+def measure(func, timestamps):
+    """Returns the number of `timestamps` parsed by `func` per second."""
+    start = time.time()
+
+    for value in timestamps:
+        func(value)
+
+    return len(timestamps) / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--distinct", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    timestamps = get_timestamps(args.distinct, args.repeat)
+    memo = {}
+
+    parsers = (
+        ("dateutil", dateutil.parser.parse),
+        ("fast path", utils._parse_xs_datetime),
+        ("parse_timestamp", lambda x: utils.parse_timestamp(x, memo)),
+    )
+
+    print("%d timestamps (%d distinct)" % (len(timestamps), args.distinct))
+
+    for name, func in parsers:
+        rate = measure(func, timestamps)
+        print("%-16s %12.0f timestamps/sec" % (name, rate))
+
+
+if __name__ == '__main__':
+    main()
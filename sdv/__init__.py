@@ -2,10 +2,11 @@
 # See LICENSE.txt for complete terms.
 
 # builtin
+import os
 import collections
 
 # relative
-from . import validators
+from . import utils, validators, batch
 from .version import __version__  # noqa
 
 # A cache of STIX and CybOX XML validators that speeds up consecutive calls to
@@ -13,10 +14,64 @@ from .version import __version__  # noqa
 __xml_validators = collections.defaultdict(dict)
 
 # A cache of STIX Profile validators to speed up consecutive calls to
-# validate_profile()
+# validate_profile(). Maps profile paths to (stamp, validator) tuples.
 __profile_validators = {}
 
 
+def _get_xml_validator(klass, schemas=None):
+    """Returns a cached instance of the XML validator `klass` for the schema
+    directory `schemas`.
+
+    """
+    try:
+        return __xml_validators[klass][schemas]
+    except KeyError:
+        validator = klass(schema_dir=schemas)
+        __xml_validators[klass][schemas] = validator
+        return validator
+
+
+def _get_profile_stamp(profile):
+    """Returns a ``(mtime, size)`` tuple for the `profile` file or ``None``
+    if it cannot be read.
+
+    """
+    try:
+        stat = os.stat(profile)
+    except (OSError, TypeError, ValueError):
+        return None
+
+    return (stat.st_mtime, stat.st_size)
+
+
+def _get_profile_validator(profile):
+    """Returns a cached :class:`.STIXProfileValidator` for the `profile`
+    filename.
+
+    Cached validators are keyed on the absolute path of `profile` and are
+    rebuilt if the file modification time or size has changed.
+
+    """
+    try:
+        key = os.path.abspath(profile)
+    except (TypeError, ValueError):
+        key = profile
+
+    stamp = _get_profile_stamp(profile)
+
+    try:
+        cached_stamp, validator = __profile_validators[key]
+    except KeyError:
+        pass
+    else:
+        if stamp is not None and stamp == cached_stamp:
+            return validator
+
+    validator = validators.STIXProfileValidator(profile)
+    __profile_validators[key] = (stamp, validator)
+    return validator
+
+
 def validate_xml(doc, version=None, schemas=None, schemaloc=False, klass=None):
     """Performs XML Schema validation against a `STIX`_ or `CybOX`_ document.
 
@@ -25,8 +80,8 @@ def validate_xml(doc, version=None, schemas=None, schemaloc=False, klass=None):
 
     Args:
         doc: A STIX/CybOX document to validate. This can be a filename,
-            file-like object, ``etree._Element`` or ``etree._ElementTree``
-            object.
+            file-like object, ``etree._Element``, ``etree._ElementTree`` or
+            :class:`.ValidationContext` object.
         version: The version of the STIX/CybOX document being validated. If
             ``None`` an attempt will be made to extract the version from `doc`.
         schemas: A string path to a directory of STIX/CybOX schemas. If ``None``,
@@ -63,20 +118,19 @@ def validate_xml(doc, version=None, schemas=None, schemaloc=False, klass=None):
         .XMLSchemaIncludeError: If an error occurs while
             processing ``xs:include`` directives.
     """
+    # Parse `doc` once so it can be shared by the class check and validator.
+    doc = utils.get_context(doc)
+
     # Get the validator class required to validate `doc`. I.e., STIX or CybOX?
     if not klass:
         klass = validators.get_xml_validator_class(doc)
 
-    try:
-        validator = __xml_validators[klass][schemas]
-    except KeyError:
-        validator = klass(schema_dir=schemas)
-        __xml_validators[klass][schemas] = validator
-
+    validator = _get_xml_validator(klass, schemas)
     return validator.validate(doc, version=version, schemaloc=schemaloc)
 
 
-def validate_best_practices(doc, version=None):
+def validate_best_practices(doc, version=None, rules=None, exclude=None,
+                            profile_rules=False):
     """Performs `Best Practices`_ validation against a STIX document.
 
     .. _Best Practices: http://stixproject.github.io/documentation/suggested-practices/
@@ -87,15 +141,27 @@ def validate_best_practices(doc, version=None):
 
     Args:
         doc: A STIX document to validate. This can be a filename, file-like
-            object, ``etree._Element`` or ``etree._ElementTree`` object.
+            object, ``etree._Element``, ``etree._ElementTree`` or
+            :class:`.ValidationContext` object.
         version: The version of the STIX document being validated. If ``None``
             an attempt will be made to extract the version from `doc`.
+        rules: An optional iterable of rule names to run. Rules can be named
+            by method name or by the name of the results collection they
+            return (e.g., ``'Unresolved IDREFs'``). See
+            :meth:`.STIXBestPracticeValidator.find_rules`. If ``None``,
+            every rule applicable to `version` is run.
+        exclude: An optional iterable of rule names which are not run.
+        profile_rules: If ``True``, record the wall time, number of nodes
+            inspected and number of warnings emitted by each rule. See
+            :attr:`.BestPracticeValidationResults.timings`.
 
     Returns:
         An instance of
         :class:`.BestPracticeValidationResults`.
 
     Raises:
+        ValueError: If `rules` or `exclude` contain a name which is not a
+            best practice rule.
         IOError: If `doc` is not a valid XML document.
         .ValidationError: If `doc` is not a well-formed STIX document.
         .UnknownSTIXVersionError: If `version` is ``None`` and
@@ -105,10 +171,16 @@ def validate_best_practices(doc, version=None):
 
     """
     validator = validators.STIXBestPracticeValidator()
-    return validator.validate(doc, version=version)
+    return validator.validate(
+        doc,
+        version=version,
+        rules=rules,
+        exclude=exclude,
+        profile_rules=profile_rules
+    )
 
 
-def validate_profile(doc, profile):
+def validate_profile(doc, profile, engine='xslt'):
     """Performs `STIX Profile`_ validation against a STIX document.
 
     .. _STIX Profile: http://stixproject.github.io/documentation/profiles/
@@ -119,27 +191,32 @@ def validate_profile(doc, profile):
 
     Args:
         doc: A STIX document to validate. This can be a filename, file-like
-            object, ``etree._Element`` or ``etree._ElementTree`` object.
+            object, ``etree._Element``, ``etree._ElementTree`` or
+            :class:`.ValidationContext` object.
         profile: A filename to a STIX Profile document.
+        engine: The profile validation engine. ``'xslt'`` runs the validator
+            XSLT generated from `profile`. ``'native'`` evaluates the profile
+            rules directly, without building an SVRL report.
 
     Returns:
         An instance of
         :class:`.ProfileValidationResults`.
 
     Raises:
+        ValueError: If `engine` is not a known profile validation engine.
         IOError: If `doc` is not a valid XML document.
         .ValidationError: If the input document is not a well-formed STIX
             document.
         .ProfileParseError: If an error occurred while attempting to
             parse the `profile`.
     """
-    try:
-        validator = __profile_validators[profile]
-    except KeyError:
-        validator = validators.STIXProfileValidator(profile)
-        __profile_validators[profile] = validator
+    # Check the engine before the profile is parsed and compiled.
+    if engine not in validators.stix.profile.ENGINES:
+        raise ValueError("Unknown profile engine: %r" % (engine,))
+
+    validator = _get_profile_validator(profile)
 
-    return validator.validate(doc)
+    return validator.validate(doc, engine=engine)
 
 
 def profile_to_xslt(profile):
@@ -158,11 +235,7 @@ def profile_to_xslt(profile):
             parse the `profile`.
 
     """
-    try:
-        validator = __profile_validators[profile]
-    except KeyError:
-        validator = validators.STIXProfileValidator(profile)
-        __profile_validators[profile] = validator
+    validator = _get_profile_validator(profile)
 
     return validator.xslt
 
@@ -183,10 +256,79 @@ def profile_to_schematron(profile):
             parse the `profile`.
 
     """
-    try:
-        validator = __profile_validators[profile]
-    except KeyError:
-        validator = validators.STIXProfileValidator(profile)
-        __profile_validators[profile] = validator
+    validator = _get_profile_validator(profile)
 
     return validator.schematron
+
+
+def validate_many(docs, stages=(batch.STAGE_XML,), workers=None, version=None,
+                  schemas=None, schemaloc=False, profile=None, chunksize=1):
+    """Validates each document in `docs`, yielding results for each document
+    as its validation completes.
+
+    Each document is parsed once and shared by each validation stage. As with
+    the ``stix-validator.py`` script, Best Practice and Profile validation
+    are skipped for documents which are XML Schema-invalid.
+
+    Compiled schemas and Profile validators are reused across the whole
+    batch. If `workers` is greater than one, documents are validated in a
+    pool of `workers` processes. Each process builds its validators when
+    it starts, before it receives any documents.
+
+    Note:
+        When validating in a process pool, ``etree`` elements and file-like
+        objects are serialized before being sent to a worker process. Line
+        numbers in the results refer to the serialized document.
+
+    Args:
+        docs: An iterable of STIX/CybOX documents. Each document can be a
+            filename, ``bytes`` XML content, file-like object,
+            ``etree._Element``, ``etree._ElementTree`` or
+            :class:`.ValidationContext` object.
+        stages: An iterable of validation stages to perform. Valid stages are
+            ``'xml'``, ``'best_practices'`` and ``'profile'``.
+        workers: The number of worker processes to validate with. If ``None``
+            or ``1``, documents are validated in the current process.
+        version: The version of the documents being validated. If ``None``
+            the version is extracted from each document.
+        schemas: A string path to a directory of STIX/CybOX schemas. If
+            ``None``, the bundled STIX/CybOX schemas are used.
+        schemaloc: Use the ``xsi:schemaLocation`` attribute on each document
+            to perform XML Schema validation.
+        profile: A filename to a STIX Profile document. Required for the
+            ``'profile'`` stage.
+        chunksize: The number of documents sent to a worker process at a
+            time.
+
+    Returns:
+        An iterator of :class:`.BatchValidationResults` instances. When
+        validating in a process pool, results are yielded in the order they
+        complete, which may differ from the order of `docs`, and only a few
+        documents per worker are read from `docs` ahead of the results. The
+        ``doc`` attribute of each result is its filename, or ``None`` if
+        the document was not given as a filename.
+
+    Raises:
+        ValueError: If `stages` contains an unknown stage name or the
+            ``'profile'`` stage is requested without a `profile`.
+
+    Note:
+        Exceptions raised while validating a document (including errors
+        parsing `profile`) do not stop the batch. They are recorded on the
+        ``error`` attribute of the results for that document.
+
+    """
+    options = batch.BatchOptions(
+        stages=tuple(stages),
+        version=version,
+        schemas=schemas,
+        schemaloc=schemaloc,
+        profile=profile
+    )
+
+    return batch.validate_many(
+        docs,
+        options=options,
+        workers=workers,
+        chunksize=chunksize
+    )
@@ -0,0 +1,428 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+"""Validation of many documents at once. See :func:`sdv.validate_many`."""
+
+# builtin
+import pickle
+import threading
+import collections
+import multiprocessing
+
+# external
+from lxml import etree
+from mixbox.vendor.six import BytesIO, binary_type, string_types
+
+# internal
+import sdv
+from sdv import errors, utils, validators
+
+# relative
+from .validators import base
+
+
+# Validation stage names
+STAGE_XML = 'xml'
+STAGE_BEST_PRACTICES = 'best_practices'
+STAGE_PROFILE = 'profile'
+STAGES = (STAGE_XML, STAGE_BEST_PRACTICES, STAGE_PROFILE)
+
+
+# Options shared by every document in a batch.
+BatchOptions = collections.namedtuple(
+    typename="BatchOptions",
+    field_names=["stages", "version", "schemas", "schemaloc", "profile"]
+)
+
+
+class BatchValidationResults(base.ValidationResults):
+    """Validation results for a single document validated by
+    :func:`sdv.validate_many`.
+
+    Args:
+        doc: The input document these results are for.
+        index: The position of `doc` in the input documents.
+
+    Attributes:
+        doc: The input document these results are for. When validating in
+            a process pool, this is the filename if the input document was
+            a filename, and ``None`` otherwise.
+        index: The position of `doc` in the input documents.
+        xml_results: An instance of :class:`.XmlValidationResults` or
+            ``None`` if XML Schema validation was not performed.
+        best_practice_results: An instance of
+            :class:`.BestPracticeValidationResults` or ``None`` if Best
+            Practice validation was not performed.
+        profile_results: An instance of :class:`.ProfileValidationResults`
+            or ``None`` if Profile validation was not performed.
+        error: The exception raised while validating `doc` or ``None``. No
+            further validation stages are performed after an error.
+
+    """
+    def __init__(self, doc=None, index=None):
+        super(BatchValidationResults, self).__init__(False)
+        self.doc = doc
+        self.index = index
+        self.xml_results = None
+        self.best_practice_results = None
+        self.profile_results = None
+        self.error = None
+
+    @base.ValidationResults.is_valid.getter
+    def is_valid(self):
+        """Returns ``True`` if no errors were raised and every validation
+        stage that was performed was successful.
+
+        """
+        if self.error is not None:
+            return False
+
+        results = (
+            self.xml_results,
+            self.best_practice_results,
+            self.profile_results
+        )
+
+        return all(x.is_valid for x in results if x is not None)
+
+    def as_dict(self):
+        """Returns a dictionary representation.
+
+        Keys:
+            * ``'result'``: The overall validation result.
+            * ``'xml'``: The XML Schema validation results dictionary.
+            * ``'best_practices'``: The Best Practice validation results
+              dictionary.
+            * ``'profile'``: The Profile validation results dictionary.
+            * ``'error'``: The error raised during validation.
+
+        Only the keys for stages which were performed are present.
+
+        """
+        d = super(BatchValidationResults, self).as_dict()
+
+        if self.xml_results is not None:
+            d[STAGE_XML] = self.xml_results.as_dict()
+        if self.best_practice_results is not None:
+            d[STAGE_BEST_PRACTICES] = self.best_practice_results.as_dict()
+        if self.profile_results is not None:
+            d[STAGE_PROFILE] = self.profile_results.as_dict()
+        if self.error is not None:
+            d['error'] = str(self.error)
+
+        return d
+
+
+def _check_options(options):
+    """Raises a ``ValueError`` if `options` contains invalid values."""
+    unknown = [x for x in options.stages if x not in STAGES]
+
+    if unknown:
+        raise ValueError("Unknown validation stage(s): %s" % unknown)
+
+    if STAGE_PROFILE in options.stages and not options.profile:
+        raise ValueError("A profile is required for profile validation")
+
+
+def _get_input(doc):
+    """Returns `doc` in a form which can be parsed by
+    :func:`.get_etree_root`.
+
+    Byte strings which look like XML content are wrapped in a file-like
+    object. Everything else is treated as a document or filename.
+
+    """
+    if isinstance(doc, binary_type) and doc.lstrip().startswith(b"<"):
+        return BytesIO(doc)
+
+    return doc
+
+
+def _get_filename(doc):
+    """Returns `doc` if it is a filename, otherwise ``None``."""
+    if isinstance(doc, string_types) and _get_input(doc) is doc:
+        return doc
+
+    return None
+
+
+def _serialize(doc):
+    """Returns a picklable representation of `doc` which can be sent to a
+    worker process.
+
+    """
+    if isinstance(doc, utils.ValidationContext):
+        return etree.tostring(doc.root)
+    elif isinstance(doc, (etree._Element, etree._ElementTree)):  # noqa
+        return etree.tostring(doc)
+    elif hasattr(doc, 'read'):
+        return doc.read()
+
+    return doc
+
+
+def _validate(doc, options):
+    """Performs the validation stages in `options` on `doc`.
+
+    Returns:
+        An instance of :class:`BatchValidationResults`. The ``doc`` and
+        ``index`` attributes are not set.
+
+    """
+    results = BatchValidationResults()
+    stages = options.stages
+
+    try:
+        ctx = utils.get_context(_get_input(doc))
+
+        if STAGE_XML in stages:
+            results.xml_results = sdv.validate_xml(
+                ctx,
+                version=options.version,
+                schemas=options.schemas,
+                schemaloc=options.schemaloc
+            )
+
+            if not results.xml_results.is_valid:
+                return results
+
+        if STAGE_BEST_PRACTICES in stages:
+            results.best_practice_results = sdv.validate_best_practices(
+                ctx,
+                version=options.version
+            )
+
+        if STAGE_PROFILE in stages:
+            results.profile_results = sdv.validate_profile(
+                ctx,
+                profile=options.profile
+            )
+    except Exception as ex:
+        results.error = ex
+
+    return results
+
+
+def _warm(options):
+    """Builds the validators required by `options` so that the cost of
+    doing so is not paid while validating the first document.
+
+    The bundled schema validators are built, which loads the schema
+    locations for each version. If no version is set in `options`, the
+    document versions are not known ahead of time and this is done for
+    every bundled version. The ``etree.XMLSchema`` objects are not compiled
+    here, since the schemas each document imports are not known until it is
+    parsed. The STIX Profile validator is compiled.
+
+    Note:
+        Errors raised here are ignored. The same errors are raised again
+        and recorded in the results when the documents are validated.
+
+    """
+    klasses = (
+        validators.STIXSchemaValidator,
+        validators.CyboxSchemaValidator
+    )
+
+    with utils.ignored(Exception):
+        if STAGE_XML in options.stages and not options.schemaloc:
+            for klass in klasses:
+                validator = sdv._get_xml_validator(klass, options.schemas)
+
+                if options.version is None:
+                    validator.preload()
+                elif options.version in klass._SCHEMAS:
+                    validator.preload([options.version])
+
+        if STAGE_PROFILE in options.stages:
+            sdv._get_profile_validator(options.profile)
+
+
+# The function, options and extra arguments for the current worker process.
+# Set by _init_worker().
+_WORKER_FUNC = None
+_WORKER_OPTIONS = None
+_WORKER_ARGS = ()
+
+
+def _init_worker(func, options, args, initializer=None):
+    """Initializes a worker process in the validation pool.
+
+    If `initializer` is not ``None``, ``initializer(*args)`` is called before
+    the validators are built.
+
+    This is the only place validators are built ahead of time. In the
+    current process, they are built on first use.
+
+    """
+    global _WORKER_FUNC, _WORKER_OPTIONS, _WORKER_ARGS
+    _WORKER_FUNC = func
+    _WORKER_OPTIONS = options
+    _WORKER_ARGS = args
+
+    if initializer is not None:
+        initializer(*args)
+
+    _warm(options)
+
+
+def _map_worker(task):
+    """Calls the worker function on a single ``(index, doc)`` task in a
+    worker process.
+
+    """
+    index, doc = task
+    return index, _WORKER_FUNC(doc, *_WORKER_ARGS)
+
+
+def _validate_doc(doc, options):
+    """Performs the validation stages in `options` on `doc`, making sure the
+    results can be sent back from a worker process.
+
+    """
+    results = _validate(doc, options)
+
+    # Not every exception can be pickled and sent back to the parent process.
+    if results.error is not None:
+        try:
+            pickle.dumps(results.error)
+        except Exception:
+            results.error = errors.ValidationError(str(results.error))
+
+    return results
+
+
+def _iter_serial(func, docs, args):
+    for index, doc in enumerate(docs):
+        yield index, doc, func(doc, *args)
+
+
+def _iter_pool(func, docs, options, args, workers, chunksize, initializer):
+    # The pool reads tasks in its own thread, as fast as it can. Each task
+    # takes a slot, which is given back once its result is yielded, so only
+    # two chunks per worker are read ahead of the results.
+    window = 2 * workers * chunksize
+    slots = threading.Semaphore(window)
+    stopped = threading.Event()
+    filenames = {}
+
+    def tasks():
+        for index, doc in enumerate(docs):
+            slots.acquire()
+
+            if stopped.is_set():
+                return
+
+            filenames[index] = _get_filename(doc)
+            yield index, _serialize(doc)
+
+    pool = multiprocessing.Pool(
+        processes=workers,
+        initializer=_init_worker,
+        initargs=(func, options, args, initializer)
+    )
+
+    try:
+        imap = pool.imap_unordered(_map_worker, tasks(), chunksize)
+
+        for index, result in imap:
+            slots.release()
+            yield index, filenames.pop(index), result
+
+        pool.close()
+    finally:
+        # Unblock the task reader if the results were not all consumed.
+        stopped.set()
+
+        for _ in range(window):
+            slots.release()
+
+        pool.terminate()
+        pool.join()
+
+
+def map_many(func, docs, options, workers=None, chunksize=1, args=(),
+             initializer=None):
+    """Calls ``func(doc, *args)`` for each document in `docs`. When
+    validating in a process pool, each worker builds the validators
+    required by `options` before it receives any documents.
+
+    This is the shared machinery behind :func:`validate_many`. It lets
+    callers which perform their own validation stages reuse its process pool
+    and validator warm-up.
+
+    Args:
+        func: A module-level function which validates a single document.
+        docs: An iterable of documents.
+        options: An instance of :class:`BatchOptions` describing the
+            validators each worker process builds ahead of time.
+        workers: The number of worker processes to validate with.
+        chunksize: The number of documents sent to a worker process at a
+            time.
+        args: Extra arguments passed to `func`. These must be picklable if
+            `workers` is greater than one.
+        initializer: A module-level function called as
+            ``initializer(*args)`` once in each worker process, before it
+            receives any documents. It is not called when validating in the
+            current process.
+
+    Returns:
+        An iterator of ``(index, doc, result)`` tuples, where ``result`` is
+        the value returned by `func`. When validating in a process pool,
+        the tuples are yielded in the order they complete, ``result`` must
+        be picklable and ``doc`` is the filename of the document or
+        ``None``. At most two chunks per worker are read from `docs` ahead
+        of the results that have been consumed.
+
+    """
+    args = tuple(args)
+
+    if workers is None or workers <= 1:
+        return _iter_serial(func, docs, args)
+
+    return _iter_pool(
+        func, docs, options, args, workers, chunksize, initializer
+    )
+
+
+def _attach(items):
+    for index, doc, results in items:
+        results.doc = doc
+        results.index = index
+        yield results
+
+
+def validate_many(docs, options, workers=None, chunksize=1):
+    """Validates each document in `docs` according to `options`.
+
+    See :func:`sdv.validate_many` for details.
+
+    Args:
+        docs: An iterable of documents.
+        options: An instance of :class:`BatchOptions`.
+        workers: The number of worker processes to validate with.
+        chunksize: The number of documents sent to a worker process at a
+            time.
+
+    Returns:
+        An iterator of :class:`BatchValidationResults` instances.
+
+    Raises:
+        ValueError: If `options` contains invalid values.
+
+    """
+    _check_options(options)
+
+    if workers is None or workers <= 1:
+        func = _validate
+    else:
+        func = _validate_doc
+
+    items = map_many(func, docs, options, workers, chunksize, (options,))
+    return _attach(items)
+
+
+__all__ = [
+    'BatchValidationResults',
+    'BatchOptions',
+    'STAGES'
+]
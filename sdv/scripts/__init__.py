@@ -4,20 +4,34 @@
 # builtin
 import sys
 import json
+import pickle
 import collections
 
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
 # external
 import lxml.etree
 from mixbox.vendor.six import iteritems, itervalues
 
 # internal
 import sdv
+import sdv.batch as batch
 import sdv.codes as codes
 import sdv.utils as utils
 import sdv.validators.base as base
 
 _QUIET = False
 
+# A list which collects info() messages instead of printing them. This is
+# used by worker processes so that messages can be printed in input order.
+_INFO_BUFFER = None
+
+# The maximum number of files sent to a worker process at a time.
+MAX_CHUNKSIZE = 64
+
 class ValidationOptions(object):
     """Collection of validation options which can be set via command line.
 
@@ -32,6 +46,12 @@ class ValidationOptions(object):
         profile_validate: True if profile validation should be performed.
         best_practice_validate: True if STIX best practice validation should
             be performed.
+        best_practice_rules: A list of the best practice rules to check. If
+            ``None``, all applicable rules are checked.
+        best_practice_skip: A list of best practice rules which should not
+            be checked.
+        profile_rules: True if the cost of each best practice rule should be
+            recorded and reported.
         json_results: True if results should be printed in JSON format.
         quiet_output: True if only results and fatal errors should be printed
             to stdout/stderr.
@@ -39,6 +59,7 @@ class ValidationOptions(object):
             validated.
         in_profile: A filename/path for a STIX Profile to validate against.
         recursive: Recursively descend into input directories.
+        jobs: The number of processes used to validate input files.
 
     """
     def __init__(self):
@@ -49,6 +70,9 @@ class ValidationOptions(object):
         self.lang_version = None
         self.profile_validate = False
         self.best_practice_validate = False
+        self.best_practice_rules = None
+        self.best_practice_skip = None
+        self.profile_rules = False
 
         # Classes
         self.xml_validation_class = None
@@ -65,6 +89,9 @@ class ValidationOptions(object):
         self.recursive = False
         self.huge_tree = False
 
+        # execution options
+        self.jobs = 1
+
 
 class ValidationResults(object):
     """Stores validation results for given file.
@@ -183,7 +210,12 @@ def info(msg):
     if _QUIET:
         return
 
-    print("[-] %s" % msg)
+    msg = "[-] %s" % msg
+
+    if _INFO_BUFFER is not None:
+        _INFO_BUFFER.append(msg)
+    else:
+        print(msg)
 
 
 def print_level(fmt, level, *args):
@@ -261,9 +293,28 @@ def print_best_practice_results(results, level=0):
             if warning is not collection[-1]:
                 print_level("-"*80, level)
 
+    def print_timings(results, level):
+        print_level("[-] Rule timings (walk: %.6fs)", level, results.walk_time)
+
+        for timing in results.timings:
+            # Rules which find their own nodes do not report a node count.
+            nodes = "-" if timing.nodes is None else timing.nodes
+
+            print_level(
+                "[-] %s: %.6fs, %s nodes, %s warnings",
+                level+1,
+                timing.rule,
+                timing.seconds,
+                nodes,
+                timing.warnings
+            )
+
     marker = "+" if results.is_valid else "!"
     print_level("[%s] Best Practices: %s", level, marker, results.is_valid)
 
+    if results.timings is not None:
+        print_timings(results, level+1)
+
     if results.is_valid:
         return
 
@@ -349,28 +400,26 @@ def print_results(results, options):
             print_fatal_results(result.fatal, level)
 
 
-def profile_validate(fn, options):
-    """Performs STIX Profile validation against the input filename.
+def profile_validate(doc, options):
+    """Performs STIX Profile validation against the input document.
     Args:
-        fn: A filename for a STIX document
+        doc: A ``ValidationContext`` for a STIX document
     Returns:
         A dictionary of validation results
     """
-    info("Performing profile validation on %s" % fn)
-
     results = sdv.validate_profile(
-        fn,
+        doc,
         profile=options.in_profile
     )
 
     return results
 
 
-def schema_validate(fn, options):
-    """Performs STIX/CybOX XML Schema validation against the input filename.
+def schema_validate(doc, options):
+    """Performs STIX/CybOX XML Schema validation against the input document.
 
     Args:
-        fn: A filename for a STIX/CybOX XML document
+        doc: A ``ValidationContext`` for a STIX/CybOX XML document
         options: ValidationOptions instance with validation options for this
             validation run.
 
@@ -378,10 +427,8 @@ def schema_validate(fn, options):
         A dictionary of validation results
 
     """
-    info("Performing xml schema validation on %s" % fn)
-
     results = sdv.validate_xml(
-        fn,
+        doc,
         version=options.lang_version,
         schemas=options.schema_dir,
         schemaloc=options.use_schemaloc,
@@ -394,12 +441,11 @@ def schema_validate(fn, options):
     return results
 
 
-def best_practice_validate(fn, options):
-    """Performs STIX Best Practice validation against the input filename.
+def best_practice_validate(doc, options):
+    """Performs STIX Best Practice validation against the input document.
 
     Args:
-        validator: An instance of STIXBestPracticeValidator
-        fn: A filename for a STIX document
+        doc: A ``ValidationContext`` for a STIX document
         options: ValidationOptions instance with validation options for
             this validation run.
 
@@ -407,11 +453,12 @@ def best_practice_validate(fn, options):
         A dictionary of validation results
 
     """
-    info("Performing best practice validation on %s" % fn)
-
     results = sdv.validate_best_practices(
-        doc=fn,
-        version=options.lang_version
+        doc=doc,
+        version=options.lang_version,
+        rules=options.best_practice_rules,
+        exclude=options.best_practice_skip,
+        profile_rules=options.profile_rules
     )
 
     return results
@@ -421,6 +468,9 @@ def validate_file(fn, options):
     """Validates the input document `fn` with the validators that are passed
     in.
 
+    The input document is parsed once and the resulting ``ValidationContext``
+    is shared by each validation stage.
+
     Profile and/or Best Practice validation will only occur if `fn` is
     schema-valid.
 
@@ -428,10 +478,7 @@ def validate_file(fn, options):
     will take place.
 
     Args:
-        schema_validator: An instance of STIXSchemaValidator (optional)
-        profile_validator: An instance of STIXProfileValidator (optional)
-        best_practice_validator: An instance of STIXBestPracticeValidator
-            (optional).
+        fn: A filename for a STIX/CybOX XML document.
         options: An instance of ValidationOptions.
 
     Returns:
@@ -441,12 +488,17 @@ def validate_file(fn, options):
     results = ValidationResults(fn)
 
     try:
+        doc = utils.ValidationContext(fn)
+
         if options.schema_validate:
-            results.schema_results = schema_validate(fn, options)
+            info("Performing xml schema validation on %s" % fn)
+            results.schema_results = schema_validate(doc, options)
         if options.best_practice_validate:
-            results.best_practice_results = best_practice_validate(fn, options)
+            info("Performing best practice validation on %s" % fn)
+            results.best_practice_results = best_practice_validate(doc, options)
         if options.profile_validate:
-            results.profile_results = profile_validate(fn, options)
+            info("Performing profile validation on %s" % fn)
+            results.profile_results = profile_validate(doc, options)
     except SchemaInvalidError as ex:
         results.schema_results = ex.results
         if options.profile_validate or options.best_practice_validate:
@@ -480,9 +532,124 @@ def _set_huge_tree_parser():
     utils.set_xml_parser(parser)
 
 
+def _get_batch_options(options):
+    """Returns the :class:`.BatchOptions` which describe the validators
+    needed by `options`. These are built by each worker process before it
+    receives any files.
+
+    """
+    stages = []
+
+    if options.schema_validate:
+        stages.append(batch.STAGE_XML)
+    if options.best_practice_validate:
+        stages.append(batch.STAGE_BEST_PRACTICES)
+    if options.profile_validate:
+        stages.append(batch.STAGE_PROFILE)
+
+    return batch.BatchOptions(
+        stages=tuple(stages),
+        version=options.lang_version,
+        schemas=options.schema_dir,
+        schemaloc=options.use_schemaloc,
+        profile=options.in_profile
+    )
+
+
+def _init_validate_worker(options):
+    """Applies the process-wide settings in `options` to a worker process.
+    Called once per worker, before it validates any files.
+
+    """
+    if options.huge_tree:
+        _set_huge_tree_parser()
+
+    set_output_level(options)
+
+
+def _validate_worker(fn, options):
+    """Validates `fn` in a worker process.
+
+    Returns:
+        A tuple containing the ``ValidationResults`` for `fn` and a list of
+        the info() messages produced while validating it.
+
+    """
+    global _INFO_BUFFER
+    _INFO_BUFFER = []
+
+    try:
+        results = validate_file(fn, options)
+        messages = _INFO_BUFFER
+    finally:
+        _INFO_BUFFER = None
+
+    # Not every exception can be pickled and sent back to the parent process.
+    if results.fatal is not None:
+        try:
+            pickle.dumps(results.fatal.exception)
+        except Exception:
+            results.fatal.exception = None
+
+    return results, messages
+
+
+def _get_chunksize(files, jobs):
+    """Returns the number of files to send to a worker process at a time.
+
+    Files are split into roughly four chunks per worker, which amortizes the
+    cost of dispatching work while still balancing uneven file sizes.
+
+    """
+    chunksize = len(files) // (jobs * 4)
+    return max(1, min(chunksize, MAX_CHUNKSIZE))
+
+
+def _run_pool(files, options):
+    """Validates `files` using a pool of ``options.jobs`` worker processes.
+
+    Results are collected in input order, so the output is the same as a
+    sequential validation run.
+
+    """
+    results = OrderedDict()
+    pending = {}
+    next_index = 0
+
+    items = batch.map_many(
+        _validate_worker,
+        files,
+        options=_get_batch_options(options),
+        workers=options.jobs,
+        chunksize=_get_chunksize(files, options.jobs),
+        args=(options,),
+        initializer=_init_validate_worker
+    )
+
+    # Files complete out of order. Hold on to each one until every file
+    # before it has been collected.
+    for index, fn, result in items:
+        pending[index] = (fn, result)
+
+        while next_index in pending:
+            fn, (result, messages) = pending.pop(next_index)
+            next_index += 1
+
+            for msg in messages:
+                print(msg)
+
+            results[fn] = result
+
+    return results
+
+
 def run_validation(options):
     """Validates files based on command line options.
 
+    If ``options.jobs`` is greater than one, files are validated in a pool of
+    worker processes. Each worker builds its validators before it receives
+    any files.
+
     Args:
         options: An instance of ``ValidationOptions`` containing options for
             this validation run.
@@ -494,7 +661,10 @@ def run_validation(options):
     # The XML files to validate
     files = utils.get_xml_files(options.in_files, options.recursive)
 
-    results = {}
+    if options.jobs > 1 and len(files) > 1:
+        return _run_pool(files, options)
+
+    results = OrderedDict()
     for fn in files:
         results[fn] = validate_file(fn, options)
 
@@ -58,6 +58,7 @@ def _set_validation_options(args):
     options.recursive = args.recursive
     options.use_schemaloc = args.use_schemaloc
     options.huge_tree = args.huge_tree
+    options.jobs = args.jobs
 
     # output options
     options.json_results = args.json
@@ -90,6 +91,9 @@ def _validate_args(args):
             "Cannot set both --cybox-version and --use-schemalocs"
         )
 
+    if args.jobs < 1:
+        raise scripts.ArgumentError("--jobs must be a positive integer")
+
 
 def _get_arg_parser():
     """Initializes and returns an argparse.ArgumentParser instance for this
@@ -158,6 +162,15 @@ def _get_arg_parser():
         help="Disable libxml2 security restrictions on XML document size."
     )
 
+    parser.add_argument(
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=1,
+        help="The number of processes used to validate input files. "
+             "Defaults to 1."
+    )
+
     parser.add_argument(
         "files",
         metavar="FILES",
@@ -62,6 +62,9 @@ def _set_validation_options(args):
 
     # best practice options
     options.best_practice_validate = args.best_practices
+    options.best_practice_rules = _get_rule_names(args.best_practice_rules)
+    options.best_practice_skip = _get_rule_names(args.best_practice_skip)
+    options.profile_rules = args.profile_rules
 
     # input options
     options.lang_version = args.lang_version
@@ -71,6 +74,7 @@ def _set_validation_options(args):
     options.recursive = args.recursive
     options.use_schemaloc = args.use_schemaloc
     options.huge_tree = args.huge_tree
+    options.jobs = args.jobs
 
     # output options
     options.json_results = args.json
@@ -81,6 +85,16 @@ def _set_validation_options(args):
 
     return options
 
+def _get_rule_names(value):
+    """Returns a list of best practice rule names from the comma-separated
+    `value` or ``None`` if `value` is ``None``.
+
+    """
+    if value is None:
+        return None
+
+    return [x.strip() for x in value.split(",") if x.strip()]
+
 def _validate_args(args):
     """Checks that valid and compatible command line arguments were passed into
     the application.
@@ -111,6 +125,32 @@ def _validate_args(args):
             "Cannot set both --stix-version and --use-schemalocs"
         )
 
+    if args.jobs < 1:
+        raise scripts.ArgumentError("--jobs must be a positive integer")
+
+    rule_args = (args.best_practice_rules, args.best_practice_skip)
+
+    if any(x is not None for x in rule_args) and not args.best_practices:
+        raise scripts.ArgumentError(
+            "--best-practices-rules and --best-practices-skip require "
+            "--best-practices"
+        )
+
+    if args.profile_rules and not args.best_practices:
+        raise scripts.ArgumentError(
+            "--profile-rules requires --best-practices"
+        )
+
+    for value in rule_args:
+        if value is None:
+            continue
+
+        try:
+            klass = validators.STIXBestPracticeValidator
+            klass.find_rules(_get_rule_names(value))
+        except ValueError as ex:
+            raise scripts.ArgumentError(str(ex))
+
     if args.profile and not profile_validate:
         raise scripts.ArgumentError(
             "Profile specified but no validation options specified."
@@ -159,6 +199,34 @@ def _get_arg_parser():
         help="Check that the document follows authoring best practices."
     )
 
+    parser.add_argument(
+        "--best-practices-rules",
+        dest="best_practice_rules",
+        default=None,
+        metavar="RULES",
+        help="A comma-separated list of the best practice rules to check. "
+             "Rules are named by their results heading (e.g., 'Unresolved "
+             "IDREFs') or method name. Requires --best-practices."
+    )
+
+    parser.add_argument(
+        "--best-practices-skip",
+        dest="best_practice_skip",
+        default=None,
+        metavar="RULES",
+        help="A comma-separated list of best practice rules which should "
+             "not be checked. Requires --best-practices."
+    )
+
+    parser.add_argument(
+        "--profile-rules",
+        dest="profile_rules",
+        action="store_true",
+        default=False,
+        help="Report the time spent, nodes inspected and warnings emitted "
+             "by each best practice rule. Requires --best-practices."
+    )
+
     parser.add_argument(
         "--profile",
         dest="profile",
@@ -198,6 +266,15 @@ def _get_arg_parser():
         help="Disable libxml2 security restrictions on XML document size."
     )
 
+    parser.add_argument(
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=1,
+        help="The number of processes used to validate input files. "
+             "Defaults to 1."
+    )
+
     parser.add_argument(
         "files",
         metavar="FILES",
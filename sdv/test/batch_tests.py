@@ -0,0 +1,184 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import pickle
+import unittest
+from mixbox.vendor.six import BytesIO, StringIO
+
+import sdv
+import sdv.batch as batch
+from sdv import utils, validators
+
+STIX_VALID_XML = \
+b"""<stix:STIX_Package
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    xmlns:example="http://example.com/"
+    id="example:Package-1" version="1.2"
+    timestamp="2014-05-08T09:00:00.000000Z">
+    <stix:STIX_Header>
+        <stix:Title>Valid STIX</stix:Title>
+    </stix:STIX_Header>
+</stix:STIX_Package>
+"""
+
+STIX_INVALID_XML = \
+b"""<stix:STIX_Package
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    version="1.2">
+    <stix:STIX_Header>
+        <stix:INVALID>Invalid STIX</stix:INVALID>
+    </stix:STIX_Header>
+</stix:STIX_Package>
+"""
+
+
+# Set in worker processes by _init_value().
+_VALUE = None
+
+
+def _init_value(value):
+    global _VALUE
+    _VALUE = value
+
+
+def _get_value(doc, value):
+    return _VALUE
+
+
+class BatchValidationTests(unittest.TestCase):
+    def _validate(self, docs, **kwargs):
+        results = sdv.validate_many(docs, **kwargs)
+        return sorted(results, key=lambda x: x.index)
+
+    def test_serial(self):
+        docs = [
+            StringIO(STIX_VALID_XML.decode('utf-8')),
+            STIX_INVALID_XML,
+            "DOES NOT EXIST.xml"
+        ]
+
+        results = self._validate(docs)
+        self.assertEqual([0, 1, 2], [x.index for x in results])
+        self.assertTrue(all(x.doc is y for x, y in zip(results, docs)))
+
+        self.assertTrue(results[0].is_valid)
+        self.assertFalse(results[1].is_valid)
+        self.assertFalse(results[1].xml_results.is_valid)
+        self.assertFalse(results[2].is_valid)
+        self.assertTrue(results[2].error is not None)
+
+    def test_skip_invalid(self):
+        stages = (batch.STAGE_XML, batch.STAGE_BEST_PRACTICES)
+        results = self._validate([STIX_VALID_XML, STIX_INVALID_XML], stages=stages)
+
+        self.assertTrue(results[0].best_practice_results is not None)
+        self.assertTrue(results[1].best_practice_results is None)
+
+    def test_pool(self):
+        stages = (batch.STAGE_XML, batch.STAGE_BEST_PRACTICES)
+        docs = [STIX_VALID_XML, STIX_INVALID_XML] * 2
+
+        serial = self._validate(docs, stages=stages)
+        pooled = self._validate(docs, stages=stages, workers=2)
+
+        self.assertEqual(
+            [x.as_dict() for x in serial],
+            [x.as_dict() for x in pooled]
+        )
+
+    def test_pool_docs(self):
+        docs = [STIX_VALID_XML, "DOES NOT EXIST.xml"]
+        results = self._validate(docs, workers=2)
+
+        # Only filenames are kept for documents sent to a worker process.
+        self.assertEqual([None, docs[1]], [x.doc for x in results])
+
+    def test_pool_window(self):
+        read = []
+
+        def docs():
+            for _ in range(100):
+                read.append(None)
+                yield STIX_VALID_XML
+
+        options = batch.BatchOptions(
+            stages=(batch.STAGE_XML,),
+            version=None,
+            schemas=None,
+            schemaloc=False,
+            profile=None
+        )
+
+        items = batch.map_many(
+            batch._validate_doc, docs(), options, workers=2, args=(options,)
+        )
+        next(items)
+
+        # Two chunks per worker, the slot freed by the first result and the
+        # document waiting for a slot.
+        self.assertTrue(len(read) <= 6)
+        items.close()
+
+    def test_pool_initializer(self):
+        options = batch.BatchOptions(
+            stages=(),
+            version=None,
+            schemas=None,
+            schemaloc=False,
+            profile=None
+        )
+
+        items = batch.map_many(
+            _get_value, ['a', 'b', 'c'], options, workers=2, args=('set',),
+            initializer=_init_value
+        )
+
+        self.assertEqual(['set'] * 3, [x[2] for x in items])
+        self.assertEqual(None, _VALUE)
+
+    def test_warm(self):
+        options = batch.BatchOptions(
+            stages=(batch.STAGE_XML,),
+            version=None,
+            schemas=None,
+            schemaloc=False,
+            profile=None
+        )
+        batch._warm(options)
+
+        klasses = (
+            validators.STIXSchemaValidator,
+            validators.CyboxSchemaValidator
+        )
+
+        # Without a version, every bundled version is built.
+        for klass in klasses:
+            validator = sdv._get_xml_validator(klass)
+            built = set(validator._xml_validators)
+            self.assertTrue(set(klass._SCHEMAS) <= built)
+
+    def test_context(self):
+        stages = (batch.STAGE_XML, batch.STAGE_BEST_PRACTICES)
+        ctx = utils.ValidationContext(BytesIO(STIX_VALID_XML))
+        results = self._validate([ctx], stages=stages)
+
+        # The namespaces found by XML Schema validation are kept on ctx.
+        self.assertTrue(results[0].doc is ctx)
+        self.assertTrue(results[0].xml_results.is_valid)
+        self.assertTrue(ctx._namespaces is not None)
+
+    def test_invalid_stages(self):
+        func = sdv.validate_many
+        self.assertRaises(ValueError, func, [], stages=['INVALID'])
+        self.assertRaises(ValueError, func, [], stages=[batch.STAGE_PROFILE])
+
+    def test_pickle(self):
+        stages = (batch.STAGE_BEST_PRACTICES,)
+        results = self._validate([STIX_VALID_XML], stages=stages)[0]
+        copied = pickle.loads(pickle.dumps(results))
+
+        self.assertEqual(results.as_dict(), copied.as_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
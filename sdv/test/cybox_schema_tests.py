@@ -6,6 +6,8 @@ from mixbox.vendor.six import StringIO
 
 import sdv
 import sdv.errors as errors
+from sdv.validators.xml_schema import XmlSchemaValidator
+from sdv.validators.cybox.schema import CyboxSchemaValidator
 
 CYBOX_2_1_XML = \
 """
@@ -93,6 +95,12 @@ class CyboxSchemaTests(unittest.TestCase):
         func = sdv.validate_xml
         self.assertRaises(errors.ValidationError, func, "INVALID XML DOC")
 
+    def test_schemaloc_index(self):
+        for location in CyboxSchemaValidator._SCHEMAS.values():
+            indexed = XmlSchemaValidator(location, use_index=True)
+            walked = XmlSchemaValidator(location, use_cache=False)
+            self.assertEqual(walked._schemalocs, indexed._schemalocs)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,102 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import pickle
+import unittest
+
+from lxml import etree
+
+from sdv.validators import schematron
+
+SCHEMATRON = \
+b"""<schema xmlns="http://purl.oclc.org/dsdl/schematron">
+    <ns prefix="a" uri="urn:a"/>
+    <pattern>
+        <rule context="a:item">
+            <assert test="@id">Item requires an id</assert>
+        </rule>
+        <rule context="item">
+            <report test="@bad">Item is bad</report>
+        </rule>
+    </pattern>
+</schema>
+"""
+
+INSTANCE_XML = \
+b"""<root xmlns:a="urn:a">
+    <a:item id="1"/>
+    <!-- comment -->
+    <a:item/>
+    <group>
+        <item bad="true"/>
+        <item/>
+        <item bad="true"/>
+    </group>
+    <a:item>
+        <a:item/>
+    </a:item>
+</root>
+"""
+
+
+class SchematronValidatorTests(unittest.TestCase):
+    def setUp(self):
+        self.validator = schematron.SchematronValidator(
+            etree.fromstring(SCHEMATRON)
+        )
+        self.root = etree.fromstring(INSTANCE_XML)
+
+    def test_lines(self):
+        results = self.validator.validate(self.root)
+        self.assertFalse(results.is_valid)
+
+        # Lines resolved in a batch must match evaluating each location.
+        for error in results.errors:
+            location = error._xpath_location
+            node = self.root.xpath(location, namespaces=error._error.nsmap)
+            self.assertEqual(node[0].sourceline, error.line)
+
+        lines = [x.line for x in results.errors]
+        self.assertEqual([4, 6, 8, 10, 11], lines)
+
+    def test_no_lines(self):
+        results = self.validator.validate(self.root, resolve_lines=False)
+        self.assertEqual(5, len(results.errors))
+        self.assertTrue(all(x.line is None for x in results.errors))
+
+    def test_unresolved_location(self):
+        resolver = schematron._LineResolver(self.root)
+        location = "/root/group[1]/item[4]"
+        self.assertEqual(None, resolver.get_line(location))
+        self.assertEqual(5, resolver.get_line("/root/group"))
+
+    def test_iter_errors(self):
+        expected = self.validator.validate(self.root).as_dict()['errors']
+        errors = list(self.validator.iter_errors(self.root))
+
+        self.assertEqual(expected, [x.as_dict() for x in errors])
+        self.assertTrue(all(x._error is None for x in errors))
+
+    def test_max_errors(self):
+        results = self.validator.validate(self.root, max_errors=2)
+        self.assertFalse(results.is_valid)
+        self.assertEqual([4, 6], [x.line for x in results.errors])
+
+        errors = self.validator.iter_errors(self.root, max_errors=2)
+        self.assertEqual([4, 6], [x.line for x in errors])
+
+    def test_consume_report(self):
+        report = self.validator._schematron.get_report(self.root)
+        errors = list(schematron.iter_svrl_errors(report, consume=True))
+
+        self.assertEqual(5, len(errors))
+        self.assertEqual(0, len(report.getroot()))
+
+    def test_pickle(self):
+        results = self.validator.validate(self.root)
+        copied = pickle.loads(pickle.dumps(results))
+        self.assertEqual(results.as_dict(), copied.as_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import sdv.batch as batch
+import sdv.scripts as scripts
+import sdv.validators as validators
+
+STIX_VALID_XML = \
+"""<stix:STIX_Package
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    xmlns:example="http://example.com/"
+    id="example:Package-1" version="1.2"
+    timestamp="2014-05-08T09:00:00.000000Z">
+    <stix:STIX_Header>
+        <stix:Title>Valid STIX</stix:Title>
+    </stix:STIX_Header>
+</stix:STIX_Package>
+"""
+
+STIX_INVALID_XML = \
+"""<stix:STIX_Package
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    version="1.2">
+    <stix:STIX_Header>
+        <stix:INVALID>Invalid STIX</stix:INVALID>
+    </stix:STIX_Header>
+</stix:STIX_Package>
+"""
+
+
+class RunValidationTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+        docs = [STIX_VALID_XML, STIX_INVALID_XML, "<malformed"] * 2
+        for idx, doc in enumerate(docs):
+            fn = os.path.join(self.tempdir, "%02d.xml" % idx)
+            with open(fn, "w") as f:
+                f.write(doc)
+
+        self.options = scripts.ValidationOptions()
+        self.options.schema_validate = True
+        self.options.best_practice_validate = True
+        self.options.xml_validation_class = validators.STIXSchemaValidator
+        self.options.in_files = [self.tempdir]
+        self.options.quiet_output = True
+        scripts.set_output_level(self.options)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _summary(self, results):
+        return [
+            (
+                fn,
+                r.schema_results and r.schema_results.as_dict(),
+                r.best_practice_results and r.best_practice_results.as_dict(),
+                r.fatal and r.fatal.as_dict()
+            )
+            for fn, r in results.items()
+        ]
+
+    def test_jobs(self):
+        serial = scripts.run_validation(self.options)
+
+        self.options.jobs = 2
+        pooled = scripts.run_validation(self.options)
+
+        self.assertEqual(6, len(pooled))
+        self.assertEqual(self._summary(serial), self._summary(pooled))
+        self.assertEqual(
+            scripts.status_code(serial),
+            scripts.status_code(pooled)
+        )
+
+    def test_batch_options(self):
+        options = scripts._get_batch_options(self.options)
+        stages = (batch.STAGE_XML, batch.STAGE_BEST_PRACTICES)
+
+        self.assertEqual(stages, options.stages)
+        self.assertEqual(None, options.version)
+        self.assertEqual(None, options.profile)
+
+    def test_chunksize(self):
+        self.assertEqual(1, scripts._get_chunksize(range(3), 4))
+        self.assertEqual(5, scripts._get_chunksize(range(40), 2))
+        self.assertEqual(
+            scripts.MAX_CHUNKSIZE,
+            scripts._get_chunksize(range(100000), 2)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -285,6 +285,20 @@ class BestPracticeTimestampTests(unittest.TestCase):
 
         self.assertTrue(resolves)
 
+    def test_ts_memo(self):
+        ctx = utils.ValidationContext(StringIO(TS_RESOLVES_XML))
+        timestamp = "2015-04-14T15:24:19.416203+00:00"
+
+        common.idref_timestamp_resolves(
+            root=ctx,
+            idref="example:campaign-1",
+            timestamp=timestamp,
+            namespaces=common.get_stix_namespaces('1.1.1')
+        )
+
+        # Parsed timestamps are kept on the context, not shared globally.
+        self.assertTrue(timestamp in ctx.timestamps)
+
     def test_ts_not_resolves(self):
         sio = StringIO(TS_DOES_NOT_RESOLVE)
 
@@ -320,6 +334,69 @@ class BestPracticeTimestampTests(unittest.TestCase):
         self.assertTrue(zulu_resolves)
         self.assertTrue(offset_resolves)
 
+    def test_ts_resolves_context(self):
+        ctx = utils.ValidationContext(StringIO(TS_RESOLVES_XML))
+        namespaces = common.get_stix_namespaces('1.1.1')
+
+        resolves = common.idref_timestamp_resolves(
+            root=ctx,
+            idref="example:campaign-1",
+            timestamp="2015-04-14T15:24:19.416203+00:00",
+            namespaces=namespaces
+        )
+
+        unknown = common.idref_timestamp_resolves(
+            root=ctx,
+            idref="example:campaign-2",
+            timestamp="2015-04-14T15:24:19.416203+00:00",
+            namespaces=namespaces
+        )
+
+        self.assertTrue(resolves)
+        self.assertEqual(unknown, False)
+        self.assertTrue("example:campaign-1" in ctx.ids)
+
+    def test_ts_resolves_element(self):
+        root = utils.get_etree_root(StringIO(TS_RESOLVES_XML))
+
+        # The Campaign is declared outside the subtree of the Indicators.
+        resolves = common.idref_timestamp_resolves(
+            root=root[0],
+            idref="example:campaign-1",
+            timestamp="2015-04-14T15:24:19.416203+00:00",
+            namespaces=common.get_stix_namespaces('1.1.1')
+        )
+
+        self.assertTrue(resolves)
+
+    def test_id_timestamp_conflicts(self):
+        timestamps = (
+            "2015-01-01T00:00:00Z",
+            "2015-01-01T01:00:00+01:00",
+            "2015-01-01T00:00:00",
+            None,
+            "2015-01-02T00:00:00Z",
+            "2015-01-01T00:00:00",
+            None,
+        )
+
+        nodes = []
+        for idx, timestamp in enumerate(timestamps):
+            node = etree.Element("test", id="example:test-1", idx=str(idx))
+
+            if timestamp:
+                node.attrib['timestamp'] = timestamp
+
+            nodes.append(node)
+
+        validator = bp.STIXBestPracticeValidator()
+        warnings = validator._get_id_timestamp_conflicts(nodes)
+
+        # Conflicts are reported starting with the group whose last node
+        # appears latest in the input.
+        found = [int(x._node.attrib['idx']) for x in warnings]
+        self.assertEqual([3, 6, 2, 5, 0, 1], found)
+
     def test_id_pattern(self):
         pattern = bp.ID_PATTERN
 
@@ -343,5 +420,254 @@ class BestPracticeTimestampTests(unittest.TestCase):
             self.assertEqual(None, pattern.match(s))
 
 
+WALKER_XML = \
+"""<stix:STIX_Package
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    xmlns:stixCommon="http://stix.mitre.org/common-1"
+    xmlns:indicator="http://stix.mitre.org/Indicator-2"
+    xmlns:other="http://example.com/other"
+    version="1.2">
+    <stix:STIX_Header>
+        <stix:Title>Header Title</stix:Title>
+    </stix:STIX_Header>
+    <stix:Indicators>
+        <stix:Indicator id="example:indicator-1">
+            <indicator:Title>Indicator Title</indicator:Title>
+            <indicator:Description>Description</indicator:Description>
+        </stix:Indicator>
+        <stix:Indicator idref="example:indicator-1"/>
+    </stix:Indicators>
+    <other:Title/>
+    <other:Description/>
+</stix:STIX_Package>
+"""
+
+
+DUPLICATE_IDS_XML = \
+"""<stix:STIX_Package
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    xmlns:other="http://example.com/other"
+    version="1.2">
+    <other:Thing id="example:indicator-2"/>
+    <stix:Indicators>
+        <stix:Indicator id="example:indicator-1"/>
+        <stix:Indicator id="example:indicator-2"/>
+        <stix:Indicator id="example:indicator-1"/>
+        <stix:Indicator id="example:indicator-2"/>
+    </stix:Indicators>
+</stix:STIX_Package>
+"""
+
+
+class IdIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.ctx = utils.ValidationContext(StringIO(WALKER_XML))
+        self.namespaces = common.get_stix_namespaces('1.2')
+
+    def test_get_observable(self):
+        tag = "{%s}Observable" % self.namespaces[common.PREFIX_CYBOX_CORE]
+        obs = etree.Element(tag, idref="example:indicator-1")
+
+        # The idref resolves to an Indicator rather than an Observable.
+        self.assertRaises(
+            errors.IdrefLookupError,
+            common._get_observable, self.ctx, obs, self.namespaces
+        )
+
+    def test_indicator_observables_element(self):
+        root = utils.get_etree_root(StringIO(BP_INVALID_XML))
+        xpath = "//*[stix-indicator:Observable/@idref]"
+        indicator = root.xpath(xpath, namespaces=self.namespaces)[0]
+
+        # The referenced Observable is declared outside the Indicator.
+        observables = common.get_indicator_observables(
+            indicator, indicator, self.namespaces
+        )
+
+        self.assertEqual(1, len(observables))
+        self.assertTrue('idref' not in observables[0].attrib)
+
+    def test_observable_index(self):
+        ctx = utils.ValidationContext(StringIO(BP_INVALID_XML))
+        index = common.get_observable_index(ctx, self.namespaces)
+        obs_id = "example:Observable-12c760ba-cd2c-4f5d-a37d-18212eac7929"
+
+        self.assertTrue(
+            index is common.get_observable_index(ctx, self.namespaces)
+        )
+        self.assertEqual("Observable", utils.localname(index[obs_id]))
+
+        xpath = "//*[stix-indicator:Observable/@idref]"
+        indicator = ctx.root.xpath(xpath, namespaces=self.namespaces)[0]
+        observables = common.get_indicator_observables(
+            ctx, indicator, self.namespaces, index=index
+        )
+        self.assertEqual([index[obs_id]], observables)
+
+        # Elements are resolved against the whole document.
+        index = common.get_observable_index(indicator, self.namespaces)
+        self.assertEqual("Observable", utils.localname(index[obs_id]))
+
+    def test_unresolved_idrefs(self):
+        results = sdv.validate_best_practices(self.ctx)
+        names = [x.name for x in results]
+        self.assertTrue("Unresolved IDREFs" not in names)
+        self.assertTrue("Duplicate IDs" not in names)
+
+    def test_duplicate_ids_order(self):
+        ctx = utils.ValidationContext(StringIO(DUPLICATE_IDS_XML))
+        validator = bp.STIXBestPracticeValidator()
+        warnings = validator._check_1_2_duplicate_ids(
+            ctx, self.namespaces, '1.2', None
+        )
+
+        # The element in another namespace is not checked and does not
+        # affect the order of the groups.
+        ids = [x['id'] for x in warnings]
+        expected = ["example:indicator-1"] * 2 + ["example:indicator-2"] * 2
+        self.assertEqual(expected, ids)
+
+    def test_get_xpath(self):
+        xpath = ".//%s:Observable" % common.PREFIX_STIX_INDICATOR
+        compiled = common.get_xpath(xpath, self.namespaces)
+
+        self.assertTrue(compiled is common.get_xpath(xpath, dict(self.namespaces)))
+
+        namespaces = dict(self.namespaces)
+        namespaces[common.PREFIX_STIX_INDICATOR] = "http://example.com/"
+        self.assertTrue(compiled is not common.get_xpath(xpath, namespaces))
+        root = utils.get_etree_root(StringIO(BP_INVALID_XML))
+        self.assertEqual(3, len(compiled(root)))
+
+
+class TreeWalkerTests(unittest.TestCase):
+    def setUp(self):
+        self.root = utils.get_etree_root(StringIO(WALKER_XML))
+        self.namespaces = common.get_stix_namespaces('1.2')
+
+    def _walk(self, *selectors):
+        @bp.rule('1.0', match=selectors)
+        def func(self, ctx, namespaces, version, nodes):
+            pass
+
+        walker = bp._TreeWalker([func], self.namespaces)
+        nodes = walker.walk(self.root)[func]
+        return [utils.localname(x) for x in nodes]
+
+    def test_tag(self):
+        nodes = self._walk("stix-core:Indicator")
+        self.assertEqual(["Indicator", "Indicator"], nodes)
+
+    def test_path(self):
+        nodes = self._walk("stix-core:STIX_Header/stix-core:Title")
+        self.assertEqual(["Title"], nodes)
+
+    def test_localname(self):
+        nodes = self._walk("*:Description")
+        self.assertEqual(["Description", "Description"], nodes)
+
+    def test_attribute(self):
+        nodes = self._walk("@idref")
+        self.assertEqual(["Indicator"], nodes)
+
+    def test_document_order(self):
+        # Nodes matching more than one selector are only returned once.
+        nodes = self._walk("@id", "@idref", "stix-indicator:Title", "*:Title")
+        self.assertEqual(["Title", "Indicator", "Title", "Indicator", "Title"], nodes)
+
+    def test_legacy_rules(self):
+        class Validator(bp.STIXBestPracticeValidator):
+            _other = {'other': 'http://example.com/other'}
+
+            @bp.rule('1.0')
+            def _check_xpath(self, root, namespaces, version):
+                results = bp.BestPracticeWarningCollection("XPath")
+                nodes = root.xpath("//other:*", namespaces=self._other)
+                results.extend(bp.BestPracticeWarning(x) for x in nodes)
+                return results
+
+            @bp.rule('1.0', match=("@id",))
+            def _check_walked(self, ctx, namespaces, version, nodes):
+                results = bp.BestPracticeWarningCollection("Walked")
+                results.extend(bp.BestPracticeWarning(x) for x in nodes)
+                return results
+
+        results = Validator().validate(self.root)
+        counts = dict((x.name, len(x)) for x in results)
+        self.assertEqual({"XPath": 2, "Walked": 1}, counts)
+
+
+class RuleSelectionTests(unittest.TestCase):
+    def setUp(self):
+        self.ctx = utils.ValidationContext(StringIO(BP_INVALID_XML))
+        self.klass = bp.STIXBestPracticeValidator
+
+    def test_version_rules(self):
+        names = self.klass.get_rule_names('1.2')
+        self.assertTrue("_check_1_2_titles" in names)
+        self.assertTrue("_check_1_0_titles" not in names)
+
+        names = self.klass.get_rule_names('1.0')
+        self.assertTrue("_check_1_0_titles" in names)
+        self.assertTrue("_check_1_2_titles" not in names)
+
+    def test_rule_subset(self):
+        rules = ["_check_id_presence", "_check_1_2_titles", "Missing Titles"]
+        results = sdv.validate_best_practices(self.ctx, rules=rules)
+
+        # The 1.2 title rule does not apply to this STIX 1.1.1 document.
+        names = [x.name for x in results]
+        self.assertEqual(["Missing IDs", "Missing Titles"], names)
+
+    def test_exclude(self):
+        exclude = ["Missing IDs", "_check_condition_attribute"]
+        results = sdv.validate_best_practices(self.ctx, exclude=exclude)
+        names = [x.name for x in results]
+
+        self.assertTrue("Missing IDs" not in names)
+        self.assertTrue("Indicator Suggestions" in names)
+        self.assertTrue(
+            "Indicator Pattern Properties Missing Condition Attributes"
+            not in names
+        )
+
+    def test_rule_names(self):
+        # The name of each collection matches the name of its rule.
+        for func in self.klass.find_rules(self.klass.get_rule_names()):
+            results = sdv.validate_best_practices(
+                self.ctx,
+                rules=[func.__name__]
+            )
+
+            for collection in results:
+                self.assertEqual(func.name, collection.name)
+
+    def test_profile_rules(self):
+        results = sdv.validate_best_practices(self.ctx)
+        self.assertTrue(results.timings is None)
+        self.assertTrue('timings' not in results.as_dict())
+
+        results = sdv.validate_best_practices(self.ctx, profile_rules=True)
+        timings = dict((x.rule, x) for x in results.timings)
+        names = self.klass.get_rule_names('1.1.1')
+
+        self.assertEqual(names, [x.rule for x in results.timings])
+        self.assertTrue(results.walk_time >= 0)
+        self.assertTrue(timings['_check_root_element'].nodes is None)
+
+        timing = timings['_check_id_presence']
+        collection = [x for x in results if x.name == timing.name][0]
+        self.assertEqual(len(collection), timing.warnings)
+        self.assertTrue(timing.nodes >= timing.warnings)
+
+        d = json.loads(json.dumps(results.as_dict()))
+        self.assertEqual(len(names), len(d['timings']['rules']))
+
+    def test_unknown_rule(self):
+        func = sdv.validate_best_practices
+        self.assertRaises(ValueError, func, self.ctx, rules=["INVALID"])
+        self.assertRaises(ValueError, func, self.ctx, exclude=["INVALID"])
+
+
 if __name__ == '__main__':
     unittest.main()
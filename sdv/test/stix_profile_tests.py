@@ -1,13 +1,27 @@
 # Copyright (c) 2015, The MITRE Corporation. All rights reserved.
 # See LICENSE.txt for complete terms.
 
+import os
+import glob
+import shutil
+import tempfile
 import unittest
 from mixbox.vendor.six import StringIO
+from lxml import etree
 
 import sdv
 import sdv.errors as errors
+import sdv.xmlconst as xmlconst
+from sdv.validators import schematron
+from sdv.validators.stix import profile
 from sdv.validators.stix.profile import InstanceMapping
 
+EXAMPLES_DIR = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'examples', 'stix'
+)
+PROFILE = os.path.join(EXAMPLES_DIR, 'Example_STIX_Profile.xlsx')
+PROFILE_INVALID_XML = os.path.join(EXAMPLES_DIR, 'profile_invalid.xml')
+
 STIX_NO_VERSION_XML = \
 """
 <stix:STIX_Package
@@ -20,12 +34,279 @@ STIX_NO_VERSION_XML = \
 </stix:STIX_Package>
 """
 
+STIX_INDICATORS_XML = \
+b"""<stix:STIX_Package
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    xmlns:indicator="http://stix.mitre.org/Indicator-2"
+    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+    version="1.2">
+    <stix:STIX_Header>
+        <stix:Title>Indicators</stix:Title>
+    </stix:STIX_Header>
+    <stix:Indicators>
+        <stix:Indicator xsi:type="indicator:IndicatorType">
+            <indicator:Title>First</indicator:Title>
+        </stix:Indicator>
+        <stix:Indicator id="example:Indicator-2">
+            <indicator:Type>Malware Artifacts</indicator:Type>
+        </stix:Indicator>
+    </stix:Indicators>
+</stix:STIX_Package>
+"""
+
+
 class STIXProfileTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self._environ = os.environ.get('SDV_CACHE_DIR')
+        os.environ['SDV_CACHE_DIR'] = self.tempdir
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+        if self._environ is None:
+            del os.environ['SDV_CACHE_DIR']
+        else:
+            os.environ['SDV_CACHE_DIR'] = self._environ
+
     def test_invalid_profile(self):
         xml = StringIO(STIX_NO_VERSION_XML)
         func = sdv.validate_profile
         self.assertRaises(errors.ProfileParseError, func, xml, "INVALID Profile DOC")
 
+    def test_unknown_engine(self):
+        func = sdv.validate_profile
+        args = (PROFILE_INVALID_XML, PROFILE, "xsl")
+        self.assertRaises(ValueError, func, *args)
+
+        # The engine is checked before the profile is compiled and cached.
+        self.assertEqual([], os.listdir(self.tempdir))
+
+
+class NativeProfileEngineTests(unittest.TestCase):
+    NSMAP = {
+        xmlconst.NS_SAXON: 'saxon',
+        'http://www.w3.org/2001/XMLSchema-instance': 'xsi',
+        'http://stix.mitre.org/stix-1': 'stix',
+        'http://stix.mitre.org/Indicator-2': 'indicator'
+    }
+
+    def _mapping(self, selectors, namespace):
+        mapping = InstanceMapping(self.NSMAP)
+        mapping.label = selectors
+        mapping.selectors = selectors
+        mapping.namespace = namespace
+        return mapping
+
+    def _validate(self, prof, doc):
+        """Returns the XSLT and native engine results for `doc`."""
+        root = etree.fromstring(doc)
+        validator = schematron.SchematronValidator(prof.as_etree())
+        is_valid = validator._schematron.validate(root)
+        report = validator._schematron.validation_report
+        xslt = profile.ProfileValidationResults(is_valid, root, report)
+
+        engine = profile._NativeProfileEngine(prof)
+        is_valid, errors = engine.validate(root)
+        native = profile.ProfileValidationResults(
+            is_valid, root, errors=errors
+        )
+
+        return xslt, native
+
+    def test_examples(self):
+        validator = profile.STIXProfileValidator(PROFILE, use_cache=False)
+
+        for fn in glob.glob(os.path.join(EXAMPLES_DIR, '*.xml')):
+            xslt = validator.validate(fn)
+            native = validator.validate(fn, engine=profile.ENGINE_NATIVE)
+            self.assertEqual(xslt.as_dict(), native.as_dict())
+
+    def test_max_errors(self):
+        validator = profile.STIXProfileValidator(PROFILE, use_cache=False)
+        expected = validator.validate(PROFILE_INVALID_XML).as_dict()
+
+        streamed = validator.iter_errors(PROFILE_INVALID_XML)
+        self.assertEqual(expected['errors'], [x.as_dict() for x in streamed])
+
+        for engine in profile.ENGINES:
+            results = validator.validate(
+                PROFILE_INVALID_XML, engine=engine, max_errors=3
+            )
+
+            self.assertFalse(results.is_valid)
+            self.assertEqual(
+                expected['errors'][:3],
+                [x.as_dict() for x in results.errors]
+            )
+
+    def test_rule_semantics(self):
+        stix = 'http://stix.mitre.org/stix-1'
+        indicator = 'http://stix.mitre.org/Indicator-2'
+
+        # Both contexts select every Indicator, so only the first one is
+        # checked. The xsi:type context is evaluated in its own pattern.
+        package = self._mapping("stix:STIX_Package", stix)
+        first = self._mapping("stix:Indicators/stix:Indicator", indicator)
+        second = self._mapping("stix:Indicator", indicator)
+        typed = self._mapping(
+            "stix:Indicator[@xsi:type='indicator:IndicatorType']", indicator
+        )
+
+        prof = profile.Profile(self.NSMAP)
+        prof.extend([
+            profile.ProhibitedRule("stix:STIX_Header", package),
+            profile.RequiredRule("Title", first),
+            profile.RequiredRule("@id", second),
+            profile.RequiredRule("@id", typed),
+            profile.AllowedValuesRule(
+                "Type", first, required=False, values=["Benign"]
+            )
+        ])
+
+        xslt, native = self._validate(prof, STIX_INDICATORS_XML)
+        self.assertEqual(xslt.as_dict(), native.as_dict())
+        self.assertEqual(4, len(native.errors))
+        self.assertFalse(native.is_valid)
+
+        # Reports are errors but do not invalidate the document.
+        prof = profile.Profile(self.NSMAP)
+        prof.append(profile.ProhibitedRule("stix:STIX_Header", package))
+
+        xslt, native = self._validate(prof, STIX_INDICATORS_XML)
+        self.assertEqual(xslt.as_dict(), native.as_dict())
+        self.assertEqual(1, len(native.errors))
+        self.assertTrue(native.is_valid)
+
+    def test_root_context(self):
+        stix = 'http://stix.mitre.org/stix-1'
+        root = self._mapping("/", stix)
+
+        prof = profile.Profile(self.NSMAP)
+        prof.append(profile.RequiredRule("stix:STIX_Package", root))
+
+        # The root is not a STIX_Package, which fails both the profile's
+        # built-in root rule and the required rule. Errors on the document
+        # node are reported on line -1.
+        doc = b'<stix:Indicator xmlns:stix="http://stix.mitre.org/stix-1"/>'
+        xslt, native = self._validate(prof, doc)
+
+        self.assertEqual(xslt.as_dict(), native.as_dict())
+        self.assertEqual(['-1', '-1'], [x.line for x in native.errors])
+        self.assertFalse(native.is_valid)
+
+
+class ProfileSchematronTests(unittest.TestCase):
+    NSMAP = NativeProfileEngineTests.NSMAP
+    STIX = 'http://stix.mitre.org/stix-1'
+
+    def _mapping(self, selectors):
+        mapping = InstanceMapping(self.NSMAP)
+        mapping.label = selectors
+        mapping.selectors = selectors
+        mapping.namespace = self.STIX
+        return mapping
+
+    def _contexts(self, prof):
+        sch = prof.as_etree()
+        path = "{{{0}}}pattern/{{{0}}}rule".format(xmlconst.NS_SCHEMATRON)
+        rules = sch.iterfind(path)
+        return [(x.get("context"), len(x)) for x in rules]
+
+    def test_split_union(self):
+        ctx = "stix:A [@x = 'a | b'] | stix:B"
+        self.assertEqual(
+            ["stix:A[@x='a | b']", "stix:B"],
+            profile._split_union(ctx)
+        )
+
+    def test_merge_contexts(self):
+        first = self._mapping("stix:Indicator, stix:Package")
+        second = self._mapping("stix:Package ,stix:Indicator")
+
+        prof = profile.Profile(self.NSMAP)
+        prof.extend([
+            profile.RequiredRule("Title", first),
+            profile.RequiredRule("Title", second),
+            profile.ProhibitedRule("Description", second),
+        ])
+
+        # Repeated assertions are kept, so their errors are still reported.
+        # The assertions of `second` were shadowed by `first` before the
+        # contexts were merged, and are now checked.
+        expected = [("/", 1), ("stix:Indicator | stix:Package", 3)]
+        self.assertEqual(expected, self._contexts(prof))
+
+    def test_profile_order(self):
+        prof = profile.Profile(self.NSMAP)
+        prof.extend([
+            profile.RequiredRule("Title", self._mapping("stix:*")),
+            profile.RequiredRule("Title", self._mapping("stix:Indicator")),
+            profile.RequiredRule("Title", self._mapping("stix:A/stix:B")),
+        ])
+
+        # The first matching context checks a node, so the order of
+        # overlapping contexts must not change.
+        expected = [
+            ("/", 1),
+            ("stix:*", 1),
+            ("stix:Indicator", 1),
+            ("stix:A/stix:B", 1)
+        ]
+        self.assertEqual(expected, self._contexts(prof))
+
+
+class CompiledProfileCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tempdir, 'cache')
+        self._environ = os.environ.get('SDV_CACHE_DIR')
+        os.environ['SDV_CACHE_DIR'] = self.cache_dir
+
+        self.profile = os.path.join(self.tempdir, 'profile.xlsx')
+        shutil.copy(PROFILE, self.profile)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+        if self._environ is None:
+            del os.environ['SDV_CACHE_DIR']
+        else:
+            os.environ['SDV_CACHE_DIR'] = self._environ
+
+    def test_cache(self):
+        compiled = profile.STIXProfileValidator(self.profile)
+        cache = profile._CompiledProfileCache(self.profile)
+        self.assertTrue(os.path.isfile(cache.xslt_path))
+        self.assertTrue(os.path.isfile(cache.schematron_path))
+
+        cached = profile.STIXProfileValidator(self.profile)
+        self.assertTrue(
+            isinstance(cached._schematron, schematron.CompiledSchematron)
+        )
+
+        expected = compiled.validate(PROFILE_INVALID_XML)
+        results = cached.validate(PROFILE_INVALID_XML)
+        self.assertFalse(results.is_valid)
+        self.assertEqual(expected.as_dict(), results.as_dict())
+
+        # The native engine parses the profile on demand.
+        native = cached.validate(PROFILE_INVALID_XML, engine='native')
+        self.assertEqual(expected.as_dict(), native.as_dict())
+
+    def test_no_cache(self):
+        profile.STIXProfileValidator(self.profile, use_cache=False)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_changed_profile(self):
+        validator = sdv._get_profile_validator(self.profile)
+        self.assertTrue(validator is sdv._get_profile_validator(self.profile))
+
+        stat = os.stat(self.profile)
+        os.utime(self.profile, (stat.st_atime, stat.st_mtime + 10))
+        rebuilt = sdv._get_profile_validator(self.profile)
+        self.assertTrue(validator is not rebuilt)
+
 
 class InstanceMappingTests(unittest.TestCase):
     _NSMAP = {
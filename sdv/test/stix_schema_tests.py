@@ -6,6 +6,7 @@ from mixbox.vendor.six import StringIO
 
 import sdv
 import sdv.errors as errors
+from sdv.validators.stix.schema import STIXSchemaValidator, _XmlSchemaValidator
 
 STIX_1_1_1_XML = \
 """
@@ -114,6 +115,55 @@ class STIXSchemaTests(unittest.TestCase):
         func = sdv.validate_xml
         self.assertRaises(errors.ValidationError, func, "INVALID XML DOC")
 
+    def test_lazy_validators(self):
+        validator = sdv.validators.STIXSchemaValidator()
+        self.assertEqual(['schemaloc'], list(validator._xml_validators))
+
+        xml = StringIO(STIX_1_1_1_XML)
+        results = validator.validate(xml)
+        self.assertTrue(results.is_valid)
+        self.assertEqual(
+            set(['schemaloc', '1.1.1']), set(validator._xml_validators)
+        )
+
+    def test_schema_cache(self):
+        validator = STIXSchemaValidator()
+        validator.validate(StringIO(STIX_1_1_1_XML))
+        validator.validate(StringIO(STIX_1_1_1_XML))
+
+        cache = validator._get_versioned_validator('1.1.1').schema_cache
+        self.assertEqual(1, len(cache))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_superset(self):
+        validator = STIXSchemaValidator(superset=True)
+
+        results = validator.validate(StringIO(STIX_1_1_1_XML))
+        self.assertTrue(results.is_valid)
+
+        results = validator.validate(StringIO(STIX_INVALID))
+        self.assertFalse(results.is_valid)
+        self.assertEqual(len(results.errors), 2)
+
+        # Every document was validated by the superset schema
+        cache = validator._get_versioned_validator('1.1.1').schema_cache
+        self.assertEqual(0, len(cache))
+
+    def test_schemaloc_index(self):
+        # The bundled index files must match the result of walking the
+        # bundled schema directories.
+        for location in STIXSchemaValidator._SCHEMAS.values():
+            indexed = _XmlSchemaValidator(location, use_index=True)
+            walked = _XmlSchemaValidator(location, use_cache=False)
+            self.assertEqual(walked._schemalocs, indexed._schemalocs)
+
+    def test_preload_invalid_version(self):
+        validator = sdv.validators.STIXSchemaValidator()
+        self.assertRaises(
+            errors.InvalidSTIXVersionError, validator.preload, ["INVALID"]
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -146,4 +146,91 @@ class UtilsTests(unittest.TestCase):
             self.assertTrue(utils.is_qname(s))
 
         for s in invalid:
-            self.assertEqual(False, utils.is_qname(s), msg=s)
\ No newline at end of file
+            self.assertEqual(False, utils.is_qname(s), msg=s)
+
+    def test_validation_context(self):
+        xml = (
+            "<root xmlns='http://example.com/a' xmlns:b='http://example.com/b'>"
+            "  <b:child id='foo'/>"
+            "  <child id='bar'/>"
+            "  <child id='foo'/>"
+            "</root>"
+        )
+
+        ctx = utils.ValidationContext(StringIO(xml))
+        self.assertTrue(utils.get_etree_root(ctx) is ctx.root)
+        self.assertTrue(utils.get_context(ctx) is ctx)
+
+        expected = set(['http://example.com/a', 'http://example.com/b'])
+        self.assertEqual(expected, set(ctx.namespaces))
+
+        self.assertEqual(2, len(ctx.ids['foo']))
+        self.assertEqual(1, len(ctx.ids['bar']))
+        self.assertTrue('baz' not in ctx.ids)
+
+    def test_lru_cache(self):
+        cache = utils.LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+
+        self.assertEqual(1, cache.get('a'))  # 'b' is now least recently used
+        cache.put('c', 3)
+
+        self.assertTrue('b' not in cache)
+        self.assertEqual(None, cache.get('b'))
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_parse_timestamp(self):
+        values = (
+            "2015-04-14T15:24:19.416203+00:00",
+            "2015-04-14T12:24:19.416203-03:00",
+            "2015-04-14T15:24:19.4162039Z",
+            "2015-04-14T15:24:19",
+            "April 14, 2015 15:24:19 UTC",  # not an xs:dateTime
+        )
+
+        cache = {}
+
+        for value in values:
+            parsed = utils.parse_timestamp(value, cache)
+            expected = dateutil.parser.parse(value)
+
+            self.assertEqual(expected, parsed)
+            self.assertEqual(expected.utcoffset(), parsed.utcoffset())
+            self.assertTrue(utils.parse_timestamp(value, cache) is parsed)
+            self.assertEqual(expected, utils.parse_timestamp(value))
+
+        self.assertEqual(len(values), len(cache))
+
+        self.assertEqual(None, utils._parse_xs_datetime("2015-13-14T15:24:19Z"))
+        self.assertRaises(ValueError, utils.parse_timestamp, "2015-13-14T15:24:19Z")
+        self.assertEqual(None, utils.parse_timestamp(None))
+
+    def test_iternamespaces(self):
+        xml = (
+            "<root xmlns='http://example.com/a' xmlns:b='http://example.com/b'>"
+            "  <child xmlns:c='http://example.com/c' xmlns:d='http://example.com/d'>"
+            "    <b:child xmlns:b='http://example.com/b2'/>"
+            "    <child xmlns=''/>"
+            "  </child>"
+            "  <child xmlns:a='http://example.com/a'/>"
+            "</root>"
+        )
+
+        root = etree.fromstring(xml)
+
+        def walk(node):
+            found = []
+            for element in node.iter():
+                for ns in element.nsmap.values():
+                    if ns not in found:
+                        found.append(ns)
+            return found
+
+        self.assertEqual(walk(root), list(utils.iternamespaces(root)))
+
+        # Namespaces declared on ancestors are in scope for a subtree
+        subtree = root[0]
+        self.assertEqual(walk(subtree), list(utils.iternamespaces(subtree)))
@@ -0,0 +1,156 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from lxml import etree
+
+from sdv.validators import xml_schema
+
+SCHEMA = \
+"""<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    targetNamespace="%s">
+    %s
+</xs:schema>
+"""
+
+INCLUDE = '<xs:include schemaLocation="%s"/>'
+
+DOC = \
+"""<root xmlns="%s">
+    <child xmlns="%s"/>
+</root>
+"""
+
+
+class SchemaScanCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.schema_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self._environ = os.environ.get('SDV_CACHE_DIR')
+        os.environ['SDV_CACHE_DIR'] = self.cache_dir
+
+        self.write('a.xsd', 'http://example.com/a', INCLUDE % 'a_part.xsd')
+        self.write('a_part.xsd', 'http://example.com/a')
+        self.write('b.xsd', 'http://example.com/b')
+
+    def tearDown(self):
+        shutil.rmtree(self.schema_dir)
+        shutil.rmtree(self.cache_dir)
+
+        if self._environ is None:
+            del os.environ['SDV_CACHE_DIR']
+        else:
+            os.environ['SDV_CACHE_DIR'] = self._environ
+
+    def write(self, fn, ns, content=""):
+        with open(os.path.join(self.schema_dir, fn), 'w') as f:
+            f.write(SCHEMA % (ns, content))
+
+    def path(self, fn):
+        return os.path.abspath(os.path.join(self.schema_dir, fn))
+
+    def validator(self):
+        return xml_schema.XmlSchemaValidator(self.schema_dir, use_cache=True)
+
+    def test_cache_written(self):
+        validator = self.validator()
+
+        expected = {
+            'http://example.com/a': self.path('a.xsd'),
+            'http://example.com/b': self.path('b.xsd')
+        }
+        self.assertEqual(expected, validator._schemalocs)
+
+        cache = xml_schema._SchemaScanCache(self.schema_dir)
+        self.assertTrue(os.path.isfile(cache.path))
+
+        with open(cache.path) as f:
+            entries = json.load(f)['files']
+
+        self.assertEqual(3, len(entries))
+        self.assertEqual([self.path('a_part.xsd')],
+                         entries[self.path('a.xsd')]['includes'])
+
+    def test_cache_opt_in(self):
+        xml_schema.XmlSchemaValidator(self.schema_dir)
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_cache_used(self):
+        self.validator()
+
+        # Alter the cached targetNamespace for b.xsd. The file itself has not
+        # changed, so the cached value should be used.
+        cache = xml_schema._SchemaScanCache(self.schema_dir)
+
+        with open(cache.path) as f:
+            data = json.load(f)
+
+        data['files'][self.path('b.xsd')]['targetNamespace'] = 'cached'
+
+        with open(cache.path, 'w') as f:
+            json.dump(data, f)
+
+        validator = self.validator()
+        self.assertTrue('cached' in validator._schemalocs)
+
+    def test_cache_stale(self):
+        self.validator()
+
+        # Changing the file size invalidates its cache entry
+        self.write('b.xsd', 'http://example.com/changed')
+        os.remove(self.path('a_part.xsd'))
+        self.write('a.xsd', 'http://example.com/a')
+
+        validator = self.validator()
+
+        expected = {
+            'http://example.com/a': self.path('a.xsd'),
+            'http://example.com/changed': self.path('b.xsd')
+        }
+        self.assertEqual(expected, validator._schemalocs)
+
+        cache = xml_schema._SchemaScanCache(self.schema_dir)
+
+        with open(cache.path) as f:
+            entries = json.load(f)['files']
+
+        self.assertEqual(2, len(entries))
+
+
+class SchemaCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.schema_dir = tempfile.mkdtemp()
+
+        for name in ('a', 'b'):
+            fn = os.path.join(self.schema_dir, name + '.xsd')
+            with open(fn, 'w') as f:
+                f.write(SCHEMA % ('http://example.com/' + name, ""))
+
+    def tearDown(self):
+        shutil.rmtree(self.schema_dir)
+
+    def doc(self, *namespaces):
+        return etree.fromstring(DOC % namespaces)
+
+    def test_import_order(self):
+        validator = xml_schema.XmlSchemaValidator(self.schema_dir)
+        a, b = 'http://example.com/a', 'http://example.com/b'
+
+        validator._build_uber_schema(self.doc(a, b))
+        validator._build_uber_schema(self.doc(a, b))
+        validator._build_uber_schema(self.doc(b, a))
+
+        # The same imports in a different order are compiled separately.
+        cache = validator.schema_cache
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(2, cache.misses)
+
+
+if __name__ == '__main__':
+    unittest.main()
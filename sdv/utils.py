@@ -3,14 +3,24 @@
 
 # builtin
 import os
+import re
+import itertools
 import contextlib
+import collections
 import datetime
 from distutils.version import StrictVersion
 
 # external
+import dateutil.tz
 import dateutil.parser
 from lxml import etree
-from mixbox.vendor.six import StringIO, BytesIO
+from mixbox.vendor.six import StringIO, BytesIO, iteritems, itervalues
+
+# Python 2.6 doesn't have collections.OrderedDict :(
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
 
 # relative
 from . import errors, xmlconst
@@ -18,6 +28,19 @@ from . import errors, xmlconst
 
 _XML_PARSER = None
 
+# etree.iterwalk() emits 'start-ns' events as of lxml 4.0
+_ITERWALK_NS_EVENTS = etree.LXML_VERSION >= (4, 0)
+
+# The lexical representation of an xs:dateTime value.
+_XS_DATETIME = re.compile(
+    r"^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?"
+    r"(Z|[+-]\d{2}:\d{2})?$"
+)
+
+_TZ_UTC = dateutil.tz.tzutc()
+
+# Selects the leaf elements under a node. See leaves().
+_LEAVES_XPATH = etree.XPath(".//*[count(child::*) = 0]")
 
 @contextlib.contextmanager
 def ignored(*exceptions):
@@ -97,7 +120,9 @@ def get_etree_root(doc):
 
     """
     try:
-        if isinstance(doc, etree._Element):  # noqa
+        if isinstance(doc, ValidationContext):
+            root = doc.root
+        elif isinstance(doc, etree._Element):  # noqa
             root = doc
         elif isinstance(doc, etree._ElementTree):  # noqa
             root = doc.getroot()
@@ -114,6 +139,121 @@ def get_etree_root(doc):
     return root
 
 
+class ValidationContext(object):
+    """Holds a parsed XML instance document along with information derived
+    from it, so that it can be shared across validation stages (e.g., XML
+    Schema, STIX Best Practice, and STIX Profile validation).
+
+    Validators accept instances of this class anywhere they accept a
+    document. Passing the same instance to each validator means the input
+    document is only parsed once.
+
+    Args:
+        doc: The input XML document. Can be an instance of
+            ``lxml.etree._Element``, ``lxml.etree._ElementTree``, a file-like
+            object, or a string filename.
+        version: The language version of `doc`, if known.
+
+    Attributes:
+        root: The ``lxml.etree._Element`` root of the document.
+        version: The language version of the document. If ``None``, this will
+            be set by the first validator which detects the document version.
+        timestamps: A dictionary of the timestamp strings parsed by
+            :func:`parse_timestamp` while validating the document. The same
+            timestamp strings are repeated throughout a document, so rules
+            which compare timestamps share this memo.
+
+    Raises:
+        .ValidationError: If `doc` cannot be found or is not a well-formed
+            XML document.
+
+    """
+    def __init__(self, doc, version=None):
+        self.root = get_etree_root(doc)
+        self.version = version
+        self._namespaces = None
+        self._ids = None
+        self._tag_ids = {}
+        self.timestamps = {}
+
+    @property
+    def namespaces(self):
+        """A tuple of every namespace declared on or in scope of the elements
+        in the document, in the order they are first encountered.
+
+        Note:
+            Order matters when these are used to build ``xs:import``
+            directives, since libxml2 ignores subsequent imports of a
+            namespace which has already been imported.
+
+        """
+        if self._namespaces is None:
+            self._namespaces = tuple(iternamespaces(self.root))
+
+        return self._namespaces
+
+    @property
+    def ids(self):
+        """A dictionary mapping ``id`` attribute values to a list of the
+        elements which declare them, in document order.
+
+        """
+        if self._ids is None:
+            ids = collections.defaultdict(list)
+
+            for node in self.root.iter('*'):
+                id_ = node.attrib.get('id')
+
+                if id_ is not None:
+                    ids[id_].append(node)
+
+            self._ids = dict(ids)
+
+        return self._ids
+
+    def get_tag_ids(self, tag):
+        """Returns a dictionary mapping ``id`` attribute values to the first
+        element with the lxml `tag` which declares them.
+
+        The dictionary is built from :attr:`ids` the first time it is
+        requested for a `tag` and shared by later requests.
+
+        Args:
+            tag: An lxml element tag (e.g., ``'{ns}Observable'``).
+
+        """
+        try:
+            return self._tag_ids[tag]
+        except KeyError:
+            pass
+
+        index = {}
+
+        for id_, nodes in iteritems(self.ids):
+            for node in nodes:
+                if node.tag == tag:
+                    index[id_] = node
+                    break
+
+        self._tag_ids[tag] = index
+        return index
+
+
+def get_context(doc):
+    """Returns a :class:`ValidationContext` for the input `doc`. If `doc` is
+    already a :class:`ValidationContext`, it is returned unmodified.
+
+    Raises:
+        .ValidationError: If `doc` cannot be found or is not a well-formed
+            XML document.
+
+    """
+    if isinstance(doc, ValidationContext):
+        return doc
+
+    return ValidationContext(doc)
+
+
 def get_target_ns(doc):
     """Returns the value of the ``targetNamespace`` attribute found on `doc`.
 
@@ -155,6 +295,28 @@ def is_xml(fn):
     return os.path.isfile(fn) and fn.lower().endswith('.xml')
 
 
+def get_cache_dir():
+    """Returns the path to the directory used to persist data between
+    validation runs, such as the results of scanning a schema directory.
+
+    The directory is ``$SDV_CACHE_DIR`` if that environment variable is set,
+    otherwise ``stix-validator`` under ``$XDG_CACHE_HOME`` (or ``~/.cache``).
+    The directory may not exist yet.
+
+    """
+    path = os.environ.get('SDV_CACHE_DIR')
+
+    if path:
+        return path
+
+    base = os.environ.get('XDG_CACHE_HOME')
+
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+
+    return os.path.join(base, 'stix-validator')
+
+
 def list_xml_files(directory, recursive=False):
     """Returns a list of file paths for XML files contained within `dir_`.
 
@@ -287,27 +449,90 @@ def is_version_equal(x, y):
     return StrictVersion(x) == StrictVersion(y)
 
 
-def parse_timestamp(value):
+def _parse_xs_datetime(value):
+    """Parses the xs:dateTime string `value` into an instance of
+    ``datetime.datetime``.
+
+    Returns:
+        A ``datetime.datetime`` or ``None`` if `value` is not a valid
+        xs:dateTime string that can be represented by ``datetime.datetime``.
+
+    """
+    match = _XS_DATETIME.match(value)
+
+    if not match:
+        return None
+
+    year, month, day, hour, minute, second, fraction, tz = match.groups()
+
+    # Fractional seconds beyond microseconds are truncated, as dateutil does.
+    microsecond = int(fraction[:6].ljust(6, "0")) if fraction else 0
+
+    if tz is None:
+        tzinfo = None
+    elif tz == "Z":
+        tzinfo = _TZ_UTC
+    else:
+        offset = int(tz[1:3]) * 3600 + int(tz[4:6]) * 60
+        offset = -offset if tz[0] == "-" else offset
+        tzinfo = dateutil.tz.tzoffset(None, offset) if offset else _TZ_UTC
+
+    try:
+        return datetime.datetime(
+            int(year), int(month), int(day),
+            int(hour), int(minute), int(second),
+            microsecond, tzinfo
+        )
+    except ValueError:
+        return None
+
+
+def parse_timestamp(value, cache=None):
     """Attempts to parse `value` into an instance of ``datetime.datetime``. If
     `value` is ``None``, this function will return ``None``.
 
+    Strings in the xs:dateTime format are parsed directly. Anything else is
+    parsed by ``dateutil``.
+
     Args:
         value: A timestamp. This can be a string or datetime.datetime value.
+        cache: A dictionary used to memoize parsed timestamps, such as
+            :attr:`ValidationContext.timestamps`. If ``None``, `value` is
+            always parsed.
+
+    Raises:
+        ValueError: If `value` cannot be parsed.
 
     """
     if not value:
         return None
     elif isinstance(value, datetime.datetime):
         return value
-    return dateutil.parser.parse(value)
 
+    if cache is None:
+        return _parse_xs_datetime(value) or dateutil.parser.parse(value)
 
-def has_tzinfo(timestamp):
+    try:
+        return cache[value]
+    except KeyError:
+        pass
+
+    timestamp = _parse_xs_datetime(value) or dateutil.parser.parse(value)
+    cache[value] = timestamp
+    return timestamp
+
+
+def has_tzinfo(timestamp, cache=None):
     """Returns ``True`` if the `timestamp` includes timezone or UTC offset
     information.
 
+    Args:
+        timestamp: A timestamp string or datetime.datetime value.
+        cache: A dictionary used to memoize parsed timestamps. See
+            :func:`parse_timestamp`.
+
     """
-    ts = parse_timestamp(timestamp)
+    ts = parse_timestamp(timestamp, cache)
     return ts and bool(ts.tzinfo)
 
 
@@ -363,6 +588,42 @@ def get_document_namespaces(doc):
     return nsmap
 
 
+def iternamespaces(doc):
+    """Returns an iterator which yields each namespace in scope on the root
+    of `doc` or declared by one of its descendants. Each namespace is yielded
+    once, in the order it is first encountered in the document.
+
+    Note:
+        This only visits the namespace declarations in `doc`. It avoids
+        building an ``nsmap`` dictionary for every element, which is costly
+        for large documents.
+
+    Args:
+        doc: A read()-able XML document or etree node.
+
+    """
+    root = get_etree_root(doc)
+    seen = set()
+
+    if _ITERWALK_NS_EVENTS:
+        # The root nsmap covers namespaces declared on its ancestors.
+        namespaces = itertools.chain(
+            itervalues(root.nsmap),
+            (ns for _, (_, ns) in etree.iterwalk(root, events=('start-ns',)))
+        )
+    else:
+        namespaces = (
+            ns for node in root.iter() for ns in itervalues(node.nsmap)
+        )
+
+    for ns in namespaces:
+        if ns in seen:
+            continue
+
+        seen.add(ns)
+        yield ns
+
+
 def localname(node):
     """Returns the localname for an etree Element `node`.
 
@@ -384,7 +645,7 @@ def is_element(node):
     return isinstance(node, etree._Element)  # noqa
 
 
-def is_equal_timestamp(ts1, ts2):
+def is_equal_timestamp(ts1, ts2, cache=None):
     """Returns ``True`` if the timestamps `ts1` and `ts2` are equal.
 
     Args:
@@ -392,6 +653,8 @@ def is_equal_timestamp(ts1, ts2):
             attribute.
         ts2: Timestamp string/datetime or etree Element node with 'timestamp'
             attribute.
+        cache: A dictionary used to memoize parsed timestamps. See
+            :func:`parse_timestamp`.
 
     """
     if is_element(ts1):
@@ -401,7 +664,7 @@ def is_equal_timestamp(ts1, ts2):
         ts2 = ts2.attrib.get('timestamp')
 
     try:
-        return parse_timestamp(ts1) == parse_timestamp(ts2)
+        return parse_timestamp(ts1, cache) == parse_timestamp(ts2, cache)
     except TypeError:
         # TypeError raised when comparing timestamps with and without
         # tzinfo. Return False in this case.
@@ -441,8 +704,7 @@ def leaves(tree):
     """Returns an iterable collection of leaf nodes under `tree`.
 
     """
-    xpath = ".//*[count(child::*) = 0]"
-    return tree.xpath(xpath)
+    return _LEAVES_XPATH(tree)
 
 
 def remove_all(list_, items):
@@ -500,4 +762,66 @@ def remove_version_prefix(version):
     """
     if version.startswith('stix-'):
         version = version.partition('stix-')[2]
-    return version
\ No newline at end of file
+    return version
+
+
+class LRUCache(object):
+    """A mapping with a bounded number of items. When the cache is full, the
+    least recently used item is discarded to make room for a new item.
+
+    Args:
+        maxsize: The maximum number of items held by the cache.
+
+    Attributes:
+        maxsize: The maximum number of items held by the cache.
+        hits: The number of :meth:`get` calls which found their key.
+        misses: The number of :meth:`get` calls which did not find their key.
+
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def get(self, key, default=None):
+        """Returns the value for `key` and marks it as the most recently used
+        item. If `key` is not in the cache, `default` is returned.
+
+        """
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._items[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Adds `value` to the cache under `key`, discarding the least
+        recently used item if the cache is full.
+
+        """
+        self._items.pop(key, None)
+        self._items[key] = value
+
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        """Removes all items from the cache and resets the hit and miss
+        counters.
+
+        """
+        self._items.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
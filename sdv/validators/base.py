@@ -5,9 +5,6 @@
 import abc
 import json
 
-# external
-from mixbox.vendor.six import iteritems
-
 # internal
 from .. import utils
 
@@ -62,6 +59,18 @@ class BaseSchemaValidator(object):
     """Abstract base class for language-specific XML Schema validator classes.
     E.g., STIXSchemaValidator and CyboxSchemaValidator.
 
+    Args:
+        schema_dir: A directory of schemas to validate against. If ``None``,
+            the bundled schemas are used.
+        superset: If ``True``, each schema directory is compiled once into a
+            single schema which imports every namespace it defines, and all
+            documents are validated against it. This makes the first
+            validation slower and every following validation faster.
+        use_cache: If ``True``, the results of walking `schema_dir` are
+            persisted to :func:`.get_cache_dir`, so later validators for the
+            same directory only parse schemas which changed. The bundled
+            schema directories ship with an index and are never walked.
+
     """
     __metaclass__ = abc.ABCMeta
 
@@ -69,9 +78,11 @@ class BaseSchemaValidator(object):
     _KEY_USER_DEFINED = 'user'
     _SCHEMAS = None  # Overidden by subclass
 
-    def __init__(self, schema_dir=None):
-        self._xml_validators = self._get_validators(schema_dir)
+    def __init__(self, schema_dir=None, superset=False, use_cache=False):
         self._is_user_defined = bool(schema_dir)
+        self._superset = superset
+        self._use_cache = use_cache
+        self._xml_validators = self._get_validators(schema_dir)
 
     @abc.abstractmethod
     def _raise_invalid_version(self, version):
@@ -82,29 +93,79 @@ class BaseSchemaValidator(object):
         raise NotImplementedError()
 
     @abc.abstractmethod
-    def _get_validator_impl(self, schema_dir=None):
+    def _get_validator_impl(self, schema_dir=None, use_index=False,
+                            superset=False, use_cache=False):
         raise NotImplementedError()
 
     def _get_validators(self, schema_dir=None):
-        validators = {self._KEY_SCHEMALOC: self._get_validator_impl()}
+        """Returns a dictionary of the validators which can be built
+        immediately.
+
+        Validators for the bundled schemas are not built here. They are built
+        on first use by :meth:`_get_versioned_validator` or ahead of time by
+        :meth:`preload`, since walking a schema directory is expensive.
 
+        """
         if schema_dir:
-            validators = {
-                self._KEY_USER_DEFINED: self._get_validator_impl(schema_dir)
-            }
-        else:
-            for version, location in iteritems(self._SCHEMAS):
-                validator = self._get_validator_impl(location)
-                validators[version] = validator
+            validator = self._get_validator_impl(
+                schema_dir, superset=self._superset, use_cache=self._use_cache
+            )
+            return {self._KEY_USER_DEFINED: validator}
 
-        return validators
+        return {self._KEY_SCHEMALOC: self._get_validator_impl()}
 
     def _get_versioned_validator(self, version):
+        """Returns the validator for the bundled schemas of `version`,
+        building it if this is the first request for `version`.
+
+        """
         try:
             return self._xml_validators[version]
         except KeyError:
+            pass
+
+        try:
+            location = self._SCHEMAS[version]
+        except (KeyError, TypeError):
             self._raise_invalid_version(version)
 
+        # Bundled schema directories ship with a precomputed index
+        validator = self._get_validator_impl(
+            location, use_index=True, superset=self._superset
+        )
+        self._xml_validators[version] = validator
+        return validator
+
+    def preload(self, versions=None):
+        """Builds the bundled schema validators for `versions` ahead of time.
+
+        Bundled schema validators are otherwise built the first time a
+        document of a given version is validated. Long-running services can
+        call this at startup to avoid paying that cost during validation.
+
+        Note:
+            This does nothing if this class was initialized with a
+            ``schema_dir``.
+
+        Args:
+            versions: An iterable of version strings to build validators for.
+                If ``None``, validators are built for every bundled version.
+
+        Raises:
+            .ValidationError: If any of the `versions` are not valid
+                language versions. The concrete error type depends on the
+                subclass (e.g., :class:`.InvalidSTIXVersionError`).
+
+        """
+        if self._is_user_defined:
+            return
+
+        if versions is None:
+            versions = self._SCHEMAS
+
+        for version in versions:
+            self._get_versioned_validator(version)
+
     def _validate(self, doc, version=None, schemaloc=False):
         """Performs XML Schema validation against an XML instance document.
 
@@ -119,7 +180,8 @@ class BaseSchemaValidator(object):
 
         Args:
             doc: The XML document. This can be a filename, file-like object,
-                ``etree._Element``, or ``etree._ElementTree`` instance.
+                ``etree._Element``, ``etree._ElementTree`` or
+                :class:`.ValidationContext` instance.
             version: The version of the XML document. If ``None`` an attempt
                 will be made to extract the version from `doc`.
             schemaloc: If ``True``, the ``xsi:schemaLocation`` attribute on
@@ -130,17 +192,17 @@ class BaseSchemaValidator(object):
             :class:`.XmlValidationResults`.
 
         """
-        root = utils.get_etree_root(doc)
+        doc = utils.get_context(doc)
 
         if schemaloc:
             validator = self._xml_validators[self._KEY_SCHEMALOC]
         elif self._is_user_defined:
             validator = self._xml_validators[self._KEY_USER_DEFINED]
         else:
-            version = version or self._get_document_version(root)
+            version = version or self._get_document_version(doc)
             validator = self._get_versioned_validator(version)
 
-        results = validator.validate(root, schemaloc)
+        results = validator.validate(doc, schemaloc)
         return results
 
 
@@ -31,6 +31,9 @@ def get_version(doc):
             * ``cybox_update_version``
 
     """
+    if isinstance(doc, utils.ValidationContext) and doc.version:
+        return doc.version
+
     observables  = utils.get_etree_root(doc)
     cybox_major  = observables.attrib.get(TAG_CYBOX_MAJOR)
     cybox_minor  = observables.attrib.get(TAG_CYBOX_MINOR)
@@ -45,6 +48,9 @@ def get_version(doc):
     else:
         version = "%s.%s" % (cybox_major, cybox_minor)
 
+    if isinstance(doc, utils.ValidationContext):
+        doc.version = version
+
     return version
 
 
@@ -80,18 +86,13 @@ def check_root(doc):
 def check_cybox(func):
     """Decorator which checks that the input document is a CybOX document."""
     @functools.wraps(func)
-    def inner(*args, **kwargs):
-        try:
-            doc = args[1]
-        except IndexError:
-            doc = kwargs['doc']
-
-        # Get the root element for the input doc
-        root = utils.get_etree_root(doc)
+    def inner(self, doc, *args, **kwargs):
+        # Parse the input doc once and share it with the wrapped method
+        doc = utils.get_context(doc)
 
         # Check that the root is a valid CybOX root-level element
-        check_root(root)
+        check_root(doc.root)
 
-        return func(*args, **kwargs)
+        return func(self, doc, *args, **kwargs)
 
     return inner
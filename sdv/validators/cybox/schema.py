@@ -20,8 +20,11 @@ class CyboxSchemaValidator(base.BaseSchemaValidator):
         '2.0': os.path.join(XSD_ROOT, 'stix_1.0', 'cybox')
     }
 
-    def __init__(self, schema_dir=None):
-        super(CyboxSchemaValidator, self).__init__()
+    def __init__(self, schema_dir=None, superset=False, use_cache=False):
+        super(CyboxSchemaValidator, self).__init__(
+            superset=superset,
+            use_cache=use_cache
+        )
 
     def _get_document_version(self, doc):
         return common.get_version(doc)
@@ -38,8 +41,14 @@ class CyboxSchemaValidator(base.BaseSchemaValidator):
             expected=common.CYBOX_VERSIONS
         )
 
-    def _get_validator_impl(self, schema_dir=None):
-        return xml_schema.XmlSchemaValidator(schema_dir=schema_dir)
+    def _get_validator_impl(self, schema_dir=None, use_index=False,
+                            superset=False, use_cache=False):
+        return xml_schema.XmlSchemaValidator(
+            schema_dir=schema_dir,
+            use_index=use_index,
+            superset=superset,
+            use_cache=use_cache
+        )
 
     @common.check_cybox
     def validate(self, doc, version=None, schemaloc=False):
@@ -56,7 +65,8 @@ class CyboxSchemaValidator(base.BaseSchemaValidator):
 
         Args:
             doc: The CybOX document. This can be a filename, file-like object,
-                ``etree._Element``, or ``etree._ElementTree`` instance.
+                ``etree._Element``, ``etree._ElementTree``, or
+                :class:`.ValidationContext` instance.
             version: The version of the CybOX document. If ``None`` an attempt
                 will be made to extract the version from `doc`.
             schemaloc: If ``True``, the ``xsi:schemaLocation`` attribute on
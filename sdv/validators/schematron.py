@@ -2,6 +2,8 @@
 # See LICENSE.txt for complete terms.
 
 # builtin
+import re
+import itertools
 import collections
 
 # external
@@ -22,6 +24,13 @@ ERROR_TAGS = (
 )
 
 
+# True if an SVRL report contains a failed assertion. This is how
+# lxml.isoschematron.Schematron determines validity by default.
+_HAS_FAILED_ASSERT = lxml.etree.XPath(
+    "boolean(//svrl:failed-assert)",
+    namespaces={'svrl': xmlconst.NS_SVRL}
+)
+
 # Tuple for recording schematron validation errors.
 # 'node" is the etree failed-assert or successful-report node.
 # 'context' is the associated schematron rule context for the error.
@@ -31,6 +40,183 @@ SVRLError = collections.namedtuple(
 )
 
 
+# Matches one step of an SVRL location generated by the ISO Schematron
+# skeleton. E.g., "/*[local-name()='Title' and namespace-uri()='urn:a'][2]"
+# or "/Title[2]" for elements in no namespace.
+_LOCATION_STEP = re.compile(
+    r"/(?:\*\[local-name\(\)='([^']*)' and namespace-uri\(\)='([^']*)'\]"
+    r"|([\w.-]+))"
+    r"(?:\[(\d+)\])?"
+)
+
+
+class _LineResolver(object):
+    """Resolves the SVRL ``location`` XPaths of many errors to line numbers
+    in the validated document.
+
+    The skeleton reports locations as absolute, positional element paths.
+    These are resolved by walking down from the document root, caching
+    each location prefix and the children of each visited element. Errors
+    which share ancestors (or nodes) share that work, so resolving every
+    error in a report costs about one walk over the elements on their
+    paths rather than one XPath evaluation per error.
+
+    Locations which are not positional element paths are evaluated as
+    XPath.
+
+    Args:
+        doc: The validated document. This can be an ``etree._Element``,
+            ``etree._ElementTree`` or :class:`.ValidationContext`.
+
+    """
+    def __init__(self, doc):
+        self._root = utils.get_etree_root(doc)
+        self._nodes = {}
+        self._children = {}
+
+    def _parse(self, location):
+        """Returns a list of ``(end, tag, index)`` tuples for each step in
+        `location` or ``None`` if `location` is not a positional element
+        path.
+
+        """
+        steps = []
+        pos = 0
+
+        while pos < len(location):
+            match = _LOCATION_STEP.match(location, pos)
+
+            if not match:
+                return None
+
+            localname, ns, name, index = match.groups()
+
+            if localname is not None:
+                tag = "{%s}%s" % (ns, localname) if ns else localname
+            else:
+                tag = name
+
+            pos = match.end()
+            steps.append((pos, tag, int(index or 1)))
+
+        return steps or None
+
+    def _get_children(self, node):
+        """Returns a dictionary of the child elements of `node`, keyed on
+        tag. A `node` of ``None`` denotes the document node.
+
+        """
+        try:
+            return self._children[node]
+        except KeyError:
+            pass
+
+        if node is None:
+            elements = [self._root.getroottree().getroot()]
+        else:
+            elements = node.iterchildren(lxml.etree.Element)
+
+        children = collections.defaultdict(list)
+        for child in elements:
+            children[child.tag].append(child)
+
+        self._children[node] = children
+        return children
+
+    def get_node(self, location, namespaces=None):
+        """Returns the element found at `location` or ``None`` if it could
+        not be found.
+
+        """
+        steps = self._parse(location)
+
+        if steps is None:
+            nodes = self._root.xpath(location, namespaces=namespaces)
+            return nodes[0] if nodes else None
+
+        node = None
+
+        for end, tag, index in steps:
+            prefix = location[:end]
+
+            try:
+                node = self._nodes[prefix]
+                continue
+            except KeyError:
+                pass
+
+            siblings = self._get_children(node).get(tag, ())
+
+            if index > len(siblings):
+                return None
+
+            node = self._nodes[prefix] = siblings[index - 1]
+
+        return node
+
+    def get_line(self, location, namespaces=None):
+        """Returns the line number of the node at `location` or ``None`` if
+        it could not be found.
+
+        """
+        node = self.get_node(location, namespaces)
+
+        if node is None:
+            return None
+
+        return node.sourceline
+
+
+def _consume_children(node):
+    """Yields each child of `node`, removing it from `node` once the caller
+    has processed it. Elements which are no longer referenced are freed as
+    the iteration proceeds.
+
+    """
+    child = node[0] if len(node) else None
+
+    while child is not None:
+        next_ = child.getnext()
+        yield child
+        node.remove(child)
+        child = next_
+
+
+def iter_svrl_errors(svrl_report, consume=False):
+    """Yields an :class:`SVRLError` for each ``svrl:failed-assert`` and
+    ``svrl:successful-report`` in `svrl_report`, in report order.
+
+    Args:
+        svrl_report: An etree SVRL document.
+        consume: If ``True``, SVRL elements are removed from `svrl_report`
+            as they are read, so the report shrinks while it is consumed.
+            SVRL reports are flat, so only the children of the report root
+            are read.
+
+    """
+    if not svrl_report:
+        return
+
+    root = svrl_report.getroot()
+
+    if consume:
+        elements = _consume_children(root)
+    else:
+        elements = utils.iterdescendants(root)
+
+    context = None
+
+    for element in elements:
+        if element.tag == xmlconst.TAG_SVRL_FIRED_RULE:
+            context = element.attrib['context']
+            continue
+
+        if element.tag not in ERROR_TAGS:
+            continue
+
+        yield SVRLError(context=context, node=element)
+
+
 def make_rule(ctx):
     """Returns a Schematron rule etree.Element for the given context."""
     name    = lxml.etree.QName(xmlconst.NS_SCHEMATRON, "rule")
@@ -73,18 +259,22 @@ class SchematronError(base.ValidationError):
 
     Args:
         doc: The instance document which was validated and produced this error.
+            If ``None``, the line number of the error is not resolved.
         error: The ``svrl:failed-assert`` or ``svrl:successful-report``
             ``etree._Element`` instance.
+        resolver: A ``_LineResolver`` for `doc`, shared by the errors of
+            a validation run. If ``None``, one is created for this error.
 
     Attributes:
         message: The validation error message.
 
     """
-    def __init__(self, doc, error):
+    def __init__(self, doc, error, resolver=None):
         super(SchematronError, self).__init__()
         node = error.node
 
         self._doc = doc
+        self._resolver = resolver
         self._error = node
         self._xpath_location = node.attrib.get('location')
         self._test = node.attrib.get('test')
@@ -98,17 +288,37 @@ class SchematronError(base.ValidationError):
     def __str__(self):
         return unicode(self).encode("utf-8")
 
+    def __getstate__(self):
+        # Resolve the line number before dropping the etree references,
+        # which cannot be pickled.
+        state = self.__dict__.copy()
+        state['_line'] = self.line
+        state['_doc'] = None
+        state['_resolver'] = None
+        state['_error'] = None
+        return state
+
     def _get_line(self):
         """Returns the line number in the input document associated with this
-        error.
+        error or ``None`` if it cannot be resolved.
 
         """
-        root = utils.get_etree_root(self._doc)
+        if self._doc is None:
+            return None
+
+        if self._resolver is None:
+            self._resolver = _LineResolver(self._doc)
+
         xpath = self._xpath_location
-        nsmap = self._error.nsmap
+        nsmap = self._error.nsmap if self._error is not None else None
+        return self._resolver.get_line(xpath, nsmap)
 
-        node = root.xpath(xpath, namespaces=nsmap)[0]
-        return node.sourceline
+    def _release(self):
+        """Drops the reference to the SVRL node for this error, which would
+        otherwise keep the whole SVRL report alive.
+
+        """
+        self._error = None
 
     @property
     def line(self):
@@ -151,6 +361,11 @@ class SchematronValidationResults(base.ValidationResults):
         doc: The document which produced these validation results.
         svrl_report: The etree._ElementTree SVRL report produced during the
             validation run.
+        resolve_lines: If ``False``, the line numbers of errors are not
+            resolved and are ``None``.
+        max_errors: A cap on the number of errors kept from `svrl_report`.
+            Only the first `max_errors` errors are built. If ``None``,
+            every error is kept.
 
     Attributes:
         errors: A list of :class:`SchematronError` instances representing
@@ -158,12 +373,45 @@ class SchematronValidationResults(base.ValidationResults):
         is_valid: Returns ``True`` if the validation was successful and
             ``False`` otherwise.
 
+    Note:
+        Error line numbers are resolved lazily, the first time an error's
+        ``line`` is read. The errors share one ``_LineResolver``, so
+        resolving the lines of every error costs about one walk of the
+        document.
+
     """
-    def __init__(self, is_valid, doc=None, svrl_report=None):
+    _ERROR_CLASS = SchematronError
+
+    def __init__(self, is_valid, doc=None, svrl_report=None,
+                 resolve_lines=True, max_errors=None):
         super(SchematronValidationResults, self).__init__(is_valid)
         self._svrl_report = svrl_report
         self._doc = doc
-        self.errors = self._parse_errors(svrl_report)
+
+        if doc is not None and resolve_lines:
+            self._resolver = _LineResolver(doc)
+        else:
+            self._resolver = None
+
+        self.errors = self._parse_errors(svrl_report, max_errors)
+
+    def __getstate__(self):
+        # The SVRL report and instance document cannot be pickled.
+        state = self.__dict__.copy()
+        state['_svrl_report'] = None
+        state['_doc'] = None
+        state['_resolver'] = None
+        return state
+
+    def _get_error_args(self):
+        """Returns the ``(doc, resolver)`` arguments for the errors of these
+        results. `doc` is ``None`` if line numbers should not be resolved.
+
+        """
+        if self._resolver is None:
+            return None, None
+
+        return self._doc, self._resolver
 
     def _get_errors(self, svrl_report):
         """Parses errors from the SVRL report document.
@@ -174,29 +422,13 @@ class SchematronValidationResults(base.ValidationResults):
         Returns:
             A list of :class:`SVRLError` objects.
         """
-        errors = []
-
-        if not svrl_report:
-            return errors
-
-        root = svrl_report.getroot()
-
-        for element in utils.descendants(root):
-            if element.tag == xmlconst.TAG_SVRL_FIRED_RULE:
-                context = element.attrib['context']
-                continue
-
-            if element.tag not in ERROR_TAGS:
-                continue
-
-            error = SVRLError(context=context, node=element)
-            errors.append(error)
-
-        return errors
+        return list(iter_svrl_errors(svrl_report))
 
-    def _parse_errors(self, svrl_report):
-        errors = self._get_errors(svrl_report)
-        return [SchematronError(self._doc, x) for x in errors]
+    def _parse_errors(self, svrl_report, max_errors=None):
+        errors = iter_svrl_errors(svrl_report)
+        errors = itertools.islice(errors, max_errors)
+        doc, resolver = self._get_error_args()
+        return [self._ERROR_CLASS(doc, x, resolver) for x in errors]
 
     def as_dict(self):
         """A dictionary representation of the
@@ -220,6 +452,83 @@ class SchematronValidationResults(base.ValidationResults):
         return d
 
 
+class CompiledSchematron(object):
+    """Stands in for an ``lxml.isoschematron.Schematron`` instance, given
+    the validator XSLT it compiled.
+
+    This skips the ISO Schematron skeleton XSLT pipeline when the validator
+    XSLT was compiled earlier. Unlike ``lxml.isoschematron.Schematron``,
+    :meth:`get_report` returns SVRL reports without holding on to them.
+    Validity is determined the way ``lxml.isoschematron.Schematron``
+    determines it by default: a document is invalid if the SVRL report
+    contains any ``svrl:failed-assert`` elements.
+
+    Args:
+        schematron: The ``etree._ElementTree`` Schematron document which
+            `validator_xslt` was compiled from.
+        validator_xslt: The ``etree._ElementTree`` validator XSLT produced by
+            the ISO Schematron skeleton implementation.
+
+    Attributes:
+        schematron: The Schematron document.
+        validator_xslt: The validator XSLT document.
+        validation_report: The SVRL report produced by the last call to
+            :meth:`validate`.
+
+    """
+    def __init__(self, schematron, validator_xslt):
+        self.schematron = schematron
+        self.validator_xslt = validator_xslt
+        self.validation_report = None
+        self._validator = lxml.etree.XSLT(validator_xslt)
+
+    @classmethod
+    def from_schematron(cls, sch, phase=None):
+        """Runs the ISO Schematron skeleton over the Schematron `sch` and
+        returns a :class:`CompiledSchematron` for the validator XSLT.
+
+        Args:
+            sch: A Schematron ``etree._Element`` or ``etree._ElementTree``.
+            phase: The Schematron phase to validate.
+
+        """
+        compiled = lxml.isoschematron.Schematron(
+            sch,
+            phase=phase,
+            store_xslt=True,
+            store_schematron=True
+        )
+
+        return cls(compiled.schematron, compiled.validator_xslt)
+
+    def get_report(self, doc):
+        """Returns the SVRL report for the ``etree._Element`` or
+        ``etree._ElementTree`` `doc`. The report is not stored.
+
+        """
+        return self._validator(doc)
+
+    def validate(self, doc):
+        """Validates the ``etree._Element`` or ``etree._ElementTree`` `doc`
+        and stores the SVRL report on :attr:`validation_report`.
+
+        Returns:
+            ``True`` if `doc` is valid and ``False`` otherwise.
+
+        """
+        report = self.get_report(doc)
+        self.validation_report = report
+        return is_valid_report(report)
+
+
+def is_valid_report(svrl_report):
+    """Returns ``True`` if the SVRL report `svrl_report` does not contain
+    any ``svrl:failed-assert`` elements.
+
+    """
+    return not _HAS_FAILED_ASSERT(svrl_report)
+
+
 class SchematronValidator(object):
     """Performs schematron validation against an XML instance document.
 
@@ -228,36 +537,29 @@ class SchematronValidator(object):
             object, ``etree._Element``, or ``etree._ElementTree`` instance.
 
     """
+    _ERROR_CLASS = SchematronError
 
     def __init__(self, schematron, phase=None):
         self._schematron = self._build_schematron(schematron, phase)
         self._phase_id = phase
 
     def _build_schematron(self, sch, phase=None):
-        """Attempts to build an ``lxml.isoschematron.Schematron`` instance
-        from `sch`.
+        """Attempts to build a :class:`CompiledSchematron` instance from
+        `sch`.
 
         Args:
             sch: A Schematron document filename, file-like object,
                 etree._Element, or etree._ElementTree.
 
         Returns:
-            A ``lxml.isoschematron.Schematron`` instance for `sch`.
+            A :class:`CompiledSchematron` instance for `sch`.
 
         """
         if sch is None:
             raise ValueError("Input schematron document cannot be None")
 
         root = utils.get_etree_root(sch)
-        schematron = lxml.isoschematron.Schematron(
-            root,
-            phase=phase,
-            store_report=True,
-            store_xslt=True,
-            store_schematron=True
-        )
-
-        return schematron
+        return CompiledSchematron.from_schematron(root, phase=phase)
 
     @property
     def xslt(self):
@@ -275,12 +577,18 @@ class SchematronValidator(object):
         """
         return self._schematron.schematron
 
-    def validate(self, doc):
+    def validate(self, doc, resolve_lines=True, max_errors=None):
         """Validates an XML instance document `doc` using Schematron rules.
 
         Args:
             doc: An XML instance document. This can be a filename, file-like
                 object, ``etree._Element`` or ``etree._ElementTree`` instance.
+            resolve_lines: If ``False``, the line numbers of errors are not
+                resolved and are ``None``.
+            max_errors: A cap on the number of errors in the results. If
+                ``None``, every error is returned. This does not shorten
+                validation: the validator XSLT still produces the complete
+                SVRL report, and validity is determined from all of it.
 
         Returns:
             An instance of
@@ -291,15 +599,55 @@ class SchematronValidator(object):
 
         """
         root = utils.get_etree_root(doc)
-        is_valid = self._schematron.validate(root)
-        svrl_report = self._schematron.validation_report
+        svrl_report = self._schematron.get_report(root)
 
         return SchematronValidationResults(
-            is_valid=is_valid,
+            is_valid=is_valid_report(svrl_report),
             doc=root,
-            svrl_report=svrl_report
+            svrl_report=svrl_report,
+            resolve_lines=resolve_lines,
+            max_errors=max_errors
         )
 
+    def iter_errors(self, doc, max_errors=None, resolve_lines=True):
+        """Validates an XML instance document `doc` and yields an error for
+        each ``svrl:failed-assert`` and ``svrl:successful-report``.
+
+        This is not streaming validation. The validator XSLT builds the
+        complete SVRL report before the first error is yielded. Unlike
+        :meth:`validate`, each SVRL element is dropped from the report once
+        it has been read, and the errors do not reference the report, so
+        the report is freed as the errors are consumed.
+
+        Args:
+            doc: An XML instance document. This can be a filename, file-like
+                object, ``etree._Element`` or ``etree._ElementTree`` instance.
+            max_errors: A cap on the number of errors yielded. If ``None``,
+                every error is yielded. The SVRL report is complete before
+                the first error, so this only limits the errors built from
+                it.
+            resolve_lines: If ``False``, the line numbers of errors are not
+                resolved and are ``None``.
+
+        Yields:
+            :class:`.SchematronError` instances, in report order.
+
+        """
+        root = utils.get_etree_root(doc)
+        svrl_report = self._schematron.get_report(root)
+
+        if resolve_lines:
+            resolver = _LineResolver(root)
+        else:
+            root, resolver = None, None
+
+        errors = iter_svrl_errors(svrl_report, consume=True)
+
+        for svrl_error in itertools.islice(errors, max_errors):
+            error = self._ERROR_CLASS(root, svrl_error, resolver)
+            error._release()
+            yield error
+
 
 __all__ = [
     'SchematronValidator',
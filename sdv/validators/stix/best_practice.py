@@ -3,6 +3,7 @@
 
 # builtin
 import re
+import timeit
 import itertools
 import collections
 import distutils.version
@@ -32,27 +33,377 @@ except ImportError:
 # QName format check.
 ID_PATTERN = re.compile(r"[\w\-]+:\w+-.+", re.UNICODE)
 
-
-def rule(minver, maxver=None):
+# Selectors for the major STIX and CybOX constructs.
+_CORE_COMPONENTS = common.STIX_CORE_COMPONENTS + common.CYBOX_CORE_COMPONENTS
+
+# Selectors for STIX Indicator instances.
+_INDICATORS = (
+    "{0}:Indicator".format(common.PREFIX_STIX_CORE),
+    "{0}:Indicator".format(common.PREFIX_STIX_COMMON),
+    "{0}:Indicator".format(common.PREFIX_STIX_REPORT),
+)
+
+# Selectors for STIX constructs which should have a Title.
+_1_0_TITLE_SELECTORS = (
+    '{0}:STIX_Package/{0}:STIX_Header'.format(common.PREFIX_STIX_CORE),
+    '{0}:Campaign'.format(common.PREFIX_STIX_CORE),
+    '{0}:Campaign'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Course_Of_Action'.format(common.PREFIX_STIX_CORE),
+    '{0}:Course_Of_Action'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Exploit_Target'.format(common.PREFIX_STIX_CORE),
+    '{0}:Exploit_Target'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Incident'.format(common.PREFIX_STIX_CORE),
+    '{0}:Incident'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Indicator'.format(common.PREFIX_STIX_CORE),
+    '{0}:Indicator'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Threat_Actor'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Threat_Actor'.format(common.PREFIX_STIX_CORE),
+    '{0}:TTP'.format(common.PREFIX_STIX_CORE),
+    '{0}:TTP'.format(common.PREFIX_STIX_COMMON)
+)
+
+_1_2_TITLE_SELECTORS = (
+    '{0}:Campaign'.format(common.PREFIX_STIX_CORE),
+    '{0}:Campaign'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Course_Of_Action'.format(common.PREFIX_STIX_CORE),
+    '{0}:Course_Of_Action'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Exploit_Target'.format(common.PREFIX_STIX_CORE),
+    '{0}:Exploit_Target'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Incident'.format(common.PREFIX_STIX_CORE),
+    '{0}:Incident'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Indicator'.format(common.PREFIX_STIX_CORE),
+    '{0}:Indicator'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Threat_Actor'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Threat_Actor'.format(common.PREFIX_STIX_CORE),
+    '{0}:TTP'.format(common.PREFIX_STIX_CORE),
+    '{0}:TTP'.format(common.PREFIX_STIX_COMMON),
+    '{0}:Report/{1}:Header'.format(common.PREFIX_STIX_CORE, common.PREFIX_STIX_REPORT),
+    '{0}:Report/{1}:Header'.format(common.PREFIX_STIX_COMMON, common.PREFIX_STIX_REPORT)
+)
+
+# Selectors for fields deprecated in STIX v1.2.
+_1_2_PACKAGE_SELECTORS = (
+    "{0}:STIX_Package".format(common.PREFIX_STIX_CORE),
+    "{0}:Package".format(common.PREFIX_STIX_CORE)
+)
+
+_1_2_HEADER_SELECTORS = tuple(
+    "{0}:STIX_Header/{0}:{1}".format(common.PREFIX_STIX_CORE, x)
+    for x in ("Title", "Description", "Short_Description", "Package_Intent")
+)
+
+_1_2_TLO_SELECTORS = tuple(
+    x.format(common.PREFIX_STIX_CORE) for x in (
+        '{0}:Campaigns/{0}:Campaign',
+        '{0}:Courses_Of_Action/{0}:Course_Of_Action',
+        '{0}:Exploit_Targets/{0}:Exploit_Target',
+        '{0}:Incidents/{0}:Incident',
+        '{0}:Indicators/{0}:Indicator',
+        '{0}:Threat_Actors/{0}:Threat_Actor',
+        '{0}:TTPs/{0}:TTP',
+        '{0}:Related_Packages/{0}:Related_Package/{0}:Package',
+    )
+) + (
+    "{0}:Observables/{1}:Observable".format(
+        common.PREFIX_STIX_CORE,
+        common.PREFIX_CYBOX_CORE
+    ),
+)
+
+_1_2_RELATED_PACKAGE_SELECTORS = tuple(
+    "{0}:Related_Packages".format(prefix) for prefix in (
+        common.PREFIX_STIX_CAMPAIGN,
+        common.PREFIX_STIX_COA,
+        common.PREFIX_STIX_EXPLOIT_TARGET,
+        common.PREFIX_STIX_INCIDENT,
+        common.PREFIX_STIX_INDICATOR,
+        common.PREFIX_STIX_THREAT_ACTOR,
+        common.PREFIX_STIX_TTP
+    )
+)
+
+_1_2_DEPRECATION_SELECTORS = (
+    _1_2_PACKAGE_SELECTORS +
+    _1_2_HEADER_SELECTORS +
+    _1_2_TLO_SELECTORS +
+    _1_2_RELATED_PACKAGE_SELECTORS
+)
+
+# The localnames of StructuredTextType fields which can have an @ordinality.
+_STRUCTURED_TEXT_TAGS = (
+    "Description",
+    "Short_Description",
+    "Description_Of_Effect",
+    "Business_Function_Or_Role"
+)
+
+
+def rule(minver, maxver=None, match=None, name=None):
     """Decorator that identifies methods as being a STIX best practice checking
     rule.
 
+    Rules which pass `match` selectors are run by the :class:`_TreeWalker`.
+    The document is traversed once and each rule is passed the nodes which
+    match its selectors, in document order, via the ``nodes`` keyword
+    argument. These rules are passed the :class:`.ValidationContext` for the
+    document in place of the document root, which gives them access to
+    shared document indexes such as :attr:`.ValidationContext.ids`.
+
+    Rules which only need the :class:`.ValidationContext` can pass an empty
+    `match`. Rules without `match` selectors are passed the document root and
+    must find the nodes they inspect themselves (e.g., via xpath).
+
     Args:
-        version: Identifies the minimum version of STIX for which the decorated
+        minver: Identifies the minimum version of STIX for which the decorated
             method applies.
+        maxver: Identifies the maximum version of STIX for which the decorated
+            method applies. If ``None``, there is no maximum version.
+        match: An optional iterable of node selectors. See
+            :func:`_compile_selector` for the supported selector syntax.
+        name: The name of the :class:`BestPracticeWarningCollection` returned
+            by the decorated method. Rules can be selected by this name or
+            by their method name.
+
     """
     def decorator(func):
         func.is_rule = True
         func.min_version = minver
         func.max_version = maxver
+        func.match = tuple(match) if match is not None else None
+        func.name = name
         return func
     return decorator
 
 
+def _get_clark_name(name, namespaces):
+    """Returns the ``{namespace}localname`` form of the ``prefix:localname``
+    `name`.
+
+    """
+    if ":" not in name:
+        return name
+
+    prefix, localname = name.split(":", 1)
+    return "{%s}%s" % (namespaces[prefix], localname)
+
+
+def _compile_selector(selector, namespaces):
+    """Compiles a node selector used by the :class:`_TreeWalker`.
+
+    The following selectors are supported:
+
+    * ``'prefix:Name'``: Elements with the tag ``prefix:Name``.
+    * ``'prefix:Parent/prefix:Name'``: Elements with the tag ``prefix:Name``
+      which are children of a ``prefix:Parent`` element. Any number of
+      parent steps can be given.
+    * ``'*:Name'``: Elements with the localname ``Name`` in any namespace.
+    * ``'@name'`` or ``'@prefix:name'``: Elements with the ``name``
+      attribute.
+
+    Args:
+        selector: A selector string.
+        namespaces: A mapping of namespace prefixes to namespaces.
+
+    Returns:
+        A ``(kind, key, parents)`` tuple. `kind` is one of ``'tag'``,
+        ``'localname'`` or ``'attr'``. `key` is the tag, localname or
+        attribute name to match against. `parents` is a tuple of the tags of
+        the required ancestors, starting with the immediate parent.
+
+    """
+    if selector.startswith("@"):
+        return ('attr', _get_clark_name(selector[1:], namespaces), ())
+
+    steps = selector.split("/")
+    last = steps.pop()
+
+    if last.startswith("*:"):
+        return ('localname', last[2:], ())
+
+    parents = tuple(_get_clark_name(x, namespaces) for x in reversed(steps))
+    return ('tag', _get_clark_name(last, namespaces), parents)
+
+
+def _has_parents(node, parents):
+    """Returns ``True`` if the ancestors of `node` have the tags found in
+    `parents`, starting with the immediate parent of `node`.
+
+    """
+    for tag in parents:
+        node = node.getparent()
+
+        if node is None or node.tag != tag:
+            return False
+
+    return True
+
+
+def _select(nodes, selectors, namespaces):
+    """Returns the nodes in `nodes` which match any of the `selectors`."""
+    compiled = [_compile_selector(x, namespaces) for x in selectors]
+
+    def matches(node):
+        for kind, key, parents in compiled:
+            if kind == 'attr':
+                if key in node.attrib:
+                    return True
+            elif kind == 'localname':
+                if etree.QName(node).localname == key:
+                    return True
+            elif node.tag == key and _has_parents(node, parents):
+                return True
+        return False
+
+    return [x for x in nodes if matches(x)]
+
+
+def _in_document_order(nodes):
+    """Returns `nodes` in document order.
+
+    The `nodes` are expected to be ordered by the position of one of their
+    children. This is document order for unrelated nodes, but can place a
+    node after one of its descendants. Ancestors are moved ahead of their
+    descendants to correct this.
+
+    """
+    members = set(nodes)
+    placed = set()
+    ordered = []
+
+    for node in nodes:
+        if node in placed:
+            continue
+
+        ancestors = [x for x in node.iterancestors() if x in members]
+
+        for ancestor in reversed(ancestors):
+            if ancestor not in placed:
+                ordered.append(ancestor)
+                placed.add(ancestor)
+
+        ordered.append(node)
+        placed.add(node)
+
+    return ordered
+
+
+class _TreeWalker(object):
+    """Finds the nodes that each best practice rule inspects in a single pass
+    over a document.
+
+    Rules register interest in nodes via the ``match`` argument of the
+    :func:`rule` decorator. Each element in the document is visited once and
+    dispatched to the rules with a matching selector.
+
+    Args:
+        rules: A list of :func:`rule` decorated functions with ``match``
+            selectors.
+        namespaces: A mapping of namespace prefixes to namespaces used to
+            resolve the rule selectors.
+
+    """
+    def __init__(self, rules, namespaces):
+        self.rules = rules
+        self._tags = collections.defaultdict(list)
+        self._localnames = collections.defaultdict(list)
+        self._attrs = collections.defaultdict(list)
+
+        for idx, func in enumerate(rules):
+            for selector in func.match:
+                self._add(idx, selector, namespaces)
+
+    def _add(self, idx, selector, namespaces):
+        kind, key, parents = _compile_selector(selector, namespaces)
+
+        if kind == 'tag':
+            self._tags[key].append((idx, parents))
+        elif kind == 'localname':
+            self._localnames[key].append(idx)
+        else:
+            self._attrs[key].append(idx)
+
+    def walk(self, root):
+        """Visits every element under `root` (including `root`) and collects
+        the elements which match each rule.
+
+        Returns:
+            A dictionary mapping each rule function to a list of its matching
+            nodes, in document order.
+
+        """
+        buckets = [[] for _ in self.rules]
+        tags = self._tags
+        localnames = self._localnames
+        attrs = list(iteritems(self._attrs))
+
+        def dispatch(idx, node):
+            # Nodes which match more than one selector are only added once.
+            bucket = buckets[idx]
+            if not bucket or bucket[-1] is not node:
+                bucket.append(node)
+
+        for node in root.iter(etree.Element):
+            tag = node.tag
+
+            for idx, parents in tags.get(tag, ()):
+                if not parents or _has_parents(node, parents):
+                    dispatch(idx, node)
+
+            if localnames:
+                for idx in localnames.get(tag.rpartition("}")[2], ()):
+                    dispatch(idx, node)
+
+            if attrs:
+                attrib = node.attrib
+                for name, indices in attrs:
+                    if name not in attrib:
+                        continue
+                    for idx in indices:
+                        dispatch(idx, node)
+
+        return dict(zip(self.rules, buckets))
+
+
+def _can_run(version, rule_min, rule_max):
+    """Returns ``True`` if a rule applicable to STIX versions `rule_min`
+    through `rule_max` applies to the STIX `version`.
+
+    """
+    if not rule_min:
+        return True
+
+    StrictVersion = distutils.version.StrictVersion
+    doc_ver = StrictVersion(remove_version_prefix(version))
+    min_ver = StrictVersion(remove_version_prefix(rule_min))
+
+    if rule_max:
+        max_ver = StrictVersion(remove_version_prefix(rule_max))
+        return (min_ver <= doc_ver <= max_ver)
+
+    return min_ver <= doc_ver
+
+
+def _select_rules(ruledict, version):
+    """Returns a tuple of the rule functions in `ruledict` which apply to the
+    STIX `version`.
+
+    """
+    rules = []
+
+    for (versions, funcs) in iteritems(ruledict):
+        min_, max_ = versions
+        rules.extend(f for f in funcs if _can_run(version, min_, max_))
+
+    return tuple(rules)
+
+
 class BestPracticeMeta(type):
     """Metaclass that collects all :meth:`rule` decorated methods and
     builds an internal mapping of STIX version numbers to rules.
 
+    The ordered list of rules which apply to each version in
+    :data:`.common.STIX_VERSIONS` is built once, when the class is created.
+
     """
     def __new__(metacls, name, bases, dict_):
         obj = type.__new__(metacls, name, bases, dict_)
@@ -70,6 +421,15 @@ class BestPracticeMeta(type):
         # Attach the rule dictionary to the object instance.
         obj._rules = ruledict  # noqa
 
+        # Map each STIX version to the rules which apply to it.
+        obj._version_rules = dict(  # noqa
+            (version, _select_rules(ruledict, version))
+            for version in common.STIX_VERSIONS
+        )
+
+        # Tree walkers for each (version, rules) pair. See _get_walker().
+        obj._walkers = {}  # noqa
+
         return obj
 
 
@@ -116,6 +476,13 @@ class BestPracticeWarning(collections.MutableMapping, base.ValidationError):
     def __str__(self):
         return unicode(self).encode("utf-8")
 
+    def __getstate__(self):
+        # The etree node cannot be pickled. Everything needed to report the
+        # warning has already been copied out of it.
+        state = self.__dict__.copy()
+        state['_node'] = None
+        return state
+
     def __getitem__(self, key):
         return self._inner.__getitem__(key)
 
@@ -256,16 +623,75 @@ class BestPracticeWarningCollection(collections.MutableSequence):
         return {self.name: [x.as_dict() for x in self]}
 
 
+class BestPracticeRuleTiming(object):
+    """Records the cost of running a single best practice rule against a
+    document. See the ``profile_rules`` argument of
+    :meth:`STIXBestPracticeValidator.validate`.
+
+    Args:
+        rule: The method name of the rule.
+        name: The name of the :class:`BestPracticeWarningCollection`
+            returned by the rule.
+        seconds: The wall time spent running the rule.
+        nodes: The number of nodes passed to the rule by the tree walker.
+            ``None`` for rules which find their own nodes.
+        warnings: The number of warnings the rule emitted.
+
+    Attributes:
+        rule: The method name of the rule.
+        name: The name of the :class:`BestPracticeWarningCollection`
+            returned by the rule.
+        seconds: The wall time spent running the rule.
+        nodes: The number of nodes passed to the rule by the tree walker.
+            ``None`` for rules which find their own nodes.
+        warnings: The number of warnings the rule emitted.
+
+    """
+    def __init__(self, rule, name, seconds, nodes, warnings):
+        self.rule = rule
+        self.name = name
+        self.seconds = seconds
+        self.nodes = nodes
+        self.warnings = warnings
+
+    def as_dict(self):
+        """Returns a dictionary representation.
+
+        Keys:
+            * ``'rule'``: The method name of the rule.
+            * ``'name'``: The name of the rule's warning collection.
+            * ``'seconds'``: The wall time spent running the rule.
+            * ``'nodes'``: The number of nodes passed to the rule.
+            * ``'warnings'``: The number of warnings the rule emitted.
+
+        """
+        d = OrderedDict()
+        d['rule'] = self.rule
+        d['name'] = self.name
+        d['seconds'] = self.seconds
+        d['nodes'] = self.nodes
+        d['warnings'] = self.warnings
+        return d
+
+
 class BestPracticeValidationResults(base.ValidationResults, collections.MutableSequence):
     """Represents STIX best practice validation results. This class behaves
     like a ``list`` and accepts instances of
     :class:`BestPracticeWarningCollection`.
 
+    Attributes:
+        timings: A list of :class:`BestPracticeRuleTiming` instances, one
+            for each rule run, or ``None`` if rules were not profiled.
+        walk_time: The wall time spent finding the nodes inspected by each
+            rule, or ``None`` if rules were not profiled.
+
     """
     def __init__(self):
         base.ValidationResults.__init__(self, False)
 
         self._warnings = []
+        self.timings = None
+        self.walk_time = None
 
     @base.ValidationResults.is_valid.getter
     def is_valid(self):
@@ -327,6 +753,9 @@ class BestPracticeValidationResults(base.ValidationResults, collections.MutableS
               ``True`` or ``False`` .
             * ``'errors'``: A list of :class:`BestPracticeWarningCollection`
               dictionaries.
+            * ``'timings'``: Present if rules were profiled. A dictionary
+              containing the tree walk time (``'walk'``) and a list of
+              :class:`BestPracticeRuleTiming` dictionaries (``'rules'``).
 
         """
         d = base.ValidationResults.as_dict(self)
@@ -334,27 +763,26 @@ class BestPracticeValidationResults(base.ValidationResults, collections.MutableS
         if any(self):
             d['errors'] = [x.as_dict() for x in self if x]
 
+        if self.timings is not None:
+            d['timings'] = {
+                'walk': self.walk_time,
+                'rules': [x.as_dict() for x in self.timings]
+            }
+
         return d
 
 
 class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
     """Performs STIX Best Practice validation."""
 
-    @rule('1.0')
-    def _check_id_presence(self, root, namespaces, version):  # noqa
+    @rule('1.0', match=_CORE_COMPONENTS, name="Missing IDs")
+    def _check_id_presence(self, ctx, namespaces, version, nodes):  # noqa
         """Checks that all major STIX/CybOX constructs have id attributes set.
         Constructs with idref attributes set should not have an id attribute
         and are thus omitted from the results.
 
         """
-        to_check = itertools.chain(
-            common.STIX_CORE_COMPONENTS,
-            common.CYBOX_CORE_COMPONENTS
-        )
-
         results = BestPracticeWarningCollection('Missing IDs')
-        xpath = " | ".join("//%s" % x for x in to_check)
-        nodes = root.xpath(xpath, namespaces=namespaces)
 
         for node in nodes:
             if any(x in node.attrib for x in ('id', 'idref')):
@@ -365,8 +793,8 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    @rule('1.0')
-    def _check_id_format(self, root, namespaces, version):  # noqa
+    @rule('1.0', match=_CORE_COMPONENTS, name="ID Format")
+    def _check_id_format(self, ctx, namespaces, version, nodes):  # noqa
         """Checks that the core STIX/CybOX constructs in the STIX instance
         document have ids and that each id is a valid QName, formatted as
         follows:
@@ -379,19 +807,13 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
             done during XML Schema validation.
 
         """
-        to_check = itertools.chain(
-            common.STIX_CORE_COMPONENTS,
-            common.CYBOX_CORE_COMPONENTS
-        )
-
         results = BestPracticeWarningCollection('ID Format')
         msg = "ID should be formatted as [ns prefix]:[construct type]-[GUID]"
-        xpath = " | ".join("//%s[@id]" % x for x in to_check)
 
-        for node in root.xpath(xpath, namespaces=namespaces):
-            id_ = node.attrib['id']
+        for node in nodes:
+            id_ = node.attrib.get('id')
 
-            if ID_PATTERN.match(id_):
+            if id_ is None or ID_PATTERN.match(id_):
                 continue
 
             result = BestPracticeWarning(node=node, message=msg)
@@ -399,36 +821,49 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    def _get_id_timestamp_conflicts(self, nodes):
+    def _get_id_timestamp_conflicts(self, nodes, timestamps=None):
         """Returns a list of BestPracticeWarnings for all nodes in `nodes`
         that have duplicate (id, timestamp) pairs.
 
+        Args:
+            nodes: A list of nodes which share an id.
+            timestamps: A dictionary used to memoize parsed timestamps. See
+                :func:`.parse_timestamp`.
+
         """
         warns = []
 
-        def _equal_timestamps(nodeset):
-            return [x for x in nodeset if utils.is_equal_timestamp(node, x)]
+        def _timestamp_key(node):
+            timestamp = node.attrib.get('timestamp')
+            timestamp = utils.parse_timestamp(timestamp, timestamps)
 
-        while len(nodes) > 1:
-            node = nodes.pop()
-            ts_equal = _equal_timestamps(nodes)
+            if timestamp is None:
+                return None
 
-            if not ts_equal:
-                continue
+            # Timestamps with and without timezone information are never
+            # equal, so they must not share a key.
+            return (timestamp.utcoffset() is None, timestamp)
 
-            conflicts = itertools.chain(ts_equal, (node,))
+        # Group the nodes by timestamp. Each timestamp is parsed once.
+        groups = OrderedDict()
+        for idx, node in enumerate(nodes):
+            groups.setdefault(_timestamp_key(node), []).append((idx, node))
 
-            for c in conflicts:
-                warning = BestPracticeWarning(node=c)
-                warning['timestamp'] = c.attrib.get('timestamp')
-                warns.append(warning)
+        # Report conflicts starting with the group whose last node appears
+        # latest in `nodes`. Nodes within a group keep their order.
+        conflicts = [x for x in itervalues(groups) if len(x) > 1]
+        conflicts.sort(key=lambda x: x[-1][0], reverse=True)
 
-            utils.remove_all(nodes, ts_equal)
+        for group in conflicts:
+            for _, node in group:
+                warning = BestPracticeWarning(node=node)
+                warning['timestamp'] = node.attrib.get('timestamp')
+                warns.append(warning)
 
         return warns
 
-    @rule('1.2')
-    def _check_1_2_duplicate_ids(self, root, namespaces, version):  # noqa
+    @rule('1.2', match=(), name="Duplicate IDs")
+    def _check_1_2_duplicate_ids(self, ctx, namespaces, version, nodes):  # noqa
         """STIX 1.2 dropped the schematic enforcement of id uniqueness to
         support versioning of components.
 
@@ -438,49 +873,56 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
         results = BestPracticeWarningCollection('Duplicate IDs')
         nlist = namespaces.values()
 
-        # Find all nodes with IDs in the STIX/CybOX namespace
-        nodes = root.xpath("//*[@id]")
-        filtered = [x for x in nodes if utils.namespace(x) in nlist]
+        # Only ids declared more than once can have conflicts.
+        repeated = set(k for k, v in iteritems(ctx.ids) if len(v) > 1)
 
-        # Build a mapping of IDs to nodes
-        idnodes = collections.defaultdict(list)
-        for node in filtered:
-            idnodes[node.attrib.get('id')].append(node)
+        if not repeated:
+            return results
 
-        # Find all nodes that have duplicate IDs
-        dups = [x for x in itervalues(idnodes) if len(x) > 1]
+        # Group the nodes in the STIX/CybOX namespaces by id, in document
+        # order. Groups are ordered by the first of these nodes, ignoring
+        # nodes in other namespaces.
+        idnodes = OrderedDict()
 
-        # Build warnings for all nodes that have conflicting id/timestamp pairs.
-        for nodeset in dups:
-            warns = self._get_id_timestamp_conflicts(nodeset)
+        for node in ctx.root.iter('*'):
+            id_ = node.attrib.get('id')
+
+            if id_ not in repeated or utils.namespace(node) not in nlist:
+                continue
+
+            idnodes.setdefault(id_, []).append(node)
+
+        # Build warnings for all nodes that have conflicting id/timestamp
+        # pairs.
+        for dups in itervalues(idnodes):
+            if len(dups) < 2:
+                continue
+
+            warns = self._get_id_timestamp_conflicts(dups, ctx.timestamps)
             results.extend(warns)
 
         return results
 
-    @rule(minver='1.0', maxver='1.1.1')
-    def _check_1_0_duplicate_ids(self, root, namespaces, version):  # noqa
+    @rule(minver='1.0', maxver='1.1.1', match=(), name="Duplicate IDs")
+    def _check_1_0_duplicate_ids(self, ctx, namespaces, version, nodes):  # noqa
         """Checks for duplicate ids in the document.
 
         """
-        id_nodes = collections.defaultdict(list)
-
-        for node in root.xpath("//*[@id]"):
-            id_nodes[node.attrib['id']].append(node)
-
         results = BestPracticeWarningCollection('Duplicate IDs')
-        for nodes in itervalues(id_nodes):
-            if len(nodes) > 1:
-                results.extend(BestPracticeWarning(node=x) for x in nodes)
+
+        for idnodes in itervalues(ctx.ids):
+            if len(idnodes) > 1:
+                results.extend(BestPracticeWarning(node=x) for x in idnodes)
 
         return results
 
-    @rule('1.0')
-    def _check_idref_resolution(self, root, namespaces, version):  # noqa
+    @rule('1.0', match=('@idref',), name="Unresolved IDREFs")
+    def _check_idref_resolution(self, ctx, namespaces, version, nodes):  # noqa
         """Checks that all idrefs resolve to a construct in the document.
 
         """
-        idrefs = root.xpath("//*[@idref]")
-        ids = root.xpath("//@id")
+        idrefs = nodes
+        ids = ctx.ids
 
         def idref(x):
             return x.attrib['idref']
@@ -491,8 +933,8 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    @rule('1.0')
-    def _check_idref_with_content(self, root, namespaces, version):  # noqa
+    @rule('1.0', match=('@idref',), name="IDREF with Content")
+    def _check_idref_with_content(self, ctx, namespaces, version, nodes):  # noqa
         """Checks that constructs with idref set do not contain content.
 
         Note:
@@ -506,7 +948,6 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
             return utils.has_content(node)
 
-        nodes = root.xpath("//*[@idref]")
         warnings = (BestPracticeWarning(x) for x in nodes if is_invalid(x))
 
         results = BestPracticeWarningCollection("IDREF with Content")
@@ -514,23 +955,16 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    @rule('1.0')
-    def _check_indicator_practices(self, root, namespaces, version):  # noqa
+    @rule('1.0', match=_INDICATORS, name="Indicator Suggestions")
+    def _check_indicator_practices(self, ctx, namespaces, version, nodes):  # noqa
         """Looks for STIX Indicators that are missing a Description, Type,
         Valid_Time_Position, Indicated_TTP, and/or Confidence.
 
         """
-        to_check = (
-            "{0}:Indicator".format(common.PREFIX_STIX_CORE),
-            "{0}:Indicator".format(common.PREFIX_STIX_COMMON),
-            "{0}:Indicator".format(common.PREFIX_STIX_REPORT),
-        )
-
         results = BestPracticeWarningCollection("Indicator Suggestions")
-        xpath = " | ".join("//%s" % x for x in to_check)
         ns = namespaces[common.PREFIX_STIX_INDICATOR]
 
-        for indicator in root.xpath(xpath, namespaces=namespaces):
+        for indicator in nodes:
             missing = []
             if 'idref' not in indicator.attrib:
                 if indicator.find('{%s}Description' % ns) is None:
@@ -551,7 +985,7 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    @rule('1.0')
+    @rule('1.0', name="Root Element")
     def _check_root_element(self, root, namespaces, version):  # noqa
         """Checks that the root element is a STIX_Package.
 
@@ -565,25 +999,28 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    @rule('1.0')
-    def _check_latest_vocabs(self, root, namespaces, version):  # noqa
+    @rule('1.0', match=('@xsi:type',), name="Vocab Suggestions")
+    def _check_latest_vocabs(self, ctx, namespaces, version, nodes):  # noqa
         """Checks that all STIX vocabs are using latest published versions.
         Triggers a warning if an out of date vocabulary is used.
 
         Note:
-            The xpath used to discover instances of controlled vocabularies
-            assumes that the type name ends with 'Vocab-'. An example
+            The discovery of controlled vocabulary instances assumes that
+            the type name ends with 'Vocab-'. An example
             instance would be 'IndicatorTypeVocab-1.0'.
 
         """
         results = BestPracticeWarningCollection("Vocab Suggestions")
-        xpath = "//*[contains(@xsi:type, 'Vocab-')]"
 
-        for vocab in root.xpath(xpath, namespaces=namespaces):
+        for vocab in nodes:
             xsi_type = vocab.attrib[xmlconst.TAG_XSI_TYPE]
+
+            if 'Vocab-' not in xsi_type:
+                continue
+
             name = common.parse_vocab_name(xsi_type)
             found = common.parse_vocab_version(xsi_type)
-            expected = common.get_vocab_version(root, version, xsi_type)
+            expected = common.get_vocab_version(ctx, version, xsi_type)
 
             if found == expected:
                 continue
@@ -596,8 +1033,11 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    @rule('1.0')
-    def _check_latest_versions(self, root, namespaces, version):  # noqa
+    @rule(
+        '1.0', match=common.STIX_CORE_COMPONENTS,
+        name="Latest Component Versions"
+    )
+    def _check_latest_versions(self, ctx, namespaces, version, nodes):  # noqa
         """Checks that all major STIX constructs versions are equal to
         the latest version.
 
@@ -610,10 +1050,15 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
                 return True
             return node.attrib['version'] == expected
 
+        # Group the nodes by tag so results are reported per selector.
+        tagged = collections.defaultdict(list)
+        for node in nodes:
+            tagged[node.tag].append(node)
+
         for selector, expected in iteritems(to_check):
-            xpath = "//%s" % selector
+            tag = _get_clark_name(selector, namespaces)
 
-            for node in root.xpath(xpath, namespaces=namespaces):
+            for node in tagged[tag]:
                 if _is_expected(node, expected):
                     continue
 
@@ -624,13 +1069,11 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    def _check_timestamp_usage(self, root, namespaces, selectors):
+    def _check_timestamp_usage(self, ctx, namespaces, nodes):
         """Inspects each node in `nodes` for correct timestamp use.
 
         """
         results = BestPracticeWarningCollection("Timestamp Use")
-        xpath = " | ".join("//%s" % x for x in selectors)
-        nodes = root.xpath(xpath, namespaces=namespaces)
 
         for node in nodes:
             attrib      = node.attrib.get
@@ -639,7 +1082,7 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
             timestamp   = attrib('timestamp')
 
             if timestamp:
-                tz_set = utils.has_tzinfo(timestamp)
+                tz_set = utils.has_tzinfo(timestamp, ctx.timestamps)
 
                 if not tz_set:
                     warning = BestPracticeWarning(
@@ -661,7 +1104,7 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
                 )
             elif idref and timestamp:
                 resolves = common.idref_timestamp_resolves(
-                    root=root,
+                    root=ctx,
                     idref=idref,
                     timestamp=timestamp,
                     namespaces=namespaces
@@ -684,8 +1127,11 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    @rule(minver='1.1', maxver='1.1.1')
-    def _check_1_1_timestamp_usage(self, root, namespaces, **kwargs):  # noqa
+    @rule(
+        minver='1.1', maxver='1.1.1', match=common.STIX_CORE_COMPONENTS,
+        name="Timestamp Use"
+    )
+    def _check_1_1_timestamp_usage(self, ctx, namespaces, nodes, **kwargs):  # noqa
         """Checks that all major STIX constructs have appropriate
         timestamp usage.
 
@@ -694,12 +1140,14 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
             timestamp attributes.
 
         """
-        to_check = common.STIX_CORE_COMPONENTS
-        results = self._check_timestamp_usage(root, namespaces, to_check)
+        results = self._check_timestamp_usage(ctx, namespaces, nodes)
         return results
 
-    @rule('1.2')
-    def _check_1_2_timestamp_usage(self, root, namespaces, **kwargs):  # noqa
+    @rule(
+        '1.2', match=common.STIX_CORE_COMPONENTS[2:],  # skip STIX Packages
+        name="Timestamp Use"
+    )
+    def _check_1_2_timestamp_usage(self, ctx, namespaces, nodes, **kwargs):  # noqa
         """Checks that all major STIX constructs have appropriate
         timestamp usage.
 
@@ -708,18 +1156,15 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
             timestamp attributes.
 
         """
-        to_check = common.STIX_CORE_COMPONENTS[2:]  # skip STIX Packages
-        results = self._check_timestamp_usage(root, namespaces, to_check)
+        results = self._check_timestamp_usage(ctx, namespaces, nodes)
         return results
 
-    def _check_titles(self, root, namespaces, selectors):
+    def _check_titles(self, ctx, namespaces, nodes):
         """Checks that each node in `nodes` has a ``Title`` element unless
         there is an ``@idref`` attribute set.
 
         """
         results = BestPracticeWarningCollection("Missing Titles")
-        xpath = " | ".join("//%s" % x for x in selectors)
-        nodes = root.xpath(xpath, namespaces=namespaces)
 
         for node in nodes:
             if 'idref' in node.attrib:
@@ -731,69 +1176,37 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    @rule(minver='1.0', maxver='1.1.1')
-    def _check_1_0_titles(self, root, namespaces, version):  # noqa
+    @rule(
+        minver='1.0', maxver='1.1.1', match=_1_0_TITLE_SELECTORS,
+        name="Missing Titles"
+    )
+    def _check_1_0_titles(self, ctx, namespaces, version, nodes):  # noqa
         """Checks that all major STIX constructs have a Title element.
 
         """
-        to_check = (
-            '{0}:STIX_Package/{0}:STIX_Header'.format(common.PREFIX_STIX_CORE),
-            '{0}:Campaign'.format(common.PREFIX_STIX_CORE),
-            '{0}:Campaign'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Course_Of_Action'.format(common.PREFIX_STIX_CORE),
-            '{0}:Course_Of_Action'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Exploit_Target'.format(common.PREFIX_STIX_CORE),
-            '{0}:Exploit_Target'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Incident'.format(common.PREFIX_STIX_CORE),
-            '{0}:Incident'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Indicator'.format(common.PREFIX_STIX_CORE),
-            '{0}:Indicator'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Threat_Actor'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Threat_Actor'.format(common.PREFIX_STIX_CORE),
-            '{0}:TTP'.format(common.PREFIX_STIX_CORE),
-            '{0}:TTP'.format(common.PREFIX_STIX_COMMON)
-        )
-
-        results = self._check_titles(root, namespaces, to_check)
+        results = self._check_titles(ctx, namespaces, nodes)
         return results
 
-    @rule('1.2')
-    def _check_1_2_titles(self, root, namespaces, version):  # noqa
+    @rule('1.2', match=_1_2_TITLE_SELECTORS, name="Missing Titles")
+    def _check_1_2_titles(self, ctx, namespaces, version, nodes):  # noqa
         """Checks that all major STIX constructs have a Title element.
 
         """
-        to_check = (
-            '{0}:Campaign'.format(common.PREFIX_STIX_CORE),
-            '{0}:Campaign'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Course_Of_Action'.format(common.PREFIX_STIX_CORE),
-            '{0}:Course_Of_Action'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Exploit_Target'.format(common.PREFIX_STIX_CORE),
-            '{0}:Exploit_Target'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Incident'.format(common.PREFIX_STIX_CORE),
-            '{0}:Incident'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Indicator'.format(common.PREFIX_STIX_CORE),
-            '{0}:Indicator'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Threat_Actor'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Threat_Actor'.format(common.PREFIX_STIX_CORE),
-            '{0}:TTP'.format(common.PREFIX_STIX_CORE),
-            '{0}:TTP'.format(common.PREFIX_STIX_COMMON),
-            '{0}:Report/{1}:Header'.format(common.PREFIX_STIX_CORE, common.PREFIX_STIX_REPORT),
-            '{0}:Report/{1}:Header'.format(common.PREFIX_STIX_COMMON, common.PREFIX_STIX_REPORT)
-        )
-
-        results = self._check_titles(root, namespaces, to_check)
+        results = self._check_titles(ctx, namespaces, nodes)
         return results
 
-    @rule('1.0')
-    def _check_marking_control_xpath(self, root, namespaces, version):  # noqa
+    @rule(
+        '1.0', match=("%s:Controlled_Structure" % common.PREFIX_DATA_MARKING,),
+        name="Data Marking Control XPath"
+    )
+    def _check_marking_control_xpath(self, ctx, namespaces, version, nodes):  # noqa
         """Checks that data marking controlled structure XPaths are valid
-        and resolve to nodes in the `root` document.
+        and resolve to nodes in the input document.
 
         """
         results = BestPracticeWarningCollection("Data Marking Control XPath")
-        xpath = "//%s:Controlled_Structure" % common.PREFIX_DATA_MARKING
 
-        for elem in root.xpath(xpath, namespaces=namespaces):
+        for elem in nodes:
             if not elem.text:
                 message = "Empty Control XPath"
             else:
@@ -805,8 +1218,11 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    @rule('1.0')
-    def _check_condition_attribute(self, root, namespaces, version):  # noqa
+    @rule(
+        '1.0', match=_INDICATORS,
+        name="Indicator Pattern Properties Missing Condition Attributes"
+    )
+    def _check_condition_attribute(self, ctx, namespaces, version, nodes):  # noqa
         """Checks that Observable properties contain a ``@condition``
         attribute.
 
@@ -823,23 +1239,37 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
             "Indicator Pattern Properties Missing Condition Attributes"
         )
 
-        selectors = (
-            "//{0}:Indicator".format(common.PREFIX_STIX_CORE),
-            "//{0}:Indicator".format(common.PREFIX_STIX_COMMON),
-            "//{0}:Indicator".format(common.PREFIX_STIX_REPORT)
-        )
-
-        xpath = " | ".join(selectors)
-        indicators = root.xpath(xpath, namespaces=namespaces)
+        indicators = nodes
 
         if len(indicators) == 0:
             return results
 
-        def _get_leaves(nodes):
-            """Finds and returns all leaf nodes contained within `nodes`."""
+        xpath = ".//{0}:Properties".format(common.PREFIX_CYBOX_CORE)
+        xpath = common.get_xpath(xpath, namespaces)
+        index = common.get_observable_index(ctx, namespaces)
+
+        # Observables can be referenced by many Indicators. Their leaves
+        # are only collected once.
+        missing = {}
+
+        def _get_missing(obs):
+            """Returns the leaf nodes in the Properties of `obs` which are
+            missing a ``condition`` attribute.
+
+            """
+            try:
+                return missing[obs]
+            except KeyError:
+                pass
+
             leaves = []
-            for n in nodes:
-                leaves.extend(x for x in utils.leaves(n) if utils.has_content(x))
+            for props in xpath(obs):
+                leaves.extend(
+                    x for x in utils.leaves(props)
+                    if utils.has_content(x) and not x.attrib.get('condition')
+                )
+
+            missing[obs] = leaves
             return leaves
 
         def _get_observables(indicators):
@@ -852,23 +1282,18 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
             """
             for indicator in indicators:
                 observables = common.get_indicator_observables(
-                    root=root,
+                    root=ctx,
                     indicator=indicator,
-                    namespaces=namespaces
+                    namespaces=namespaces,
+                    index=index
                 )
                 yield (indicator, observables)
 
-        xpath = ".//{0}:Properties".format(common.PREFIX_CYBOX_CORE)
         for indicator, observables in _get_observables(indicators):
             id_ = indicator.attrib.get('id', 'No ID Found')
 
             for obs in observables:
-                props = obs.xpath(xpath, namespaces=namespaces)
-
-                for leaf in _get_leaves(props):
-                    if leaf.attrib.get('condition'):
-                        continue
-
+                for leaf in _get_missing(obs):
                     result = BestPracticeWarning(leaf)
                     result['parent indicator id'] = id_
                     result['parent indicator line'] = indicator.sourceline
@@ -876,27 +1301,20 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    @rule('1.0')
-    def _check_example_namespace(self, root, namespaces, version):  # noqa
-        """Checks for nodes in the input `root` document that contain IDs
+    @rule('1.0', match=_CORE_COMPONENTS, name="IDs Use Example Namespace")
+    def _check_example_namespace(self, ctx, namespaces, version, nodes):  # noqa
+        """Checks for nodes in the input document that contain IDs
         which fall under the ``example`` namespace.
 
         """
         ex_namespaces = ('http://example.com', 'http://example.com/')
 
-        # Get all the namespaces used in the document
-        doc_nsmap = utils.get_document_namespaces(root)
-
-        # Element tags to check for example ID presence
-        to_check = itertools.chain(
-            common.STIX_CORE_COMPONENTS,
-            common.CYBOX_CORE_COMPONENTS
-        )
+        # All the namespaces used in the document. Only collected if needed.
+        doc_nsmap = None
 
         results = BestPracticeWarningCollection('IDs Use Example Namespace')
-        xpath = " | ".join("//%s" % x for x in to_check)
 
-        for node in root.xpath(xpath, namespaces=namespaces):
+        for node in nodes:
             if 'id' not in node.attrib:
                 continue
 
@@ -907,6 +1325,9 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
                 continue
 
             # Try to get the namespace mapped to the ID ns prefix
+            if doc_nsmap is None:
+                doc_nsmap = utils.get_document_namespaces(ctx)
+
             prefix = id_parts[0]
             ns = doc_nsmap.get(prefix)
 
@@ -918,33 +1339,12 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    def _get_1_2_tlo_deprecations(self, root, namespaces):
+    def _get_1_2_tlo_deprecations(self, nodes, namespaces):
         """Checks for the existence of any idref elements inside the STIX
         Package top-level collections.
 
         """
-        stix = (
-            '//{0}:Campaigns/{0}:Campaign',
-            '//{0}:Courses_Of_Action/{0}:Course_Of_Action',
-            '//{0}:Exploit_Targets/{0}:Exploit_Target',
-            '//{0}:Incidents/{0}:Incident',
-            '//{0}:Indicators/{0}:Indicator',
-            '//{0}:Threat_Actors/{0}:Threat_Actor',
-            '//{0}:TTPs/{0}:TTP',
-            '//{0}:Related_Packages/{0}:Related_Package/{0}:Package',
-        )
-
-        cybox = "//{0}:Observables/{1}:Observable".format(
-            common.PREFIX_STIX_CORE,
-            common.PREFIX_CYBOX_CORE
-        )
-
-        # Combine the STIX and CybOX selectors
-        to_check = [x.format(common.PREFIX_STIX_CORE) for x in stix]
-        to_check.append(cybox)
-
-        xpath = " | ".join(to_check)
-        nodes = root.xpath(xpath, namespaces=namespaces)
+        nodes = _select(nodes, _1_2_TLO_SELECTORS, namespaces)
 
         # Create result collection
         msg = "IDREFs in top-level collections is deprecated."
@@ -960,41 +1360,22 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return warns
 
-    def _get_1_2_related_package_deprecations(self, root, namespaces):
+    def _get_1_2_related_package_deprecations(self, nodes, namespaces):
         """Checks for deprecated use of Related_Packages in STIX component
         instances.
 
         """
-        selector = "//{0}:Related_Packages"
-        prefixes = (
-            common.PREFIX_STIX_CAMPAIGN,
-            common.PREFIX_STIX_COA,
-            common.PREFIX_STIX_EXPLOIT_TARGET,
-            common.PREFIX_STIX_INCIDENT,
-            common.PREFIX_STIX_INDICATOR,
-            common.PREFIX_STIX_THREAT_ACTOR,
-            common.PREFIX_STIX_TTP
-        )
-
-        to_check = (selector.format(prefix) for prefix in prefixes)
-        xpath = " | ".join(to_check)
-        nodes = root.xpath(xpath, namespaces=namespaces)
+        nodes = _select(nodes, _1_2_RELATED_PACKAGE_SELECTORS, namespaces)
 
         msg = "Use of Related_Packages is deprecated."
         warns = [BestPracticeWarning(node=x, message=msg) for x in nodes]
         return warns
 
-    def _get_1_2_package_deprecations(self, root, namespaces):
+    def _get_1_2_package_deprecations(self, nodes, namespaces):
         """Checks for deprecated fields on STIX Package instances.
 
         """
-        to_check = (
-            "//{0}:STIX_Package".format(common.PREFIX_STIX_CORE),
-            "//{0}:Package".format(common.PREFIX_STIX_CORE)
-        )
-
-        xpath = " | ".join(to_check)
-        nodes = root.xpath(xpath, namespaces=namespaces)
+        nodes = _select(nodes, _1_2_PACKAGE_SELECTORS, namespaces)
 
         warns = []
         for node in nodes:
@@ -1012,20 +1393,11 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return warns
 
-    def _get_1_2_header_warnings(self, root, namespaces):
+    def _get_1_2_header_warnings(self, nodes, namespaces):
         """Checks for deprecated fields on STIX Header instances.
 
         """
-        to_check = (
-            "{0}:Title".format(common.PREFIX_STIX_CORE),
-            "{0}:Description".format(common.PREFIX_STIX_CORE),
-            "{0}:Short_Description".format(common.PREFIX_STIX_CORE),
-            "{0}:Package_Intent".format(common.PREFIX_STIX_CORE),
-        )
-
-        header = "//{0}:STIX_Header".format(common.PREFIX_STIX_CORE)
-        xpath = " | ".join("%s/%s" % (header, x) for x in to_check)
-        nodes = root.xpath(xpath, namespaces=namespaces)
+        nodes = _select(nodes, _1_2_HEADER_SELECTORS, namespaces)
         fmt = "%s is deprecated in STIX Header."
 
         warns = []
@@ -1038,29 +1410,32 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return warns
 
-    @rule('1.2')
-    def _check_1_2_deprecations(self, root, namespaces, version):  # noqa
-        """Checks the input document `root` for fields that were deprecated
+    @rule(
+        '1.2', match=_1_2_DEPRECATION_SELECTORS,
+        name="STIX 1.2 Deprecations"
+    )
+    def _check_1_2_deprecations(self, ctx, namespaces, version, nodes):  # noqa
+        """Checks the input document for fields that were deprecated
         in STIX v1.2.
 
         """
         package_warnings = self._get_1_2_package_deprecations(
-            root=root,
+            nodes=nodes,
             namespaces=namespaces
         )
 
         header_warnings = self._get_1_2_header_warnings(
-            root=root,
+            nodes=nodes,
             namespaces=namespaces
         )
 
         tlo_warnings = self._get_1_2_tlo_deprecations(
-            root=root,
+            nodes=nodes,
             namespaces=namespaces
         )
 
         related_package_warnings= self._get_1_2_related_package_deprecations(
-            root=root,
+            nodes=nodes,
             namespaces=namespaces
         )
 
@@ -1076,21 +1451,22 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return results
 
-    def _get_campaign_related_indicators(self, root, namespaces):
-        xpath = ".//{0}:Related_Indicators".format(common.PREFIX_STIX_CAMPAIGN)
-        nodes = root.xpath(xpath, namespaces=namespaces)
+    def _get_campaign_related_indicators(self, nodes):
         msg = "Related_Indicators has been deprecated in Campaign."
         return [BestPracticeWarning(node=n, message=msg) for n in nodes]
 
 
-    @rule('1.1')
-    def _check_1_1_deprecations(self, root, namespaces, version):  # noqa
-        """Checks the input document `root` for fields that were deprecated
+    @rule(
+        '1.1', match=("%s:Related_Indicators" % common.PREFIX_STIX_CAMPAIGN,),
+        name="STIX 1.1 Deprecations"
+    )
+    def _check_1_1_deprecations(self, ctx, namespaces, version, nodes):  # noqa
+        """Checks the input document for fields that were deprecated
         in STIX v1.1.
 
         """
         results = BestPracticeWarningCollection("STIX 1.1 Deprecations")
-        warns = self._get_campaign_related_indicators(root, namespaces)
+        warns = self._get_campaign_related_indicators(nodes)
         results.extend(warns)
 
         return results
@@ -1145,8 +1521,11 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         return warns
 
-    @rule('1.2')
-    def _check_structured_text_ordinalities(self, root, namespaces, version):  # noqa
+    @rule(
+        '1.2', match=("*:%s" % x for x in _STRUCTURED_TEXT_TAGS),
+        name="StructuredText @ordinality Use"
+    )
+    def _check_structured_text_ordinalities(self, ctx, namespaces, version, nodes):  # noqa
         """Checks the input STIX document for correct ordinality usage in
         StructuredText lists.
 
@@ -1154,82 +1533,218 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
         that have lists of StructuredText instances.
 
         """
+        # Count the StructuredTextType children (e.g., Description) of each
+        # parent node.
+        counts = collections.defaultdict(OrderedDict)
 
-        # Selects nodes that have more than one instance of a specific
-        # StructuredTextType child (i.e., more than one Description child).
-        xpath_fmt = "//*[count(child::*[local-name()='{0}']) > 1]"
+        for node in nodes:
+            parent = node.getparent()
 
-        tags = (
-            "Description",
-            "Short_Description",
-            "Description_Of_Effect",
-            "Business_Function_Or_Role"
-        )
+            if parent is None:
+                continue
+
+            parents = counts[utils.localname(node)]
+            parents[parent] = parents.get(parent, 0) + 1
 
         title = "StructuredText @ordinality Use"
         results = BestPracticeWarningCollection(title)
         nslist = namespaces.values()
 
-        for tag in tags:
-            xpath = xpath_fmt.format(tag)
-            nodes = root.xpath(xpath, namespaces=namespaces)
+        for tag in _STRUCTURED_TEXT_TAGS:
+            # Nodes that have more than one instance of a specific
+            # StructuredTextType child (i.e., more than one Description child).
+            parents = [k for k, v in iteritems(counts[tag]) if v > 1]
 
-            if len(nodes) == 0:
+            if len(parents) == 0:
                 continue
 
-            warns = self._get_bad_ordinalities(nodes, tag, nslist)
+            parents = _in_document_order(parents)
+            warns = self._get_bad_ordinalities(parents, tag, nslist)
             results.extend(warns)
 
         return results
 
-    def _get_rules(self, version):
+    @classmethod
+    def get_rule_names(cls, version=None):
+        """Returns the names of the best practice rules defined by this class.
+
+        Args:
+            version: If not ``None``, only the names of rules which apply to
+                this STIX version are returned.
+
+        Returns:
+            A list of rule method names, in the order they are run.
+
+        """
+        if version is None:
+            rules = itertools.chain.from_iterable(itervalues(cls._rules))
+        else:
+            rules = cls._version_rules.get(version, ())
+
+        return [f.__name__ for f in rules]
+
+    @classmethod
+    def find_rules(cls, names):
+        """Returns the best practice rule functions identified by `names`.
+
+        Args:
+            names: An iterable of rule names. Each name can be a rule method
+                name (see :meth:`get_rule_names`) or the name of the
+                :class:`BestPracticeWarningCollection` a rule returns (e.g.,
+                ``'Unresolved IDREFs'``). A collection name selects every
+                rule which returns that collection.
+
+        Returns:
+            A set of rule functions.
+
+        Raises:
+            ValueError: If `names` contains a name which does not identify
+                a best practice rule.
+
+        """
+        names = set(names)
+        rules = itertools.chain.from_iterable(itervalues(cls._rules))
+        found = set(f for f in rules if names & set((f.__name__, f.name)))
+
+        known = set(f.__name__ for f in found)
+        known.update(f.name for f in found)
+        unknown = names - known
+
+        if unknown:
+            raise ValueError(
+                "Unknown best practice rule(s): %s" % sorted(unknown)
+            )
+
+        return found
+
+    def _get_rules(self, version, rules=None, exclude=None):
         """Returns a list of best practice check functions that are applicable
         to the STIX `version`.
 
+        Args:
+            version: A STIX version number.
+            rules: An optional iterable of rule names. If not ``None``, only
+                these rules are returned. See :meth:`find_rules`.
+            exclude: An optional iterable of rule names which are not
+                returned.
+
+        Raises:
+            ValueError: If `rules` or `exclude` contain a name which is not
+                a best practice rule.
+
         """
-        def can_run(stix_version, rule_min, rule_max):
-            if not rule_min:
-                return True
+        try:
+            applicable = self._version_rules[version]  # noqa
+        except KeyError:
+            applicable = _select_rules(self._rules, version)  # noqa
 
-            doc_ver = StrictVersion(remove_version_prefix(stix_version))
-            min_ver = StrictVersion(remove_version_prefix(rule_min))
+        if rules is not None:
+            rules = self.find_rules(rules)
+            applicable = [f for f in applicable if f in rules]
 
-            if rule_max:
-                max_ver = StrictVersion(remove_version_prefix(rule_max))
-                return (min_ver <= doc_ver <= max_ver)
+        if exclude is not None:
+            exclude = self.find_rules(exclude)
+            applicable = [f for f in applicable if f not in exclude]
 
-            return min_ver <= doc_ver
+        return list(applicable)
 
-        StrictVersion = distutils.version.StrictVersion
-        all_rules = iteritems(self._rules)  # noqa
+    def _get_walker(self, version, rules):
+        """Returns a :class:`_TreeWalker` for the `rules` which apply to the
+        STIX `version`. Walkers are cached on the class.
+
+        """
+        rules = tuple(f for f in rules if f.match)
+        key = (version, rules)
 
-        # Get a generator which yields all best practice methods that are
-        # assigned a version number <= the input STIX document version number.
-        rules = []
+        try:
+            return self._walkers[key]  # noqa
+        except KeyError:
+            namespaces = common.get_stix_namespaces(version)
+            walker = _TreeWalker(list(rules), namespaces)
+            self._walkers[key] = walker  # noqa
+            return walker
+
+    def _run_rule(self, func, ctx, namespaces, version, matches):
+        """Runs the rule `func` and returns its
+        :class:`BestPracticeWarningCollection`.
+
+        """
+        kwargs = dict(namespaces=namespaces, version=version)
 
-        for (versions, funcs) in all_rules:
-            min_, max_ = versions
-            rules.extend(f for f in funcs if can_run(version, min_, max_))
+        if func.match is not None:
+            kwargs['nodes'] = matches.get(func, [])
+            return func(self, ctx, **kwargs)
 
-        return rules
+        return func(self, ctx.root, **kwargs)
 
-    def _run_rules(self, root, version):
+    def _run_rules(self, ctx, version, rules=None, exclude=None,
+                   profile_rules=False):
         """Runs all best practice rules applicable to a `version` of STIX
-        against the `root` document.
+        against the document held by the :class:`.ValidationContext` `ctx`.
+
+        If `rules` is not ``None``, only the named rules are run. Rules named
+        in `exclude` are not run. If `profile_rules` is ``True``, the cost
+        of each rule is recorded on the ``timings`` attribute of the results.
 
         """
         namespaces = common.get_stix_namespaces(version)
         results = BestPracticeValidationResults()
-        rules = self._get_rules(version)
+        rules = self._get_rules(version, rules, exclude)
+
+        if profile_rules:
+            return self._profile_rules(ctx, version, rules, results)
+
+        # Find the nodes inspected by each rule in a single document pass.
+        walker = self._get_walker(version, rules)
+        matches = walker.walk(ctx.root)
+
+        for func in rules:
+            result = self._run_rule(func, ctx, namespaces, version, matches)
+            results.append(result)
+
+        return results
+
+    def _profile_rules(self, ctx, version, rules, results):
+        """Runs `rules` as :meth:`_run_rules` does, recording the wall time,
+        number of nodes inspected and number of warnings emitted by each
+        rule.
+
+        """
+        timer = timeit.default_timer
+        namespaces = common.get_stix_namespaces(version)
+        walker = self._get_walker(version, rules)
+
+        start = timer()
+        matches = walker.walk(ctx.root)
+        results.walk_time = timer() - start
+        results.timings = []
 
         for func in rules:
-            result = func(self, root, namespaces=namespaces, version=version)
+            start = timer()
+            result = self._run_rule(func, ctx, namespaces, version, matches)
+            seconds = timer() - start
+
+            if func.match is not None:
+                nodes = len(matches.get(func, ()))
+            else:
+                nodes = None
+
+            timing = BestPracticeRuleTiming(
+                rule=func.__name__,
+                name=func.name,
+                seconds=seconds,
+                nodes=nodes,
+                warnings=len(result) if result else 0
+            )
+
+            results.timings.append(timing)
             results.append(result)
 
         return results
 
     @common.check_stix
-    def validate(self, doc, version=None):
+    def validate(self, doc, version=None, rules=None, exclude=None,
+                 profile_rules=False):
         """Checks that a STIX document aligns with `suggested authoring
         practices`_.
 
@@ -1237,16 +1752,27 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
 
         Args:
             doc: The STIX document. Can be a filename, file-like object,
-                lxml._Element, or lxml._ElementTree instance.
+                lxml._Element, lxml._ElementTree, or
+                :class:`.ValidationContext` instance.
             version: The version of the STIX document. This will determine the
                 set of best practice rules to check. If ``None`` an attempt
                 will be made to extract the version from `doc`.
+            rules: An optional iterable of rule names (see
+                :meth:`find_rules`). If ``None``, every rule applicable to
+                `version` is run. Otherwise only the named rules which apply
+                to `version` are run.
+            exclude: An optional iterable of rule names which are not run.
+            profile_rules: If ``True``, the wall time, number of nodes
+                inspected and number of warnings emitted by each rule are
+                recorded on the ``timings`` attribute of the results.
 
         Returns:
             An instance of
             :class:`.BestPracticeValidationResults`.
 
         Raises:
+            ValueError: If `rules` or `exclude` contain a name which is not
+                a best practice rule.
             .UnknownSTIXVersionError: If `version` was ``None`` and `doc`
                 did not contain any version information.
             .InvalidSTIXVersionError: If discovered version or `version`
@@ -1254,17 +1780,20 @@ class STIXBestPracticeValidator(with_metaclass(BestPracticeMeta, object)):
             .ValidationError: If there are any issues parsing `doc`.
 
         """
-        # Get the element for the input document
-        root = utils.get_etree_root(doc)
-
         # Get the STIX version for the input `doc` if one is not passed in.
-        version = version or common.get_version(root)
+        version = version or common.get_version(doc)
 
         # Check that the version number is a valid STIX version number
         common.check_version(version)
 
         # Run the best practice checks applicable for the STIX version number.
-        results = self._run_rules(root, version)
+        results = self._run_rules(
+            doc,
+            version,
+            rules=rules,
+            exclude=exclude,
+            profile_rules=profile_rules
+        )
 
         # Return the results
         return results
@@ -1274,5 +1803,6 @@ __all__ = [
     'STIXBestPracticeValidator',
     'BestPracticeValidationResults',
     'BestPracticeWarningCollection',
-    'BestPracticeWarning'
+    'BestPracticeWarning',
+    'BestPracticeRuleTiming'
 ]
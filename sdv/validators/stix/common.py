@@ -8,6 +8,7 @@ from distutils.version import StrictVersion
 
 # external
 from lxml import etree
+from mixbox.vendor.six import iteritems
 
 # internal
 from sdv import errors, utils, xmlconst
@@ -18,6 +19,9 @@ _COMPONENT_SELECTOR = "../../../descendant-or-self::node()  | ../../../descendan
 _GLOBAL_SELECTOR_PARTS = frozenset(_GLOBAL_SELECTOR.split())
 _COMPONENT_SELECTOR_PARTS = frozenset(_COMPONENT_SELECTOR.split())
 
+# Compiled etree.XPath objects. See get_xpath().
+_XPATHS = {}
+
 PREFIX_XSI = 'xsi'
 PREFIX_STIX_CORE = 'stix-core'
 PREFIX_STIX_COMMON = 'stix-common'
@@ -398,14 +402,22 @@ def get_version(doc):
             ``version`` attribute on the root node.
         .ValidationError: If there are any issues parsing `doc`.
     """
+    if isinstance(doc, utils.ValidationContext) and doc.version:
+        return doc.version
+
     root = utils.get_etree_root(doc)
 
     try:
-        return root.attrib['version']
+        version = root.attrib['version']
     except KeyError:
         error = "Document did not contain a 'version' attribute"
         raise errors.UnknownSTIXVersionError(error)
 
+    if isinstance(doc, utils.ValidationContext):
+        doc.version = version
+
+    return version
+
 
 def check_version(version):
     """Raises an exception if `version` is not a valid STIX version.
@@ -493,11 +505,70 @@ def get_stix_namespaces(version):
     return nsmap
 
 
-def _get_observable(root, obs, namespaces):
+def get_xpath(expression, namespaces):
+    """Returns a compiled ``etree.XPath`` for `expression`.
+
+    Compiled expressions are cached and keyed on `expression` and the
+    contents of `namespaces`. Each expression is therefore compiled once per
+    STIX version namespace map (see :func:`get_stix_namespaces`).
+
+    Args:
+        expression: An XPath expression.
+        namespaces: A mapping of namespace aliases to namespaces used in
+            `expression`.
+
+    """
+    key = (expression, frozenset(iteritems(namespaces)))
+
+    try:
+        return _XPATHS[key]
+    except KeyError:
+        xpath = etree.XPath(expression, namespaces=namespaces)
+        _XPATHS[key] = xpath
+        return xpath
+
+
+def _get_document_context(root):
+    """Returns a :class:`.ValidationContext` for the whole document which
+    contains `root`.
+
+    If `root` is an element, the context is built from its root tree, so
+    that ids declared outside the subtree of `root` are indexed as well.
+
+    """
+    if isinstance(root, etree._Element):  # noqa
+        root = root.getroottree()
+
+    return utils.get_context(root)
+
+
+def get_observable_index(root, namespaces):
+    """Returns a dictionary mapping Observable ``id`` values to the
+    Observable elements in the document containing `root`.
+
+    The index is built once per :class:`.ValidationContext`. Pass the same
+    :class:`.ValidationContext` as `root` to share it across calls.
+
+    Args:
+        root: The etree STIX document, an element within it or its
+            :class:`.ValidationContext`.
+        namespaces: A mapping of namespace aliases to namespaces.
+
+    """
+    ctx = _get_document_context(root)
+    tag = "{%s}Observable" % namespaces[PREFIX_CYBOX_CORE]
+    return ctx.get_tag_ids(tag)
+
+
+def _get_observable(root, obs, namespaces, index=None):
     """Attempts to return the Observable definition for `obs`. If `obs` is a
     fully defined (not idref'd) Observable, this function will immediately
     return `obs`.
 
+    Idrefs are resolved with the Observable `index` (see
+    :func:`get_observable_index`). If `index` is ``None``, the index for
+    `root` is used.
+
     If `obs` contains an ``idref`` attribute, an attempt will be made to
     resolve the Observable definition. If the attempt fails, `obs` will be
     returned.
@@ -511,11 +582,13 @@ def _get_observable(root, obs, namespaces):
     if not idref:
         return obs
 
-    xpath = "//{0}:Observable[@id='{1}']".format(PREFIX_CYBOX_CORE, idref)
-    nodes = root.xpath(xpath, namespaces=namespaces)
+    if index is None:
+        index = get_observable_index(root, namespaces)
 
-    if len(nodes) != 0:
-        return nodes[0]
+    try:
+        return index[idref]
+    except KeyError:
+        pass
 
     raise errors.IdrefLookupError(
         idref=idref,
@@ -523,26 +596,33 @@ def _get_observable(root, obs, namespaces):
     )
 
 
-def get_indicator_observables(root, indicator, namespaces):
+def get_indicator_observables(root, indicator, namespaces, index=None):
     """Returns all Observable instances embedded or referenced within the
     `indicator`.
 
     Args:
-        root: The etree STIX document.
+        root: The etree STIX document or its :class:`.ValidationContext`.
         indicator: A STIX Indicator etree instance.
         namespaces: A mapping of namespace aliases to namespaces to be used
             by the XPath engine.
+        index: An optional Observable index used to resolve idrefs. See
+            :func:`get_observable_index`. If ``None``, the index for `root`
+            is used.
 
     Returns:
         A list of Observable instances.
 
     """
     xpath = ".//{0}:Observable".format(PREFIX_STIX_INDICATOR)
+    xpath = get_xpath(xpath, namespaces)
+
+    if index is None:
+        index = get_observable_index(root, namespaces)
 
     observables = []
-    for node in indicator.xpath(xpath, namespaces=namespaces):
+    for node in xpath(indicator):
         with utils.ignored(errors.IdrefLookupError):
-            obs = _get_observable(root, node, namespaces)
+            obs = _get_observable(root, node, namespaces, index)
             observables.append(obs)
 
     return observables
@@ -560,34 +640,35 @@ def check_stix(func):
     """Decorator which checks that the input document is a STIX document."""
 
     @functools.wraps(func)
-    def inner(*args, **kwargs):
-        try:
-            doc = args[1]
-        except IndexError:
-            doc = kwargs['doc']
-
-        # Get the root element for the input doc
-        root = utils.get_etree_root(doc)
+    def inner(self, doc, *args, **kwargs):
+        # Parse the input doc once and share it with the wrapped method
+        doc = utils.get_context(doc)
 
         # Check that the root is a valid STIX root-level element
-        check_root(root)
+        check_root(doc.root)
 
-        return func(*args, **kwargs)
+        return func(self, doc, *args, **kwargs)
 
     return inner
 
 
 def idref_timestamp_resolves(root, idref, timestamp, namespaces):
     """Determines if an `idref` and `timestamp` pair resolve to an XML
-    component under `root`.
+    component in the document containing `root`.
+
+    Note:
+        Pass a :class:`.ValidationContext` as `root` when resolving many
+        idrefs, so that its id index is built once and shared.
 
     """
-    root = utils.get_etree_root(root)
-    timestamp = utils.parse_timestamp(timestamp)
-    xpath = "//*[@id='{0}']".format(idref)
-    nodes = root.xpath(xpath, namespaces=namespaces)
+    ctx = _get_document_context(root)
+    timestamp = utils.parse_timestamp(timestamp, ctx.timestamps)
+    nodes = ctx.ids.get(idref, ())
 
-    return any(utils.is_equal_timestamp(timestamp, node) for node in nodes)
+    return any(
+        utils.is_equal_timestamp(timestamp, node, ctx.timestamps)
+        for node in nodes
+    )
 
 
 def is_global_xpath(selector):
@@ -3,6 +3,7 @@
 
 # builtin
 import os
+import hashlib
 import itertools
 import collections
 import functools
@@ -15,10 +16,17 @@ from lxml import etree
 
 # internal
 from sdv import errors, utils, xmlconst
+from sdv.version import __version__
 
 # relative
 from . import common
-from .. import schematron
+from .. import base, schematron
+
+# Python 2.6 doesn't have collections.OrderedDict :(
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
 
 
 # Rule worksheet columns
@@ -65,6 +73,11 @@ SAXON_LINENO = '[<value-of select="saxon:line-number()"/>]'
 # Used to get the name of the context node.
 NAME = '<value-of select="name()"/>'
 
+# Profile validation engines
+ENGINE_XSLT = "xslt"      # Validator XSLT generated from the Schematron
+ENGINE_NATIVE = "native"  # Profile rules evaluated directly as XPath
+ENGINES = (ENGINE_XSLT, ENGINE_NATIVE)
+
 
 class InstanceMapping(object):
     """Contains information about an entry in the Instance Mapping worksheet
@@ -158,6 +171,53 @@ class InstanceMapping(object):
             raise errors.ProfileParseError(err.format(label=self.label))
 
 
+def _split_union(ctx):
+    """Splits the rule context `ctx` into its union members.
+
+    Whitespace outside of string literals is removed from each member, so
+    that equivalent selectors compare equal.
+
+    Returns:
+        A list of selector strings.
+
+    """
+    selectors = []
+    current = []
+    depth = 0
+    quote = None
+
+    for char in ctx:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "[(":
+            depth += 1
+        elif char in "])":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            selectors.append("".join(current))
+            current = []
+            continue
+        elif char.isspace():
+            continue
+
+        current.append(char)
+
+    selectors.append("".join(current))
+    return [x for x in selectors if x]
+
+
+def _get_context_key(ctx):
+    """Returns a key which is equal for equivalent rule contexts. That is,
+    contexts which union the same selectors in any order or with different
+    whitespace.
+
+    """
+    return frozenset(_split_union(ctx))
+
+
 class Profile(collections.MutableSequence):
     def __init__(self, namespaces):
         self.id = "STIX_Schematron_Profile"
@@ -208,37 +268,77 @@ class Profile(collections.MutableSequence):
           ``context`` property. This should probably follow the rules
           described above, but doesn't for no good reason.
 
+        Equivalent contexts (e.g., ``"a | b"`` and ``"b | a"``) are merged
+        under the first context seen, so that each context node is matched by
+        a single ``<rule>``.
+
         Returns:
-            A dictionary of lists of rules associated by ``<rule>`` context.
+            An ordered dictionary of lists of rules associated by ``<rule>``
+            context.
         """
-        collected = collections.defaultdict(list)
+        collected = OrderedDict()
+        contexts = {}
 
         for rule in self:
-            collected[rule.context_selector].append(rule)
+            ctx = rule.context_selector
+            ctx = contexts.setdefault(_get_context_key(ctx), ctx)
+            collected.setdefault(ctx, []).append(rule)
 
         return collected
 
-    @property
-    def rules(self):
-        """Builds and returns a dictionary of ``BaseProfileRule``
-        implementations. The key is the Rule context.
+    def _get_patterns(self):
+        """Groups the collected rules into Schematron patterns.
+
+        Rule contexts which select on an ``@xsi:type`` value are placed in
+        the ``"xsi-typed"`` pattern. All others are placed in the
+        ``"no-type"`` pattern.
+
+        Within a pattern, a node is only checked by the first rule whose
+        context matches it, so contexts keep their profile order.
+
+        Note:
+            Contexts which are only spelled differently, such as
+            ``"a | b"`` and ``"b | a"``, share one rule. Before they were
+            merged, the later context never matched a node, so its
+            assertions were never checked. They are now checked and can
+            report errors.
+
+        Returns:
+            A list of ``(pattern id, contexts)`` tuples, where `contexts` is
+            a list of ``(context, rules)`` tuples.
 
         """
-        notype  = schematron.make_pattern("no-type")
-        typed   = schematron.make_pattern("xsi-typed")
-        rules   = [notype, typed]
+        notype = []
+        typed = []
 
         collected = self._collect_rules()
         for ctx, profile_rules in iteritems(collected):
-            rule = schematron.make_rule(ctx)
-            rule.extend(x.as_etree() for x in profile_rules)
-
             if "@xsi:type=" in utils.strip_whitespace(ctx):
-                typed.append(rule)
+                typed.append((ctx, profile_rules))
             else:
-                notype.append(rule)
+                notype.append((ctx, profile_rules))
 
-        return rules
+        return [("no-type", notype), ("xsi-typed", typed)]
+
+    @property
+    def rules(self):
+        """Builds and returns a list of Schematron ``<pattern>`` elements
+        containing a ``<rule>`` for each rule context.
+
+        """
+        patterns = []
+
+        for id_, contexts in self._get_patterns():
+            pattern = schematron.make_pattern(id_)
+
+            for ctx, profile_rules in contexts:
+                rule = schematron.make_rule(ctx)
+                rule.extend(x.as_etree() for x in profile_rules)
+                pattern.append(rule)
+
+            patterns.append(pattern)
+
+        return patterns
 
     @property
     def namespaces(self):
@@ -582,16 +682,21 @@ class RootRule(RequiredRule):
 class ProfileError(schematron.SchematronError):
     """Represents STIX profile validation error.
 
+    The line number is carried in the error message produced by the profile
+    XSLT, so it does not need to be resolved against `doc`.
+
     Args:
         doc: The instance document which was validated and produced this error.
         error: The ``svrl:failed-assert`` or ``svrl:successful-report``
             ``etree._Element`` instance.
+        resolver: A ``_LineResolver`` for `doc`. This is only used if the
+            error message does not contain a line number.
 
     Attributes:
         message: The STIX Profile validation error message.
     """
-    def __init__(self, doc, error):
-        super(ProfileError, self).__init__(doc, error)
+    def __init__(self, doc, error, resolver=None):
+        super(ProfileError, self).__init__(doc, error, resolver)
         self._line = self._parse_line(error.node)
 
     def _parse_line(self, error):
@@ -638,6 +743,47 @@ class ProfileError(schematron.SchematronError):
         return text[:text.rfind(' [')]
 
 
+class NativeProfileError(base.ValidationError):
+    """Represents a STIX profile validation error found by the native
+    profile engine.
+
+    This is the native engine counterpart of :class:`ProfileError`. It is
+    built directly from the failed profile rule rather than parsed from an
+    SVRL report.
+
+    Args:
+        message: The STIX Profile validation error message.
+        line: The line number of the node which failed the profile rule.
+        context: The rule context which selected the failing node.
+
+    Attributes:
+        message: The STIX Profile validation error message.
+        line: A string line number, as reported by :class:`ProfileError`.
+        context: The rule context which selected the failing node.
+
+    """
+    def __init__(self, message, line, context=None):
+        super(NativeProfileError, self).__init__()
+        self.message = message
+        self.line = None if line is None else str(line)
+        self.context = context
+
+    def __unicode__(self):
+        return u"%s" % self.message
+
+    def __str__(self):
+        return "%s" % self.message
+
+    def as_dict(self):
+        """Returns a dictionary representation.
+
+        Keys:
+            * ``'message'``: The error message
+            * ``'line'``: The line number associated with the error
+        """
+        return dict(message=self.message, line=self.line)
+
+
 class ProfileValidationResults(schematron.SchematronValidationResults):
     """Represents STIX profile validation results. This is returned from
     the :meth:`STIXProfileValidator.validate` method.
@@ -648,34 +794,409 @@ class ProfileValidationResults(schematron.SchematronValidationResults):
             lxml._Element.
         svrl_report: The SVRL report. This is an instance of
             ``lxml.isoschematron.Schematron.validation_report``
+        errors: A list of :class:`NativeProfileError` instances. This is
+            used by the native profile engine, which does not produce an
+            SVRL report.
+        max_errors: A cap on the number of errors kept from `svrl_report`.
+            If ``None``, every error is kept. Ignored if `errors` is
+            given.
 
     Attributes:
         errors: A list of :class:`ProfileError` instances representing
-            errors found in the `svrl_report`.
+            errors found in the `svrl_report`, or the `errors` passed in.
 
     """
-    def __init__(self, is_valid, doc=None, svrl_report=None):
+    _ERROR_CLASS = ProfileError
+
+    def __init__(self, is_valid, doc=None, svrl_report=None, errors=None,
+                 max_errors=None):
         super(ProfileValidationResults, self).__init__(
             is_valid=is_valid,
             doc=doc,
-            svrl_report=svrl_report
+            svrl_report=svrl_report,
+            max_errors=max_errors
+        )
+
+        if errors is not None:
+            self.errors = errors
+
+
+# A compiled Schematron rule context used by the native profile engine.
+# 'context' is the Schematron rule context string.
+# 'root' is True if the context selects the document node ("/").
+# 'select' is an XPath which selects the context elements.
+# 'check' is an XPath which is True if the context node passes every test.
+# 'tests' is a list of _NativeTest tuples.
+_NativeContext = collections.namedtuple(
+    typename="_NativeContext",
+    field_names=["context", "root", "select", "check", "tests"]
+)
+
+# A compiled Schematron assert or report used by the native profile engine.
+# 'is_assert' is True for asserts and False for reports.
+# 'test' is an XPath which evaluates the rule test against a context node.
+# 'message' is a list of message fragments, split on the context node name.
+_NativeTest = collections.namedtuple(
+    typename="_NativeTest",
+    field_names=["is_assert", "test", "message"]
+)
+
+
+class _NativeProfileEngine(object):
+    """Evaluates the rules of a :class:`Profile` directly against instance
+    documents, without generating Schematron or an SVRL report.
+
+    Each rule test is compiled once as an XPath and rules are grouped by
+    their context selector. Evaluation follows the validator XSLT produced
+    from :meth:`Profile.as_etree`:
+
+    * Each pattern is evaluated independently, in order.
+    * Within a pattern, a node is only checked by the first rule context
+      which selects it.
+    * Errors are produced in document order within each pattern.
+    * A document is invalid only if an assert fails. Reports are errors but
+      do not affect validity.
+
+    Args:
+        profile: A :class:`Profile` instance.
+
+    """
+    def __init__(self, profile):
+        namespaces = dict(
+            (alias, ns) for ns, alias in iteritems(profile._namespaces)
+        )
+
+        self._namespaces = namespaces
+        self._patterns = [
+            self._compile_pattern(contexts)
+            for _, contexts in profile._get_patterns()
+        ]
+
+    def _xpath(self, expression):
+        return etree.XPath(expression, namespaces=self._namespaces)
+
+    def _compile_test(self, test, root=False):
+        """Compiles the boolean XPath `test`. If `root` is ``True``, the test
+        is evaluated against the document node rather than the node it is
+        called with.
+
+        """
+        if root:
+            return self._xpath("boolean(/self::node()[boolean(%s)])" % test)
+
+        return self._xpath("boolean(%s)" % test)
+
+    def _get_selectors(self, profile_rules):
+        """Returns a tuple of ``(root, selectors)`` for the instance mapping
+        selectors of `profile_rules`. Relative selectors are made absolute,
+        so they select every element the Schematron context would match.
+
+        """
+        mapping = profile_rules[0]._instance_mapping
+        root = False
+        selectors = []
+
+        for selector in mapping.selectors:
+            selector = selector.strip()
+
+            if selector == "/":
+                root = True
+            elif selector.startswith("/"):
+                selectors.append(selector)
+            else:
+                selectors.append("//%s" % selector)
+
+        return root, selectors
+
+    def _compile_context(self, ctx, profile_rules):
+        root, selectors = self._get_selectors(profile_rules)
+        select = self._xpath(utils.union(selectors)) if selectors else None
+
+        tests = []
+        checks = []
+
+        for rule in profile_rules:
+            is_assert = (rule.type == _BaseProfileRule.TYPE_ASSERT)
+            test = _NativeTest(
+                is_assert=is_assert,
+                test=self._compile_test(rule.test, root),
+                message=rule.message.split(NAME)
+            )
+
+            tests.append(test)
+
+            if is_assert:
+                checks.append("(%s)" % rule.test)
+            else:
+                checks.append("not(%s)" % rule.test)
+
+        return _NativeContext(
+            context=ctx,
+            root=root,
+            select=select,
+            check=self._compile_test(" and ".join(checks), root),
+            tests=tests
+        )
+
+    def _compile_pattern(self, contexts):
+        """Returns a tuple of ``(select, contexts)`` for the pattern, where
+        `select` is an XPath selecting every context element of the pattern
+        in document order.
+
+        """
+        compiled = [
+            self._compile_context(ctx, profile_rules)
+            for ctx, profile_rules in contexts
+        ]
+
+        selectors = []
+        for ctx, profile_rules in contexts:
+            selectors.extend(self._get_selectors(profile_rules)[1])
+
+        select = self._xpath(utils.union(selectors)) if selectors else None
+        return select, compiled
+
+    def _get_nodes(self, select, contexts, root):
+        """Yields ``(node, context)`` tuples for each node selected by the
+        pattern, in document order. The document node is represented by
+        the ``etree._ElementTree`` for `root`.
+
+        """
+        doc = root.getroottree()
+        selected = []
+
+        for ctx in contexts:
+            nodes = set(ctx.select(root)) if ctx.select else set()
+
+            if ctx.root:
+                nodes.add(doc)
+
+            selected.append((ctx, nodes))
+
+        ordered = select(root) if select is not None else []
+
+        if any(ctx.root for ctx in contexts):
+            ordered.insert(0, doc)
+
+        for node in ordered:
+            for ctx, nodes in selected:
+                if node in nodes:
+                    yield node, ctx
+                    break
+
+    def _get_line(self, node):
+        """Returns the line number of `node`. The document node has no line
+        number, and is reported on line -1 as it is by the validator XSLT.
+
+        """
+        if isinstance(node, etree._ElementTree):
+            return -1
+
+        return node.sourceline
+
+    def _get_name(self, node):
+        """Returns the XPath ``name()`` of `node`."""
+        if isinstance(node, etree._ElementTree):
+            return ""
+
+        localname = etree.QName(node).localname
+
+        if node.prefix:
+            return "%s:%s" % (node.prefix, localname)
+
+        return localname
+
+    def iter_errors(self, root):
+        """Yields an ``(is_assert, error)`` tuple for each profile rule
+        which the ``etree._Element`` `root` fails, where `error` is a
+        :class:`NativeProfileError`.
+
+        """
+        for select, contexts in self._patterns:
+            for node, ctx in self._get_nodes(select, contexts, root):
+                if ctx.check(node):
+                    continue
+
+                for test in ctx.tests:
+                    if test.test(node) is test.is_assert:
+                        continue
+
+                    error = NativeProfileError(
+                        message=self._get_name(node).join(test.message),
+                        line=self._get_line(node),
+                        context=ctx.context
+                    )
+
+                    yield test.is_assert, error
+
+    def validate(self, root, max_errors=None):
+        """Validates the ``etree._Element`` `root` against the profile rules.
+
+        Args:
+            root: The document to validate.
+            max_errors: The maximum number of errors to return. Evaluation
+                stops once this many errors are found and the validity of
+                `root` is known. If ``None``, every error is returned.
+
+        Returns:
+            A tuple of ``(is_valid, errors)`` where `errors` is a list of
+            :class:`NativeProfileError` instances.
+
+        """
+        is_valid = True
+        errors = []
+
+        for is_assert, error in self.iter_errors(root):
+            is_valid = is_valid and not is_assert
+
+            if max_errors is None or len(errors) < max_errors:
+                errors.append(error)
+            elif not is_valid:
+                break
+
+        return is_valid, errors
+
+
+class _CompiledProfileCache(object):
+    """A persistent cache of the Schematron and validator XSLT compiled from
+    a STIX Profile.
+
+    Entries are keyed on a hash of the profile file contents, so an entry is
+    never used for a profile which has changed since the entry was written.
+    The key also includes the stix-validator and lxml versions, since
+    either can change the generated XSLT.
+
+    Args:
+        profile_fn: The filename of a ``.xlsx`` STIX Profile document.
+        cache_dir: The directory to write cache files to. If ``None``,
+            :func:`.get_cache_dir` is used.
+
+    """
+    VERSION = 2
+
+    def __init__(self, profile_fn, cache_dir=None):
+        self.key = self._get_key(profile_fn)
+        cache_dir = cache_dir or utils.get_cache_dir()
+        cache_dir = os.path.join(cache_dir, 'profiles')
+
+        if self.key:
+            base = os.path.join(cache_dir, self.key)
+            self.schematron_path = base + '.sch'
+            self.xslt_path = base + '.xsl'
+        else:
+            self.schematron_path = self.xslt_path = None
+
+    def _get_key(self, profile_fn):
+        """Returns a hex digest of the contents of `profile_fn` or ``None`` if
+        it cannot be read.
+
+        """
+        try:
+            with open(profile_fn, 'rb') as f:
+                data = f.read()
+        except (IOError, OSError, TypeError):
+            return None
+
+        versions = (self.VERSION, __version__, etree.LXML_VERSION)
+        sha = hashlib.sha256(repr(versions).encode('utf-8'))
+        sha.update(data)
+        return sha.hexdigest()
+
+    def get(self):
+        """Returns a :class:`.CompiledSchematron` for the profile or ``None``
+        if there is no usable entry for it.
+
+        """
+        if not self.key:
+            return None
+
+        try:
+            sch = etree.parse(self.schematron_path)
+            xslt = etree.parse(self.xslt_path)
+            return schematron.CompiledSchematron(sch, xslt)
+        except (IOError, OSError, etree.XMLSyntaxError, etree.XSLTParseError):
+            return None
+
+    def put(self, compiled):
+        """Writes the Schematron and validator XSLT held by the
+        ``lxml.isoschematron.Schematron`` instance `compiled`.
+
+        Failures to write the cache are ignored.
+
+        """
+        if not self.key:
+            return
+
+        entries = (
+            (self.xslt_path, compiled.validator_xslt),
+            (self.schematron_path, compiled.schematron)
         )
 
-    def _parse_errors(self, svrl_report):
-        errors = self._get_errors(svrl_report)
-        return [ProfileError(self._doc, x) for x in errors]
+        with utils.ignored(IOError, OSError):
+            dir_ = os.path.dirname(self.xslt_path)
+
+            if not os.path.isdir(dir_):
+                os.makedirs(dir_)
+
+            for path, doc in entries:
+                tmp = "%s.%d.tmp" % (path, os.getpid())
+
+                with open(tmp, 'wb') as f:
+                    f.write(etree.tostring(doc))
+
+                # Python 2 does not have os.replace()
+                replace = getattr(os, 'replace', os.rename)
+                replace(tmp, path)
 
 
 class STIXProfileValidator(schematron.SchematronValidator):
     """Performs STIX Profile validation.
 
+    The Schematron and validator XSLT compiled from a profile are cached
+    under :func:`.get_cache_dir`, keyed on the profile contents. Later
+    validators built for an unchanged profile load the XSLT directly and do
+    not read the profile or compile the Schematron.
+
     Args:
         profile_fn: The filename of a ``.xlsx`` STIX Profile document.
+        use_cache: If ``False``, the compiled profile cache is not read or
+            written.
     """
+    _ERROR_CLASS = ProfileError
+
+    def __init__(self, profile_fn, use_cache=True):
+        self._profile_fn = profile_fn
+        self._profile = None
+        self._native = None
+
+        cache = _CompiledProfileCache(profile_fn) if use_cache else None
+        compiled = cache.get() if cache else None
+
+        if compiled is not None:
+            self._schematron = compiled
+            self._phase_id = None
+            return
 
-    def __init__(self, profile_fn):
         profile = self._parse_profile(profile_fn)
         super(STIXProfileValidator, self).__init__(schematron=profile.as_etree())
+        self._profile = profile
+
+        if cache:
+            cache.put(self._schematron)
+
+    def _get_native_engine(self):
+        """Returns the :class:`_NativeProfileEngine` for the profile.
+
+        The profile is parsed here if the validator was loaded from the
+        compiled profile cache.
+
+        """
+        if self._native is None:
+            profile = self._profile or self._parse_profile(self._profile_fn)
+            self._profile = profile
+            self._native = _NativeProfileEngine(profile)
+
+        return self._native
 
     def _build_rules(self, info, field, occurrence, types, values):
         """Builds a ``_BaseProfileRule`` implementation list for the rule
@@ -1048,28 +1569,74 @@ class STIXProfileValidator(schematron.SchematronValidator):
         return etree.parse(StringIO(s), parser=parser)
 
     @common.check_stix
-    def validate(self, doc):
+    def validate(self, doc, engine=ENGINE_XSLT, max_errors=None):
         """Validates an XML instance document against a STIX profile.
 
         Args:
             doc: The STIX document. This can be a filename, file-like object,
-                ``etree._Element``, or ``etree._ElementTree`` instance.
+                ``etree._Element``, ``etree._ElementTree``, or
+                :class:`.ValidationContext` instance.
+            engine: The profile validation engine. ``'xslt'`` runs the
+                validator XSLT generated from the profile Schematron.
+                ``'native'`` evaluates the profile rules directly as XPath,
+                without building an SVRL report. Both engines produce the
+                same results.
+            max_errors: A cap on the number of errors in the results. If
+                ``None``, every error is returned. Only the ``'native'``
+                engine stops evaluating early, once it has this many errors
+                and knows whether `doc` is valid. The ``'xslt'`` engine
+                still produces the complete SVRL report and only keeps the
+                first `max_errors` errors from it.
 
         Returns:
             An instance of
             :class:`.ProfileValidationResults`.
 
         Raises:
+            ValueError: If `engine` is not a known validation engine.
             .ValidationError: If there are any issues parsing `doc`.
         """
+        if engine not in ENGINES:
+            raise ValueError("Unknown profile engine: %r" % (engine,))
+
         root = utils.get_etree_root(doc)
-        is_valid = self._schematron.validate(root)
-        svrl_report = self._schematron.validation_report
-        results = ProfileValidationResults(is_valid, root, svrl_report)
+
+        if engine == ENGINE_NATIVE:
+            engine = self._get_native_engine()
+            is_valid, errors = engine.validate(root, max_errors=max_errors)
+            return ProfileValidationResults(is_valid, root, errors=errors)
+
+        svrl_report = self._schematron.get_report(root)
+        is_valid = schematron.is_valid_report(svrl_report)
+
+        results = ProfileValidationResults(
+            is_valid,
+            root,
+            svrl_report,
+            max_errors=max_errors
+        )
+
         return results
 
+    @common.check_stix
+    def iter_errors(self, doc, max_errors=None, resolve_lines=True):
+        """Validates an XML instance document against a STIX profile with
+        the validator XSLT and yields a :class:`ProfileError` for each error
+        in the SVRL report. The report is complete before the first error is
+        yielded. See :meth:`.SchematronValidator.iter_errors`.
+
+        Raises:
+            .ValidationError: If there are any issues parsing `doc`.
+        """
+        return super(STIXProfileValidator, self).iter_errors(
+            doc,
+            max_errors=max_errors,
+            resolve_lines=resolve_lines
+        )
+
 __all__ = [
     'STIXProfileValidator',
     'ProfileError',
+    'NativeProfileError',
     'ProfileValidationResults'
 ]
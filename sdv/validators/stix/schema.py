@@ -42,8 +42,12 @@ class STIXSchemaValidator(base.BaseSchemaValidator):
         '1.0': os.path.join(XSD_ROOT, 'stix_1.0')
     }
 
-    def __init__(self, schema_dir=None):
-        super(STIXSchemaValidator, self).__init__(schema_dir=schema_dir)
+    def __init__(self, schema_dir=None, superset=False, use_cache=False):
+        super(STIXSchemaValidator, self).__init__(
+            schema_dir=schema_dir,
+            superset=superset,
+            use_cache=use_cache
+        )
 
     def _get_document_version(self, doc):
         return common.get_version(doc)
@@ -60,8 +64,14 @@ class STIXSchemaValidator(base.BaseSchemaValidator):
             found=version
         )
 
-    def _get_validator_impl(self, schema_dir=None):
-        return _XmlSchemaValidator(schema_dir=schema_dir)
+    def _get_validator_impl(self, schema_dir=None, use_index=False,
+                            superset=False, use_cache=False):
+        return _XmlSchemaValidator(
+            schema_dir=schema_dir,
+            use_index=use_index,
+            superset=superset,
+            use_cache=use_cache
+        )
 
     @common.check_stix
     def validate(self, doc, version=None, schemaloc=False):
@@ -78,7 +88,8 @@ class STIXSchemaValidator(base.BaseSchemaValidator):
 
         Args:
             doc: The STIX document. This can be a filename, file-like object,
-                ``etree._Element``, or ``etree._ElementTree`` instance.
+                ``etree._Element``, ``etree._ElementTree``, or
+                :class:`.ValidationContext` instance.
             version: The version of the STIX document. If ``None`` an attempt
                 will be made to extract the version from `doc`.
             schemaloc: If ``True``, the ``xsi:schemaLocation`` attribute on
@@ -3,6 +3,8 @@
 
 # builtin
 import os
+import json
+import hashlib
 import collections
 
 # external
@@ -15,6 +17,17 @@ from sdv import errors, utils, xmlconst
 # relative
 from . import base
 
+# Python 2.6 doesn't have collections.OrderedDict :(
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+
+# The name of the precomputed targetNamespace-to-schema index file found in
+# the bundled schema directories.
+SCHEMALOC_INDEX = 'schemalocs.json'
+
 
 @python_2_unicode_compatible
 class XmlSchemaError(base.ValidationError):
@@ -113,6 +126,112 @@ class XmlValidationResults(base.ValidationResults):
         return d
 
 
+class _SchemaScanCache(object):
+    """A persistent cache of the ``targetNamespace`` and ``xs:include``
+    targets found in each schema under a schema directory.
+
+    Entries are keyed on schema file path and are only used if the file
+    modification time and size have not changed since the entry was written.
+
+    Args:
+        schema_dir: The schema directory being scanned.
+        cache_dir: The directory to write the cache file to. If ``None``,
+            :func:`.get_cache_dir` is used.
+
+    """
+    VERSION = 1
+
+    def __init__(self, schema_dir, cache_dir=None):
+        self._schema_dir = os.path.abspath(schema_dir)
+        self._entries = {}
+        self._visited = {}
+        self._dirty = False
+
+        cache_dir = cache_dir or utils.get_cache_dir()
+        key = hashlib.sha1(self._schema_dir.encode('utf-8')).hexdigest()
+        self.path = os.path.join(cache_dir, 'schemas-%s.json' % key)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+
+        if data.get('version') != self.VERSION:
+            return
+
+        if data.get('schema_dir') != self._schema_dir:
+            return
+
+        self._entries = data.get('files', {})
+
+    def get(self, fp, stat):
+        """Returns a ``(targetNamespace, includes)`` tuple for the schema at
+        `fp` or ``None`` if there is no current entry for it.
+
+        Args:
+            fp: The schema file path.
+            stat: The ``os.stat()`` result for `fp`.
+
+        """
+        entry = self._entries.get(fp)
+
+        if entry is None:
+            return None
+
+        if entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+            return None
+
+        self._visited[fp] = entry
+        return entry['targetNamespace'], entry['includes']
+
+    def put(self, fp, stat, target_ns, includes):
+        """Records the ``targetNamespace`` and ``xs:include`` targets of the
+        schema at `fp`.
+
+        """
+        self._visited[fp] = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'targetNamespace': target_ns,
+            'includes': includes
+        }
+        self._dirty = True
+
+    def save(self):
+        """Writes the entries for every schema visited since the cache was
+        loaded. Entries for schemas which were not visited (e.g., deleted
+        schemas) are dropped.
+
+        Failures to write the cache are ignored.
+
+        """
+        if not self._dirty and len(self._visited) == len(self._entries):
+            return
+
+        data = {
+            'version': self.VERSION,
+            'schema_dir': self._schema_dir,
+            'files': self._visited
+        }
+
+        dir_ = os.path.dirname(self.path)
+        tmp = "%s.%d.tmp" % (self.path, os.getpid())
+
+        with utils.ignored(IOError, OSError):
+            if not os.path.isdir(dir_):
+                os.makedirs(dir_)
+
+            with open(tmp, 'w') as f:
+                json.dump(data, f)
+
+            # Python 2 does not have os.replace()
+            replace = getattr(os, 'replace', os.rename)
+            replace(tmp, self.path)
+
+
 class XmlSchemaValidator(object):
     """Validates XML instance documents.
 
@@ -123,6 +242,23 @@ class XmlSchemaValidator(object):
     Args:
         schema_dir: A directory of schema files used to validate XML instance
             documents.
+        use_index: If ``True``, the targetNamespace to schema mapping is read
+            from the :data:`SCHEMALOC_INDEX` file in `schema_dir` rather than
+            walking and parsing every schema under `schema_dir`. If the index
+            file does not exist, `schema_dir` is walked.
+        superset: If ``True``, a single schema which imports every schema
+            found in `schema_dir` is compiled the first time a document is
+            validated. Every following document is validated against it,
+            rather than against a schema built from the document's
+            namespaces. This trades a larger, one-time compilation for no
+            per-document compilation. It does not apply to validation via
+            ``xsi:schemaLocation``.
+        use_cache: If ``True``, the ``targetNamespace`` and ``xs:include``
+            information found while walking `schema_dir` is persisted to
+            :func:`.get_cache_dir`. Later walks of `schema_dir` only parse
+            schemas which were added or modified since. This is off by
+            default, so nothing is written outside `schema_dir` unless asked.
+            It has no effect when `schema_dir` is read from an index.
 
     Attributes:
         OVERRIDE_SCHEMALOC: Overrides the schemalocation for a given namespace
@@ -130,12 +266,27 @@ class XmlSchemaValidator(object):
             alter the schemalocation of namespaces declared by
             ``xsi:schemalLocation`` attributes if validating via
             ``xsi:schemaLocation``.
+        SCHEMA_CACHE_SIZE: The maximum number of compiled ``etree.XMLSchema``
+            objects kept by each instance. Documents which require the same
+            set of schema imports share a compiled schema.
+        schema_cache: A :class:`.LRUCache` of compiled ``etree.XMLSchema``
+            objects, keyed on the set of schema imports. Its ``hits`` and
+            ``misses`` attributes report how effective the cache is.
 
     """
     OVERRIDE_SCHEMALOC = {}
+    SCHEMA_CACHE_SIZE = 16
 
-    def __init__(self, schema_dir=None):
+    def __init__(self, schema_dir=None, use_index=False, superset=False,
+                 use_cache=False):
+        self._use_index = use_index
+        self._use_cache = use_cache
+        self._includes = {}
         self._schemalocs = self._map_schemalocs(schema_dir)
+        self._superset = superset
+        self._superset_schema = None
+        self._superset_excluded = None
+        self.schema_cache = utils.LRUCache(self.SCHEMA_CACHE_SIZE)
 
     def _get_includes(self, fp, root):
         """Returns a list of ``xs:include`` targets found within `root`.
@@ -188,18 +339,28 @@ class XmlSchemaValidator(object):
         graph = collections.defaultdict(list)
 
         for fp in schema_paths:
-            root = utils.get_etree_root(fp)
-            includes = self._get_includes(fp, root)
+            if fp in self._includes:
+                includes = self._includes[fp]
+            else:
+                root = utils.get_etree_root(fp)
+                includes = self._get_includes(fp, root)
+
             graph[fp].extend(includes)
 
         return graph
 
-    def _is_included(self, graph, fp):
-        """Returns ``True`` if the schema at `fp` was included by any other
-        schemas in `graph`.
+    def _get_indegrees(self, graph):
+        """Returns a dictionary mapping each schema in `graph` to the number
+        of times it was included by other schemas in `graph`.
 
         """
-        return any(fp in includes for includes in itervalues(graph))
+        indegrees = dict((fp, 0) for fp in graph)
+
+        for includes in itervalues(graph):
+            for fp in includes:
+                indegrees[fp] = indegrees.get(fp, 0) + 1
+
+        return indegrees
 
     def _get_include_root(self, ns, list_schemas):
         """Attempts to determine the "root" schema for a targetNamespace.
@@ -228,8 +389,10 @@ class XmlSchemaValidator(object):
         if all(not(x) for x in itervalues(graph)):
             return list_schemas[0]
 
-        for fp in graph:
-            has_ancestors = self._is_included(graph, fp)
+        indegrees = self._get_indegrees(graph)
+
+        for fp in list_schemas:
+            has_ancestors = indegrees[fp] > 0
             has_children  = len(graph[fp]) > 0
 
             if has_children and not has_ancestors:
@@ -295,8 +458,9 @@ class XmlSchemaValidator(object):
             schema file paths.
 
         """
-        seen = []
+        seen = set()
         schemalocs = collections.defaultdict(list)
+        cache = _SchemaScanCache(schema_dir) if self._use_cache else None
 
         for top, _, files in os.walk(schema_dir):
             for fn in files:
@@ -304,19 +468,52 @@ class XmlSchemaValidator(object):
                     continue
 
                 fp = os.path.abspath(os.path.join(top, fn))
-                target_ns = utils.get_target_ns(fp)
+                target_ns, includes = self._scan_schema(fp, cache)
+                self._includes[fp] = includes
 
                 if (target_ns, fn) in seen:
                     continue
 
                 schemalocs[target_ns].append(fp)
-                seen.append((target_ns, fn))
+                seen.add((target_ns, fn))
+
+        if cache is not None:
+            cache.save()
 
         for ns, loc in iteritems(self.OVERRIDE_SCHEMALOC):
             schemalocs[ns] = [loc]
 
         return schemalocs
 
+    def _scan_schema(self, fp, cache=None):
+        """Returns a tuple containing the ``targetNamespace`` and a list of
+        the ``xs:include`` targets of the schema at `fp`.
+
+        If `cache` contains a current entry for `fp`, the schema is not
+        parsed.
+
+        Raises:
+            KeyError: If the schema does not contain a ``targetNamespace``
+                attribute.
+            .ValidationError: If the schema cannot be parsed.
+
+        """
+        if cache is not None:
+            stat = os.stat(fp)
+            info = cache.get(fp, stat)
+
+            if info is not None:
+                return info
+
+        root = utils.get_etree_root(fp)
+        target_ns = root.attrib['targetNamespace']
+        includes = self._get_includes(fp, root)
+
+        if cache is not None:
+            cache.put(fp, stat, target_ns, includes)
+
+        return target_ns, includes
+
     def _map_schemalocs(self, schema_dir):
         """Walks the `schema_dir` directory and builds a dictionary which maps
         schema targetNamespace values to schema file paths.
@@ -335,16 +532,51 @@ class XmlSchemaValidator(object):
         if not schema_dir:
             return
 
+        if self._use_index:
+            schemalocs = self._load_index(schema_dir)
+
+            if schemalocs is not None:
+                return schemalocs
+
         schemalocs = self._walk_schemas(schema_dir)
         schemalocs = self._process_includes(schemalocs)
 
         return schemalocs
 
+    def _load_index(self, schema_dir):
+        """Loads the precomputed targetNamespace to schema mapping for
+        `schema_dir`.
+
+        The ``OVERRIDE_SCHEMALOC`` mappings are applied to the loaded index.
+
+        Returns:
+            A dictionary mapping schema ``targetNamespace`` values to the
+            schema file path or ``None`` if `schema_dir` does not contain an
+            index file.
+
+        """
+        fp = os.path.join(schema_dir, SCHEMALOC_INDEX)
+
+        try:
+            with open(fp) as f:
+                index = json.load(f)
+        except (IOError, OSError):
+            return None
+
+        schemalocs = {}
+        for ns, relpath in iteritems(index):
+            path = os.path.join(schema_dir, *relpath.split('/'))
+            schemalocs[ns] = os.path.abspath(path)
+
+        schemalocs.update(self.OVERRIDE_SCHEMALOC)
+        return schemalocs
+
     def _parse_schemaloc(self, root):
         """Parses the ``xsi:schemaLocation`` attribute found on `root`.
 
         Returns:
-            A dictionary of namespaces to schema locations.
+            An ordered dictionary of namespaces to schema locations, in the
+            order they appear in the attribute.
 
         Raises:
             .XMLSchemaImportError: If `root` did not contain an
@@ -353,48 +585,43 @@ class XmlSchemaValidator(object):
         """
         if xmlconst.TAG_SCHEMALOCATION in root.attrib:
             imports = utils.get_schemaloc_pairs(root)
-            return dict(imports)
+            return OrderedDict(imports)
 
         msg = ("Cannot validate using xsi:schemaLocation. The "
                "xsi:schemaLocation attribute was not found on the input "
                "document")
         raise errors.XMLSchemaImportError(msg)
 
-    def _get_required_schemas(self, root):
+    def _get_required_schemas(self, doc):
         """Retrieve all the namespaces and schemalocations needed to validate
-        `root`.
+        `doc`.
 
         Args:
-            root: An etree._Element XML document.
+            doc: An etree._Element XML document or
+                :class:`.ValidationContext`.
 
         Returns:
-            A dictionary mapping namespaces to schemalocations.
+            An ordered dictionary mapping namespaces to schemalocations, in
+            the order the namespaces are found in `doc`.
 
         """
-        def _get_schemalocs(node):
-            schemalocs = {}
-
-            for ns in itervalues(node.nsmap):
-                if ns not in self._schemalocs:
-                    continue
+        ctx = utils.get_context(doc)
 
-                schemalocs[ns] = self._schemalocs[ns]
-            return schemalocs
+        imports = OrderedDict()
+        for ns in ctx.namespaces:
+            if ns not in self._schemalocs:
+                continue
 
-        imports = {}
-        for elem in root.iter():
-            schemalocs = _get_schemalocs(elem)
-            imports.update(schemalocs)
+            imports[ns] = self._schemalocs[ns]
 
         return imports
 
     def _build_required_imports(self, doc, schemaloc=False):
-        root = utils.get_etree_root(doc)
-
         if schemaloc:
+            root = utils.get_etree_root(doc)
             return self._parse_schemaloc(root)
 
-        return self._get_required_schemas(root)
+        return self._get_required_schemas(doc)
 
     def _build_uber_schema(self, doc, schemaloc=False):
         """Builds a schema which is made up of ``xs:import`` directives for
@@ -404,6 +631,11 @@ class XmlSchemaValidator(object):
         are used to create the ``xs:import`` directives. If ``False``, the
         initialization schema directory is used.
 
+        Compiled schemas are cached on the ordered schema imports, so documents
+        which require the same schemas in the same order do not trigger a
+        recompile. The import order is part of the key because it can change
+        which schema document libxml2 loads for a namespace.
+
         Returns:
             An ``etree.XMLSchema`` instance used to validate `doc`.
 
@@ -413,8 +645,7 @@ class XmlSchemaValidator(object):
                 drive the uber schema creation.
 
         """
-        root = utils.get_etree_root(doc)
-        imports = self._build_required_imports(root, schemaloc)
+        imports = self._build_required_imports(doc, schemaloc)
 
         if not imports:
             raise errors.XMLSchemaImportError(
@@ -422,6 +653,28 @@ class XmlSchemaValidator(object):
                 "schemas required for validation."
             )
 
+        key = tuple(iteritems(imports))
+        schema = self.schema_cache.get(key)
+
+        if schema is not None:
+            return schema
+
+        schema = self._compile_schema(key)
+        self.schema_cache.put(key, schema)
+        return schema
+
+    def _compile_schema(self, imports):
+        """Compiles a schema which is made up of an ``xs:import`` directive
+        for each (namespace, schemalocation) pair in `imports`.
+
+        Returns:
+            An ``etree.XMLSchema`` instance.
+
+        Raises:
+            etree.XMLSchemaParseError: If the imported schemas could not be
+                compiled.
+
+        """
         xsd = etree.fromstring(
             """
             <xs:schema
@@ -432,7 +685,7 @@ class XmlSchemaValidator(object):
             """
         )
 
-        for ns, loc in iteritems(imports):
+        for ns, loc in imports:
             loc = loc.replace("\\", "/")
             attrib = {'namespace': ns, 'schemaLocation':loc}
             import_ = etree.Element(xmlconst.TAG_XS_IMPORT, attrib=attrib)
@@ -440,12 +693,148 @@ class XmlSchemaValidator(object):
 
         return etree.XMLSchema(xsd)
 
+    def _get_referenced_schemas(self, fp, references):
+        """Returns a set of file paths containing `fp` and every local schema
+        it imports or includes, directly or transitively.
+
+        Args:
+            fp: A path to a schema document.
+            references: A dictionary of schema file paths to the schema
+                file paths they reference directly. This is used to avoid
+                parsing a schema more than once and is updated by this method.
+
+        """
+        seen = set()
+        stack = [os.path.abspath(fp)]
+
+        while stack:
+            path = stack.pop()
+
+            if path in seen:
+                continue
+
+            seen.add(path)
+
+            if path not in references:
+                references[path] = self._get_schema_references(path)
+
+            stack.extend(references[path])
+
+        return seen
+
+    def _get_schema_references(self, fp):
+        """Returns a list of paths to the local schemas which the schema at
+        `fp` imports or includes.
+
+        """
+        try:
+            root = utils.get_etree_root(fp)
+        except errors.ValidationError:
+            return []
+
+        tags = (xmlconst.TAG_XS_IMPORT, xmlconst.TAG_XS_INCLUDE)
+        dir_ = os.path.dirname(fp)
+
+        refs = []
+        for node in root.iterchildren(*tags):
+            loc = node.attrib.get('schemaLocation')
+
+            # Skip remote and missing schema locations
+            if not loc or '://' in loc:
+                continue
+
+            refs.append(os.path.abspath(os.path.join(dir_, loc)))
+
+        return refs
+
+    def _get_failed_schema(self, error_log):
+        """Returns the absolute path of the schema which produced the first
+        error in `error_log` or ``None`` if that cannot be determined.
+
+        """
+        for error in error_log:
+            if error.level < etree.ErrorLevels.ERROR:
+                continue
+
+            if error.filename and os.path.isfile(error.filename):
+                return os.path.abspath(error.filename)
+
+        return None
+
+    def _build_superset_schema(self):
+        """Compiles a single schema which imports every schema known to this
+        validator.
+
+        Some schemas cannot be compiled (e.g., they import a namespace from a
+        schema which does not define it). When compilation fails, the
+        namespaces whose schemas reference the failing schema are excluded
+        and compilation is attempted again.
+
+        Returns:
+            A tuple containing the compiled ``etree.XMLSchema`` (or ``None``
+            if no superset schema could be compiled) and a ``frozenset`` of
+            the namespaces which were excluded from it.
+
+        """
+        imports = dict(self._schemalocs)
+        references = {}
+        excluded = set()
+
+        while imports:
+            try:
+                pairs = sorted(iteritems(imports))
+                return self._compile_schema(pairs), frozenset(excluded)
+            except etree.XMLSchemaParseError as ex:
+                failed = self._get_failed_schema(ex.error_log)
+
+            broken = [
+                ns for ns, loc in iteritems(imports)
+                if failed in self._get_referenced_schemas(loc, references)
+            ]
+
+            if not broken:
+                break
+
+            for ns in broken:
+                del imports[ns]
+                excluded.add(ns)
+
+        return None, frozenset(excluded)
+
+    def _get_superset_schema(self, doc):
+        """Returns the superset schema if it can be used to validate `doc`
+        and ``None`` otherwise.
+
+        The superset schema is not used if `doc` contains namespaces which
+        had to be excluded from it or no namespaces known to this validator.
+        Those documents are handled exactly as if `superset` was ``False``.
+
+        """
+        if self._superset_schema is None and self._superset_excluded is None:
+            schema, excluded = self._build_superset_schema()
+            self._superset_schema = schema
+            self._superset_excluded = excluded
+
+        if self._superset_schema is None:
+            return None
+
+        ctx = utils.get_context(doc)
+
+        if not any(ns in self._schemalocs for ns in ctx.namespaces):
+            return None
+
+        if any(ns in self._superset_excluded for ns in ctx.namespaces):
+            return None
+
+        return self._superset_schema
+
     def validate(self, doc, schemaloc=False):
         """Validates an XML instance document.
 
         Args:
             doc: An XML instance document. This can be a filename, file-like
-                object, ``etree._Element``, or ``etree._ElementTree``.
+                object, ``etree._Element``, ``etree._ElementTree`` or
+                :class:`.ValidationContext`.
             schemaloc: If ``True``, the document will be validated using the
                 ``xsi:schemaLocation`` attribute found on the instance
                 document root.
@@ -471,13 +860,66 @@ class XmlSchemaValidator(object):
                 "schema_dir param in __init__"
             )
 
-        root = utils.get_etree_root(doc)
-        xsd = self._build_uber_schema(root, schemaloc)
-        is_valid = xsd.validate(root)
+        doc = utils.get_context(doc)
+        xsd = None
+
+        if self._superset and not schemaloc:
+            xsd = self._get_superset_schema(doc)
+
+        if xsd is None:
+            xsd = self._build_uber_schema(doc, schemaloc)
+
+        is_valid = xsd.validate(doc.root)
 
         return XmlValidationResults(is_valid, xsd.error_log)
 
 
+def build_schemaloc_index(schema_dir):
+    """Walks `schema_dir` and returns a dictionary which maps schema
+    ``targetNamespace`` values to the path of the schema which should be
+    imported for that namespace. Any ``xs:include`` roots are resolved.
+
+    The schema paths are relative to `schema_dir` and use ``/`` as a path
+    separator.
+
+    Raises:
+        .XMLSchemaIncludeError: If an error occurs while processing
+            ``xs:include`` directives.
+
+    """
+    validator = XmlSchemaValidator()
+    schemalocs = validator._walk_schemas(schema_dir)
+    schemalocs = validator._process_includes(schemalocs)
+    root = os.path.abspath(schema_dir)
+
+    index = {}
+    for ns, path in iteritems(schemalocs):
+        relpath = os.path.relpath(path, root)
+        index[ns] = relpath.replace(os.sep, '/')
+
+    return index
+
+
+def write_schemaloc_index(schema_dir):
+    """Writes the :data:`SCHEMALOC_INDEX` file for `schema_dir`.
+
+    This is run when the package is built so that validators of the bundled
+    schemas do not need to walk and parse every schema at runtime.
+
+    Returns:
+        The path to the index file that was written.
+
+    """
+    index = build_schemaloc_index(schema_dir)
+    fp = os.path.join(schema_dir, SCHEMALOC_INDEX)
+
+    with open(fp, 'w') as f:
+        json.dump(index, f, indent=2, sort_keys=True, separators=(',', ': '))
+        f.write('\n')
+
+    return fp
+
+
 __all__ = [
     'XmlSchemaValidator',
     'XmlValidationResults',
@@ -6,7 +6,8 @@
 from os.path import abspath, dirname, join
 import sys
 
-from setuptools import setup, find_packages
+from setuptools import setup, find_packages, Command
+from setuptools.command.build_py import build_py
 
 BASE_DIR = dirname(abspath(__file__))
 VERSION_FILE = join(BASE_DIR, 'sdv', 'version.py')
@@ -20,6 +21,50 @@ def get_version():
         raise AttributeError("Package does not have a __version__")
 
 
+class build_schema_index(Command):
+    """Generates the targetNamespace-to-schema index file for each bundled
+    schema directory.
+
+    """
+    description = "generate the bundled XML Schema index files"
+    user_options = []
+
+    def initialize_options(self):
+        pass
+
+    def finalize_options(self):
+        pass
+
+    def run(self):
+        sys.path.insert(0, BASE_DIR)
+
+        from sdv.validators import xml_schema
+        from sdv.validators.stix.schema import STIXSchemaValidator
+        from sdv.validators.cybox.schema import CyboxSchemaValidator
+
+        dirs = set(STIXSchemaValidator._SCHEMAS.values())
+        dirs.update(CyboxSchemaValidator._SCHEMAS.values())
+
+        for dir_ in sorted(dirs):
+            fp = xml_schema.write_schemaloc_index(dir_)
+            self.announce("wrote %s" % fp, level=2)
+
+
+class build_py_with_index(build_py):
+    """Regenerates the bundled schema index files before building. If the
+    dependencies needed to generate them are not installed, the index files
+    checked into the source tree are used.
+
+    """
+    def run(self):
+        try:
+            self.run_command('build_schema_index')
+        except ImportError as ex:
+            self.warn("unable to regenerate schema index files: %s" % ex)
+
+        build_py.run(self)
+
+
 py_maj, py_minor = sys.version_info[:2]
 
 if (py_maj, py_minor) < (2, 6) or (py_maj == 3 and py_minor < 3):
@@ -65,6 +110,10 @@ setup(
     scripts=['sdv/scripts/stix-validator.py', 'sdv/scripts/cybox-validator.py',
              'sdv/scripts/profile-to-sch.py', 'sdv/scripts/profile-to-xslt.py'],
     include_package_data=True,
+    cmdclass={
+        'build_schema_index': build_schema_index,
+        'build_py': build_py_with_index,
+    },
     install_requires=install_requires,
     extras_require=extras_require,
     long_description=readme,